@@ -3,127 +3,30 @@
 # https://github.com/cbernet/heppy/blob/master/LICENSE
 
 import os
-import pprint
-import dill
-import pickle
+import sys
 import shutil
+import multiprocessing
 import yaml
 from heppy.bin.heppy_check import check_chunk
+from heppy.framework.merging import prepare_merge, tree_merge, \
+    read_merged, record_merged
 
-MAX_ARG_STRLEN = 131072
+def printProgress(level, ndone, ntasks):
+    sys.stdout.write('\rlevel {}: {}/{} merges'.format(level, ndone, ntasks))
+    if ndone == ntasks:
+        sys.stdout.write('\n')
+    sys.stdout.flush()
 
-def haddPck(file, odir, idirs):
-    '''add pck files in directories idirs to a directory outdir.
-    All dirs in idirs must have the same subdirectory structure.
-    Each pickle file will be opened, and the corresponding objects added to a destination pickle in odir.
-    '''
-    objsum = None
-    basedir = os.getcwd()
-    fileName = os.path.basename(file)
-    for dirpath in idirs:
-        fileName = file.replace( idirs[0], dirpath )
-        pckfile = open(fileName)
-        sys.path.insert(0, dirpath)
-        obj = pickle.load(pckfile)
-        sys.path.pop(0)
-        if objsum is None:
-            objsum = obj
-        else:
-            try:
-                objsum += obj
-            except TypeError:
-                # += not implemented, nevermind
-                pass
-        os.chdir(basedir)
-                
-    oFileName = file.replace( idirs[0], odir )
-    pckfile = open(oFileName, 'w')
-    print 'output:', oFileName
-    pickle.dump(objsum, pckfile, protocol=-1)
-    txtFileName = oFileName.replace('.pck','.txt')
-    txtFile = open(txtFileName, 'w')
-    txtFile.write( str(objsum) )
-    txtFile.write( '\n' )
-    txtFile.close()
-    
-
-def hadd(fname, odir, idirs, appx=''):
-    if fname.endswith('.pck'):
-        haddPck(fname, odir, idirs)
-        return
-    elif fname.endswith('.yaml') or fname.endswith('.py'):
-        # just copy the yaml file to the output dir
-        shutil.copy(fname, odir)
-        return 
-    elif not fname.endswith('.root'):
-        return
-    haddCmd = ['hadd']
-##    ngoodfiles = 0
-    haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', appx+'.root') )
-    for dir in idirs:
-        prov_fname = fname.replace( idirs[0], dir )
-        assert(os.path.isfile(prov_fname))
-##        if os.path.isfile(prov_fname):
-##            ngoodfiles += 1
-        haddCmd.append( prov_fname )
-    # import pdb; pdb.set_trace()
-    cmd = ' '.join(haddCmd)
-    print cmd
-    if len(cmd) > MAX_ARG_STRLEN:
-        print 'Command longer than maximum unix string length; dividing into 2'
-        hadd(fname, odir, idirs[:len(idirs)/2], '1')
-        hadd(fname.replace(idirs[0], idirs[len(idirs)/2]), odir, idirs[len(idirs)/2:], '2')
-        haddCmd = ['hadd']
-        haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', appx+'.root') )
-        haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', '1.root') )
-        haddCmd.append( fname.replace( idirs[0], odir ).replace('.root', '2.root') )
-        cmd = ' '.join(haddCmd)
-        print 'Running merge cmd:', cmd
-        os.system(cmd)
-    else:
-        os.system(cmd)
-##    data = {
-##        'processing' : {
-##            'ngoodfiles' : ngoodfiles,
-##            'nfiles' : len(idirs)
-##        }   
-##    }   
-##    with open('processing.yaml', 'w') as outyaml:
-##        yaml.dump(data)
-        
-def haddRec(odir, idirs):
-    print 
-    print 'adding' 
-    pprint.pprint(idirs)
-    print
-    print 'to' 
-    print odir 
-    print 
-
-    cmd = ' '.join( ['mkdir', odir])
-    if os.path.isdir(odir):
-        shutil.rmtree(odir)
-    os.mkdir(odir)
-##    try:
-##        os.mkdir( odir )
-##    except OSError:
-##        print 
-##        print 'ERROR: directory in the way. Maybe you ran hadd already in this directory? Remove it and try again'
-##        print 
-##        raise
-    for root,dirs,files in os.walk( idirs[0] ):
-        # print root, dirs, files
-        for dir in dirs:
-            dir = '/'.join([root, dir])
-            dir = dir.replace(idirs[0], odir)
-            cmd = 'mkdir ' + dir 
-            # print cmd
-            # os.system(cmd)
-            os.mkdir(dir)
-        for file in files:
-            hadd('/'.join([root, file]), odir, idirs)
+def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./',
+               nprocs=1, fanin=16, incremental=False):
+    '''Merges the chunk directories of each component of idir,
+    e.g. DYJets_Chunk0, DYJets_Chunk1, ... -> DYJets.
 
-def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./'):
+    The files of all components are merged together with a tree reduction
+    in nprocs processes, see heppy.framework.merging.tree_merge.
+    If incremental is True, only the chunks that are not yet merged
+    are added to the existing merged directories.
+    '''
     chunks = {}
     nchunks = {}
     for path in sorted(os.listdir(idir)):
@@ -142,17 +45,27 @@ def haddChunks(idir, removeDestDir, cleanUp=False, base_odir='./'):
     if len(chunks)==0:
         print 'warning: no chunk found.'
         return
+    jobs = []
+    newchunks = {}
     for comp, cchunks in chunks.iteritems():
         # odir = base_odir+'/'+'/'.join( [idir, comp] )
         odir = '/'.join( [base_odir, comp] )
-        print odir, cchunks
-        if removeDestDir:
-            if os.path.isdir( odir ):
-                shutil.rmtree(odir)
-        haddRec(odir, cchunks)
+        if os.path.isdir( odir ) and (removeDestDir or not incremental):
+            shutil.rmtree(odir)
+        newchunks[comp], compjobs = prepare_merge(cchunks, odir,
+                                                  copy_ext=['.yaml', '.py'],
+                                                  incremental=incremental)
+        print odir, ':', len(newchunks[comp]), 'chunks to merge'
+        jobs.extend(compjobs)
+    tree_merge(jobs, nprocs, fanin, progress=printProgress)
+    for comp in chunks:
+        odir = '/'.join( [base_odir, comp] )
+        if not os.path.isdir(odir):
+            continue
+        record_merged(odir, newchunks[comp])
         data = {
             'processing' : {
-                'ngoodfiles' : len(cchunks),
+                'ngoodfiles' : len(read_merged(odir)),
                 'nfiles' : nchunks[comp]
             }   
         }   
@@ -181,10 +94,12 @@ if __name__ == '__main__':
     parser = OptionParser()
     parser.usage = """
     %prog <dir>
-    Find chunks in dir, and run recursive hadd to group all chunks.
+    Find chunks in dir, and merge the chunks of each component.
     For example: 
-    DYJets_Chunk0/, DYJets_Chunk1/ ... -> hadd -> DYJets/
-    WJets_Chunk0/, WJets_Chunk1/ ... -> hadd -> WJets/
+    DYJets_Chunk0/, DYJets_Chunk1/ ... -> merge -> DYJets/
+    WJets_Chunk0/, WJets_Chunk1/ ... -> merge -> WJets/
+    With --incremental, the chunks that finished since the last merge
+    are added to the destination directories.
     """
     parser.add_option("-r","--remove", dest="remove",
                       default=False,action="store_true",
@@ -192,6 +107,16 @@ if __name__ == '__main__':
     parser.add_option("-c","--clean", dest="clean",
                       default=False,action="store_true",
                       help="move chunks to Chunks/ after processing.")
+    parser.add_option("-j","--nprocs", dest="nprocs",
+                      default=multiprocessing.cpu_count(), type="int",
+                      help="number of processes merging the files in parallel.")
+    parser.add_option("-f","--fanin", dest="fanin",
+                      default=16, type="int",
+                      help="number of files merged together at each step of the tree reduction. "
+                      "2 gives a pairwise reduction, but reads and writes each object more often.")
+    parser.add_option("-i","--incremental", dest="incremental",
+                      default=False,action="store_true",
+                      help="only add the chunks not merged yet to the existing destination directories.")
 
     (options,args) = parser.parse_args()
 
@@ -205,5 +130,6 @@ if __name__ == '__main__':
     else:
         odir = dirname
         
-    haddChunks(dirname, options.remove, options.clean, odir)
+    haddChunks(dirname, options.remove, options.clean, odir,
+               options.nprocs, options.fanin, options.incremental)
 
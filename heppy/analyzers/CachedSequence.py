@@ -0,0 +1,114 @@
+'''Runs a sequence of analyzers, caching their output on disk.'''
+
+import os
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.eventcache import EventCache, cache_key
+
+
+class _AnalyzerRef(object):
+    '''Stands in the cache for an analyzer of the sequence stored in the event,
+    e.g. event.simulator in PapasSim.'''
+
+    def __init__(self, index):
+        self.index = index
+
+
+class CachedSequence(Analyzer):
+    '''Runs a sequence of analyzers, and stores the event attributes they
+    produce in an on-disk cache. When the same sequence processes the same
+    input files again, e.g. in another analysis using the same simulation,
+    the attributes are read from the cache instead of running the analyzers.
+
+    Example::
+
+      from heppy.analyzers.CachedSequence import CachedSequence
+      papas_sequence = cfg.Analyzer(
+          CachedSequence,
+          'papas_sequence',
+          sequence = [papas, pfblocks, pfreconstruct],
+          cache_dir = '/data/heppy_cache',
+          outputs = None  # optional
+      )
+
+    * sequence: configurations of the analyzers to run.
+
+    * cache_dir: directory of the caches. The cache of the sequence is a subdirectory
+      named after a key computed from the configuration of the analyzers, the source
+      code of the modules of their package that they use, the input files,
+      and the software versions given to the configuration,
+      see heppy.framework.eventcache. Changing any of them gives a new cache.
+
+    * outputs: names of the event attributes to cache. By default, the attributes
+      added or replaced by the analyzers of the sequence. The attributes modified
+      in place, e.g. a list filled by the sequence, must be given here.
+
+    The events are identified by their index in the input files, and the
+    cached attributes must be picklable. The analyzers of the sequence
+    are not run for the events read from the cache: they do not draw random
+    numbers, and their counters do not count these events.
+    '''
+
+    def __init__(self, cfg_ana, cfg_comp, looperName):
+        super(CachedSequence, self).__init__(cfg_ana, cfg_comp, looperName)
+        self.analyzers = [cfg.class_object(cfg, cfg_comp, looperName)
+                          for cfg in self.cfg_ana.sequence]
+        self.outputs = None
+        if hasattr(self.cfg_ana, 'outputs'):
+            self.outputs = self.cfg_ana.outputs
+        self.cache = None
+
+    def beginLoop(self, setup):
+        super(CachedSequence, self).beginLoop(setup)
+        self.counters.addCounter('cache')
+        self.counters['cache'].register('All events')
+        self.counters['cache'].register('Read from cache')
+        key = cache_key(self.cfg_ana.sequence, self.cfg_comp,
+                        getattr(setup.config, 'versions', None))
+        self.cache = EventCache(os.path.join(self.cfg_ana.cache_dir, key))
+        self.mainLogger.info('{}: {} events in cache {}'.format(
+            self.name, len(self.cache), self.cache.dirname))
+        for analyzer in self.analyzers:
+            analyzer.beginLoop(setup)
+
+    def process(self, event):
+        self.counters['cache'].inc('All events')
+        data = self.cache.get(event.iEv)
+        if data is not None:
+            self.counters['cache'].inc('Read from cache')
+            for name, value in data['attributes'].iteritems():
+                if isinstance(value, _AnalyzerRef):
+                    value = self.analyzers[value.index]
+                setattr(event, name, value)
+            return data['result']
+        before = dict(vars(event))
+        result = True
+        for analyzer in self.analyzers:
+            result = analyzer.process(event)
+            result = True if result is None else result
+            if result is False:
+                break
+        if self.outputs is not None:
+            names = [name for name in self.outputs if hasattr(event, name)]
+        else:
+            names = [name for name, value in vars(event).iteritems()
+                     if name not in before or value is not before[name]]
+        attributes = dict()
+        for name in names:
+            value = getattr(event, name)
+            for index, analyzer in enumerate(self.analyzers):
+                if value is analyzer:
+                    value = _AnalyzerRef(index)
+            attributes[name] = value
+        self.cache.put(event.iEv, dict(attributes=attributes, result=result))
+        return result
+
+    def endLoop(self, setup):
+        for analyzer in self.analyzers:
+            analyzer.endLoop(setup)
+        self.cache.close()
+        super(CachedSequence, self).endLoop(setup)
+
+    def write(self, setup):
+        for analyzer in self.analyzers:
+            analyzer.write(setup)
+        super(CachedSequence, self).write(setup)
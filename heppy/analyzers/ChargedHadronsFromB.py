@@ -35,12 +35,13 @@ class ChargedHadronsFromB(Analyzer):
             else:
                 event.hadrons_not_from_b.append(hadron)
 
+def has_bottom(ptc):
+    '''returns True if ptc contains a b quark'''
+    return hasBottom(ptc.pdgid())
+
 def is_ptc_from_b(event, hadron, browser):
-    ancestors = browser.ancestors(hadron)
-    is_from_b = False 
-    for ancestor in ancestors:
-        if hasBottom(ancestor.pdgid() ):
-            is_from_b = True
-    return is_from_b
+    '''returns True if hadron has an ancestor containing a b quark.
+    The result is computed for all particles of the browser at the first call.'''
+    return browser.has_ancestor(hadron, has_bottom)
             
         
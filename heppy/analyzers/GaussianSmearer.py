@@ -37,16 +37,18 @@ class GaussianSmearer(Analyzer):
         '''
         input_objects = getattr(event, self.cfg_ana.input_objects)
         output = []
-        for obj in input_objects:
-            smeared = self.__smear(obj)
-            if self.cfg_ana.accept(smeared): 
-                output.append(smeared)
+        if input_objects:
+            # drawing all smearing factors in one call
+            mu, sigma = self.cfg_ana.mu_sigma
+            smear_factors = random.gauss(mu, sigma, size=len(input_objects))
+            for obj, smear_factor in zip(input_objects, smear_factors):
+                smeared = self.__smear(obj, float(smear_factor))
+                if self.cfg_ana.accept(smeared): 
+                    output.append(smeared)
         setattr(event, self.cfg_ana.output, output)
 
-    def __smear(self, obj):
+    def __smear(self, obj, smear_factor):
         '''returns the smeared object (obj is deepcopied).'''
-        mu, sigma = self.cfg_ana.mu_sigma
-        smear_factor = random.gauss(mu, sigma) 
         smeared = copy.deepcopy(obj)
         smeared._tlv *= smear_factor
         return smeared
@@ -1,9 +1,9 @@
 from heppy.framework.analyzer import Analyzer
-from heppy.papas.path import ImpactParameter
+from heppy.papas.path import ImpactParameter, impact_parameters
 from ROOT import TVector3, TLorentzVector, TFile, TTree
 # from heppy.papas.path import Helix
 import math
-import random
+import heppy.statistics.rrandom as random
 # from heppy.utils.computeIP import *
 
 class ImpactParameterSmearer(Analyzer):
@@ -25,18 +25,20 @@ class ImpactParameterSmearer(Analyzer):
         primary_vertex = TVector3(0, 0, 0)
         jets = getattr(event, self.cfg_ana.jets)
         for jet in jets:
-            for ptcs in jet.constituents.values():
-                for ptc in ptcs:
-                    if ptc.q() == 0:
-                        continue
-                    ptc.path.impact_parameter = ImpactParameter(ptc.path,
-                                                                primary_vertex,
-                                                                jet.p3())
-                    resolution = self.cfg_ana.resolution(ptc)
-                    ptc.path.IP_resolution = resolution
-                    gx = random.gauss(0, ptc.path.IP_resolution)
-                    gy = random.gauss(0, ptc.path.IP_resolution)
-                    smear_IP(ptc.path, gx, gy)
+            charged = [ptc for ptcs in jet.constituents.values()
+                       for ptc in ptcs if ptc.q() != 0]
+            ips = impact_parameters([ptc.path for ptc in charged],
+                                    primary_vertex, jet.p3())
+            if not charged:
+                continue
+            resolutions = [self.cfg_ana.resolution(ptc) for ptc in charged]
+            # drawing the smearing of all tracks of the jet in one call
+            gxs, gys = random.gauss(0, [resolutions, resolutions],
+                                    size=(2, len(charged)))
+            for ptc, ip, resolution, gx, gy in zip(charged, ips, resolutions, gxs, gys):
+                ptc.path.impact_parameter = ip
+                ptc.path.IP_resolution = resolution
+                smear_IP(ptc.path, float(gx), float(gy))
 
 
 def smear_IP(path, gx, gy):
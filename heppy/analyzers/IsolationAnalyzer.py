@@ -1,7 +1,7 @@
 '''Compute particle-based isolation'''
 
 from heppy.framework.analyzer import Analyzer
-from heppy.particles.isolation import IsolationComputer, IsolationInfo
+from heppy.particles.isolation import IsolationComputer, IsolationInfo, IsolationIndex
 
 import pprint 
 
@@ -54,17 +54,17 @@ class IsolationAnalyzer(Analyzer):
     
     def beginLoop(self, setup):
         super(IsolationAnalyzer, self).beginLoop(setup)
-        # now using same isolation definition for all pdgids
-        self.iso_computers = dict()
+        # now using same isolation definition for all pdgids,
+        # so that all pdgids are done in a single pass for each candidate
         off_iso_areas = None
         if hasattr(self.cfg_ana, 'off_iso_area'):
             off_iso_areas = [self.cfg_ana.off_iso_area]
-        for pdgid in pdgids:
-            self.iso_computers[pdgid] = IsolationComputer(
-                [self.cfg_ana.iso_area],
-                off_areas=off_iso_areas, 
-                label='iso{pdgid}'.format(pdgid=str(pdgid))
-            )
+        self.iso_computer = IsolationComputer(
+            [self.cfg_ana.iso_area],
+            off_areas=off_iso_areas
+        )
+        self.iso_labels = dict((pdgid, 'iso{pdgid}'.format(pdgid=str(pdgid)))
+                               for pdgid in pdgids)
             
     def process(self, event):
         '''process event.
@@ -76,12 +76,16 @@ class IsolationAnalyzer(Analyzer):
         '''
         particles = getattr(event, self.cfg_ana.particles)
         candidates = getattr(event, self.cfg_ana.candidates)
+        # index of the particles, built once for all candidates
+        index = IsolationIndex(particles,
+                               group=lambda ptc: abs(self.pdgid(ptc)))
         for candidate in candidates:
             isosum = IsolationInfo('all', candidate)
             self.logger.info(str(candidate))
+            isos = self.iso_computer.compute_groups(candidate, index,
+                                                    self.iso_labels)
             for pdgid in pdgids:
-                sel_ptcs = [ptc for ptc in particles if abs(self.pdgid(ptc))==pdgid]
-                iso = self.iso_computers[pdgid].compute(candidate, sel_ptcs)
+                iso = isos[pdgid]
                 isosum += iso 
                 setattr(candidate, 'iso_{pdgid}'.format(pdgid=pdgid), iso)
                 self.logger.info(str(iso))
@@ -1,8 +1,10 @@
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.isolation import EtaPhiCircle
 from heppy.particles.tlv.particle import Particle
+from heppy.utils.deltarmatrix import coordinates, deltaR2Matrix
 from ROOT import TLorentzVector
 import pprint 
+import numpy as np
 
 class LeptonFsrDresser(Analyzer):
     '''Dresses input lepton collection with another collection. Can be used for dressing leptons with FSR photons for instance. 
@@ -33,14 +35,25 @@ class LeptonFsrDresser(Analyzer):
         particles = getattr(event, self.cfg_ana.particles)
         leptons = getattr(event, self.cfg_ana.leptons)
         
+        area = self.cfg_ana.area
+        inside = None
+        if isinstance(area, EtaPhiCircle) and len(leptons) and len(particles):
+            # distances between all leptons and particles computed at once
+            dR2 = deltaR2Matrix(coordinates(leptons, use_eta=True),
+                                coordinates(particles, use_eta=True))
+            inside = area.is_inside_dR2(dR2)
         dressed = []
-        for lepton in leptons:
+        for ilepton, lepton in enumerate(leptons):
             sump4 = TLorentzVector()
-             
-            for particle in particles:
-                if self.cfg_ana.area.is_inside(lepton.eta(), lepton.phi(),
-                                  particle.eta(), particle.phi() ):
-                    sump4 += particle.p4()
+            
+            if inside is not None:
+                for iparticle in np.flatnonzero(inside[ilepton]):
+                    sump4 += particles[iparticle].p4()
+            else:
+                for particle in particles:
+                    if area.is_inside(lepton.eta(), lepton.phi(),
+                                      particle.eta(), particle.phi() ):
+                        sump4 += particle.p4()
 
             sump4 += lepton.p4()
             dressed.append( Particle(lepton.pdgid(), lepton.q(), sump4) )
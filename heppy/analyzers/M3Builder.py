@@ -2,9 +2,7 @@
 
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.tlv.resonance import Resonance 
-
-import pprint 
-import itertools
+import heppy.particles.combinatorics as combinatorics
 
 class M3Builder(Analyzer):
     '''Computes the event variable M3
@@ -19,6 +17,8 @@ class M3Builder(Analyzer):
     
     All combinations of 3 jets are tested to retain
     the one with highest pT (transverse momentum of the 3-jet system).
+    The pT of all combinations are computed at once with
+    L{heppy.particles.combinatorics}.
     This combination of three jets is used to build an "M3" particle,
     with the pdgid of the top quark. 
     
@@ -39,18 +39,11 @@ class M3Builder(Analyzer):
         jets = getattr(event, self.cfg_ana.jets)
 
         m3 = None
-        pt3max=0
-        seljets=None
-        #print jets
 
         if len(jets)>=3:
-            for l in list(itertools.permutations(jets,3)):
-                #ntag=sum([l[0].tags['b'],l[1].tags['b'],l[2].tags['b']])
-                pt3=(l[0].p4()+l[1].p4()+l[2].p4()).Pt()
-                if pt3>pt3max:
-                    ptmax=pt3
-                    seljets=l
-
+            combs = combinatorics.combinations(len(jets), 3)
+            pt3 = combinatorics.pts(combinatorics.sum_p4s(combinatorics.p4_array(jets), combs))
+            seljets = [jets[index] for index in combs[pt3.argmax()]]
             top_pdgid = 6
             m3 = Resonance(seljets, top_pdgid)
         setattr(event, self.instance_label, m3)
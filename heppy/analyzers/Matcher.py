@@ -1,7 +1,8 @@
 '''Particle matcher.
 '''
 from heppy.framework.analyzer import Analyzer
-from heppy.utils.deltar import matchObjectCollection, deltaR
+from heppy.utils.deltarmatrix import matchObjectCollection
+from heppy.utils.deltar import deltaR
 
 import collections
 
@@ -1,6 +1,8 @@
 '''Merges collections of particle-like objects into a single collection.'''
 
 from heppy.framework.analyzer import Analyzer
+from heppy.particles.particlearray import ParticleArray
+from heppy.particles.p4 import P4
 import copy
 import itertools
 
@@ -28,6 +30,9 @@ class Merger(Analyzer):
       If P4.sort_key is provided, particles are properly sorted by decreasing
       E or pT depending on the type of collider defined in the configuration
       file, see L{heppy.configuration.Collider}.
+
+    If all input collections are L{ParticleArrays<heppy.particles.particlearray.ParticleArray>},
+    the output collection is a ParticleArray.
     '''
     
     def process(self, event):
@@ -40,6 +45,16 @@ class Merger(Analyzer):
          - output collection event.<self.cfg_ana.output>
         '''
         inputs = [getattr(event, name) for name in self.cfg_ana.inputs]
+        if all(isinstance(coll, ParticleArray) for coll in inputs):
+            output = ParticleArray.concatenate(inputs)
+            if hasattr(self.cfg_ana, 'sort_key'):
+                if self.cfg_ana.sort_key == P4.sort_key:
+                    output = output.sorted()
+                else:
+                    output = output.sorted([self.cfg_ana.sort_key(ptc)
+                                            for ptc in output])
+            setattr(event, self.cfg_ana.output, output)
+            return
         output = list(ptc for ptc in itertools.chain(*inputs))
         if hasattr(self.cfg_ana, 'sort_key'):
             output.sort(key=self.cfg_ana.sort_key,
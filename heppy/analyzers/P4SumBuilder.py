@@ -4,6 +4,7 @@ from heppy.framework.analyzer import Analyzer
 from heppy.particles.tlv.particle import Particle
 from heppy.particles.tlv.jet import Jet
 from heppy.particles.jet import JetConstituents
+from heppy.particles.particlearray import ParticleArray
 
 from ROOT import TLorentzVector
 
@@ -21,7 +22,8 @@ class P4SumBuilder(Analyzer):
           particles = 'rec_particles',
         ) 
 
-    @param particles: collection of input particles.
+    @param particles: collection of input particles, possibly a
+               L{ParticleArray<heppy.particles.particlearray.ParticleArray>}.
 
     @param output: contains a single particle with a p4 equal to the
                sum p4 of all input particles. The single particle is of
@@ -38,9 +40,13 @@ class P4SumBuilder(Analyzer):
         charge = 0
         pdgid = 0
         ptcs = getattr(event, self.cfg_ana.particles)
-        for ptc in ptcs:
-            p4 += ptc.p4()
-            charge += ptc.q()
+        if isinstance(ptcs, ParticleArray):
+            p4.SetPxPyPzE(*ptcs.sum_p4())
+            charge = int(ptcs.q().sum())
+        else:
+            for ptc in ptcs:
+                p4 += ptc.p4()
+                charge += ptc.q()
         sumptc = Particle(pdgid, charge, p4)
         setattr(event, self.cfg_ana.output, sumptc)
                 
@@ -14,12 +14,15 @@ class PapasPFBlockBuilder(Analyzer):
             PapasPFBlockBuilder,
             track_type_and_subtype = 'ts', 
             ecal_type_and_subtype = 'em', 
-            hcal_type_and_subtype = 'hm'
+            hcal_type_and_subtype = 'hm',
+            spatial_index = True # optional
         )
         
         track_type_and_subtype:  key for tracks collection in papasevent
         ecal_type_and_subtype: key for ecals collection in papasevent
         hcal_type_and_subtype: key for hcals collection in papasevent
+        spatial_index: if True, the distance is only computed between nearby elements.
+            The resulting blocks are the same. Defaults to False.
         
     '''
     def __init__(self, *args, **kwargs):
@@ -42,7 +45,11 @@ class PapasPFBlockBuilder(Analyzer):
             collection = papasevent.get_collection(self.cfg_ana.hcal_type_and_subtype)
             if collection:
                 uniqueids += collection.keys()            
-        blockbuilder = PFBlockBuilder(papasevent, uniqueids, distance, startindex=0)  
+        spatial_index = False
+        if hasattr(self.cfg_ana, 'spatial_index'):
+            spatial_index = self.cfg_ana.spatial_index
+        blockbuilder = PFBlockBuilder(papasevent, uniqueids, distance, startindex=0,
+                                      spatial_index=spatial_index)
         papasevent.add_collection(blockbuilder.blocks)
 
         
@@ -24,6 +24,7 @@ class PapasSim(Analyzer):
         detector = CMS(),
         gen_particles = 'gen_particles_stable',
         sim_particles = 'sim_particles',
+        merge_spatial_index = True, # optional
         verbose = True
     )
     detector:      Detector model to be used.
@@ -32,8 +33,17 @@ class PapasSim(Analyzer):
                    Note that the instance label is prepended to this name.
                    Therefore, in this particular case, the name of the output
                    sim particle collection is "papas_sim_particles".
+    merge_spatial_index: if True, only nearby clusters are compared when merging
+                   the clusters. The merged clusters are the same. Defaults to False.
     verbose      : Enable the detailed printout.
 
+    To get the same simulated events whatever the splitting in chunks and
+    worker processes, use a RandomStreamService,
+    see heppy.framework.services.randomstreams.
+    The streams are keyed by the position of the event in the input files,
+    which is not known for the chunks of several files made with splitFactor
+    if the events backend does not read a TTree.
+
         event must contain
           gen_particles
         event will gain
@@ -47,7 +57,6 @@ class PapasSim(Analyzer):
         self.simname = '_'.join([self.instance_label,  self.cfg_ana.sim_particles])
 
     def process(self, event):
-        #random.seed(0xdeadbeef) #Useful to make results reproducable between loops and single runs
         event.simulator = self
         event.papasevent = PapasEvent(event.iEv)   
         papasevent = event.papasevent
@@ -100,13 +109,18 @@ class PapasSim(Analyzer):
     def merge_clusters(self, papasevent): # todo move to a separate analyzer
         #For Now merge the simulated clusters as a separate pre-stage (prior to new reconstruction)        
         ruler = Distance()
+        spatial_index = False
+        if hasattr(self.cfg_ana, 'merge_spatial_index'):
+            spatial_index = self.cfg_ana.merge_spatial_index
         merged_ecals = dict()
         merged_hcals = dict()
         ecals = papasevent.get_collection('es')
         if ecals:
-            merged_ecals = MergedClusterBuilder(papasevent.get_collection('es'), ruler, papasevent.history).merged_clusters
+            merged_ecals = MergedClusterBuilder(papasevent.get_collection('es'), ruler, papasevent.history,
+                                                spatial_index=spatial_index).merged_clusters
         hcals = papasevent.get_collection('hs')
         if hcals:        
-            merged_hcals = MergedClusterBuilder(papasevent.get_collection('hs'), ruler, papasevent.history).merged_clusters
+            merged_hcals = MergedClusterBuilder(papasevent.get_collection('hs'), ruler, papasevent.history,
+                                                spatial_index=spatial_index).merged_clusters
         papasevent.add_collection(merged_ecals)
         papasevent.add_collection(merged_hcals)
@@ -2,9 +2,9 @@
 
 from heppy.framework.analyzer import Analyzer
 from heppy.particles.tlv.resonance import Resonance2 as Resonance
+import heppy.particles.combinatorics as combinatorics
 
-import pprint 
-import itertools
+import numpy as np
 
 mass = {23: 91, 24: 80.4, 25: 125}
 
@@ -31,6 +31,19 @@ class ResonanceBuilder(Analyzer):
     @param leg_collection: Collection of particles that will be combined into resonances.
 
     @param pdgid: Pythia code for the target resonance. 
+
+    @param charge: optional. If provided, only the pairs of legs with this total charge
+      are considered, e.g. 0 for a Z.
+
+    @param same_flavour: optional, defaults to False. If True, only the pairs of legs
+      with the same abs(pdgid) are considered.
+
+    @param max_candidates: optional. If provided, only the max_candidates resonances
+      closest to the nominal mass are kept.
+
+    The invariant masses of all pairs are computed at once with
+    L{heppy.particles.combinatorics}, and the resonances
+    are only built for the kept pairs.
     '''
     
     def process(self, event):
@@ -44,10 +57,14 @@ class ResonanceBuilder(Analyzer):
          - event.<self.cfg_ana.output>_legs: the two legs of the best resonance.
         '''
         legs = getattr(event, self.cfg_ana.leg_collection)
-        resonances = []
-        for leg1, leg2 in itertools.combinations(legs,2):
-            resonances.append( Resonance(leg1, leg2, self.cfg_ana.pdgid) )
+        combs = combinatorics.select(combinatorics.combinations(len(legs), 2), legs,
+                                     getattr(self.cfg_ana, 'charge', None),
+                                     getattr(self.cfg_ana, 'same_flavour', False))
         # sorting according to distance to nominal mass
         nominal_mass = mass[self.cfg_ana.pdgid]
-        resonances.sort(key=lambda x: abs(x.m()-nominal_mass))
+        p4s = combinatorics.p4_array(legs)
+        dmass = np.abs(combinatorics.masses(combinatorics.sum_p4s(p4s, combs)) - nominal_mass)
+        kept = combinatorics.smallest(dmass, getattr(self.cfg_ana, 'max_candidates', None))
+        resonances = [Resonance(legs[i], legs[j], self.cfg_ana.pdgid)
+                      for i, j in combs[kept]]
         setattr(event, self.cfg_ana.output, resonances)
@@ -1,6 +1,7 @@
 '''Select objects'''
 
 from heppy.framework.analyzer import Analyzer
+from heppy.particles.particlearray import ParticleArray
 import collections
 
 class Selector(Analyzer):
@@ -27,6 +28,18 @@ class Selector(Analyzer):
     @param filter_func: a function object.
     
     @param nmax: up to nmax objects verifying filter_func are kept (optional).
+
+    @param array_filter_func: a function object taking a
+        L{ParticleArray<heppy.particles.particlearray.ParticleArray>}
+        and returning a boolean mask (optional).
+        If the input collection is a ParticleArray and array_filter_func
+        is provided, it is used instead of filter_func, e.g.::
+        
+          array_filter_func = lambda ptcs: (ptcs.e() > 5.) & \\
+                                           np.in1d(np.abs(ptcs.pdgid()), [11, 13])
+        
+        If the input collection is a ParticleArray, the output collection
+        is a ParticleArray as well.
     '''
 
     def process(self, event):
@@ -38,7 +51,13 @@ class Selector(Analyzer):
         '''
         input_collection = getattr(event, self.cfg_ana.input_objects)
         output_collection = None
-        if isinstance(input_collection, collections.Mapping):
+        if isinstance(input_collection, ParticleArray):
+            if hasattr(self.cfg_ana, 'array_filter_func'):
+                mask = self.cfg_ana.array_filter_func(input_collection)
+            else:
+                mask = [self.cfg_ana.filter_func(obj) for obj in input_collection]
+            output_collection = input_collection.select(mask)
+        elif isinstance(input_collection, collections.Mapping):
             output_collection = dict( [(key, val) for key, val in input_collection.iteritems()
                                        if self.cfg_ana.filter_func(val)] ) 
         else:
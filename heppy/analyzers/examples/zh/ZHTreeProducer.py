@@ -1,5 +1,5 @@
 from heppy.framework.analyzer import Analyzer
-from heppy.statistics.tree import Tree
+from heppy.statistics.tree import Tree, BufferedTree
 from heppy.analyzers.ntuple import *
 
 from ROOT import TFile
@@ -11,7 +11,11 @@ class ZHTreeProducer(Analyzer):
         self.rootfile = TFile('/'.join([self.dirName,
                                         'tree.root']),
                               'recreate')
-        self.tree = Tree( 'events', '')
+        if hasattr(self.cfg_ana, 'buffer_size'):
+            self.tree = BufferedTree( 'events', '',
+                                      bufferSize=self.cfg_ana.buffer_size )
+        else:
+            self.tree = Tree( 'events', '')
         if hasattr(self.cfg_ana, 'recoil'):
             bookParticle(self.tree, 'recoil')
         if hasattr(self.cfg_ana, 'zeds'):  
@@ -49,9 +53,10 @@ class ZHTreeProducer(Analyzer):
         neutrinos = getattr(event, 'neutrinos', None)
         if neutrinos:
             fill(self.tree, 'n_nu', len(neutrinos))
-        self.tree.tree.Fill()
+        self.tree.fillTree()
         
     def write(self, setup):
+        self.tree.flush()
         self.rootfile.Write()
         self.rootfile.Close()
         
@@ -8,7 +8,6 @@ from heppy.particles.jet import JetConstituents
 import os 
 
 from ROOT import gSystem
-CCJetClusterizer = None
 if os.environ.get('FCCPHYSICS'):
     gSystem.Load("libfccphysics-tools")
     from ROOT import JetClusterizer as CCJetClusterizer
@@ -16,6 +15,9 @@ elif os.environ.get('CMSSW_BASE'):
     gSystem.Load("libColinPFSim")
     from ROOT import heppy
     CCJetClusterizer = heppy.JetClusterizer
+else:
+    # compiled JetClusterizer not available, using the numpy one
+    from heppy.utils.jetclustering import JetClusterizer as CCJetClusterizer
 
 
 class JetClusterizer(Analyzer):
@@ -23,6 +25,8 @@ class JetClusterizer(Analyzer):
     
     This analyzer, specific to the FCC,
     makes use of the JetClusterizer class compiled in the fcc-physics package.
+    If this package is not available, the pure python and numpy implementation
+    of heppy.utils.jetclustering is used instead.
 
     Example configuration::
 
@@ -7,29 +7,40 @@ def var( tree, varName, type=float ):
 def fill( tree, varName, value ):
     tree.fill( varName, value )
 
+_names_cache = dict()
+
+def names( pName, suffixes ):
+    '''Returns the tuple of branch names pName_suffix for each suffix.
+    The names are formatted only once for a given pName and tuple of suffixes,
+    so that the fill functions do not format strings at each event.'''
+    key = (pName, suffixes)
+    result = _names_cache.get(key)
+    if result is None:
+        result = tuple('{pName}_{suffix}'.format(pName=pName, suffix=suffix)
+                       for suffix in suffixes)
+        _names_cache[key] = result
+    return result
+
 # simple p4
 
+p4_vars = ('e', 'pt', 'px', 'py', 'pz', 'theta', 'eta', 'phi', 'm')
+
 def bookP4( tree, pName):
-    var(tree, '{pName}_e'.format(pName=pName))
-    var(tree, '{pName}_pt'.format(pName=pName))
-    var(tree, '{pName}_px'.format(pName=pName))
-    var(tree, '{pName}_py'.format(pName=pName))
-    var(tree, '{pName}_pz'.format(pName=pName))
-    var(tree, '{pName}_theta'.format(pName=pName))
-    var(tree, '{pName}_eta'.format(pName=pName))
-    var(tree, '{pName}_phi'.format(pName=pName))
-    var(tree, '{pName}_m'.format(pName=pName))
+    for name in names(pName, p4_vars):
+        var(tree, name)
 
 def fillP4( tree, pName, p4):
-    fill(tree, '{pName}_e'.format(pName=pName), p4.e() )
-    fill(tree, '{pName}_pt'.format(pName=pName), p4.pt() )
-    fill(tree, '{pName}_px'.format(pName=pName), p4.p3().X() )
-    fill(tree, '{pName}_py'.format(pName=pName), p4.p3().Y() )
-    fill(tree, '{pName}_pz'.format(pName=pName), p4.p3().Z() )
-    fill(tree, '{pName}_theta'.format(pName=pName), p4.theta() )
-    fill(tree, '{pName}_eta'.format(pName=pName), p4.eta() )
-    fill(tree, '{pName}_phi'.format(pName=pName), p4.phi() )
-    fill(tree, '{pName}_m'.format(pName=pName), p4.m() )
+    e, pt, px, py, pz, theta, eta, phi, m = names(pName, p4_vars)
+    p3 = p4.p3()
+    fill(tree, e, p4.e() )
+    fill(tree, pt, p4.pt() )
+    fill(tree, px, p3.X() )
+    fill(tree, py, p3.Y() )
+    fill(tree, pz, p3.Z() )
+    fill(tree, theta, p4.theta() )
+    fill(tree, eta, p4.eta() )
+    fill(tree, phi, p4.phi() )
+    fill(tree, m, p4.m() )
 
 # simple particle
 
@@ -40,7 +51,8 @@ def bookParticle( tree, pName ):
     bookP4(tree, pName)
     
 def fillParticle( tree, pName, particle ):
-    fill(tree, '{pName}_pdgid'.format(pName=pName), particle.pdgid() )
+    pdgid, = names(pName, ('pdgid',))
+    fill(tree, pdgid, particle.pdgid() )
 ##    ip = -99
 ##    ip_signif = -1e9
 ##    if hasattr(particle, 'path'):
@@ -54,6 +66,35 @@ def fillParticle( tree, pName, particle ):
     fillP4(tree, pName, particle )
 
 
+# collection of particles, stored in vectors
+
+def bookParticleArray( tree, pName, maxlen ):
+    n = '{pName}_n'.format(pName=pName)
+    var(tree, n, int)
+    for name in names(pName, ('pdgid',) + p4_vars):
+        tree.vector(name, n, maxlen)
+
+def fillParticleArray( tree, pName, ptcs ):
+    '''Fills the vectors booked with bookParticleArray.
+
+    ptcs is a L{ParticleArray<heppy.particles.particlearray.ParticleArray>},
+    and each vector is filled at once.
+    Only the first maxlen particles are stored.'''
+    n, pdgid, e, pt, px, py, pz, theta, eta, phi, m = names(pName, ('n', 'pdgid') + p4_vars)
+    size = min(len(ptcs), len(tree.vecvars[pdgid]))
+    ptcs = ptcs[:size]
+    fill(tree, n, size)
+    tree.vfill(pdgid, ptcs.pdgid())
+    tree.vfill(e, ptcs.e())
+    tree.vfill(pt, ptcs.pt())
+    tree.vfill(px, ptcs.px())
+    tree.vfill(py, ptcs.py())
+    tree.vfill(pz, ptcs.pz())
+    tree.vfill(theta, ptcs.theta())
+    tree.vfill(eta, ptcs.eta())
+    tree.vfill(phi, ptcs.phi())
+    tree.vfill(m, ptcs.m())
+
 def bookCluster( tree, name ):
     var(tree, '{name}_e'.format(name=name))
     var(tree, '{name}_layer'.format(name=name))
@@ -75,9 +116,10 @@ def bookComponent( tree, pName ):
     var(tree, '{pName}_num'.format(pName=pName))
 
 def fillComponent(tree, pName, component):
-    fill(tree, '{pName}_e'.format(pName=pName), component.e() )
-    fill(tree, '{pName}_pt'.format(pName=pName), component.pt() )
-    fill(tree, '{pName}_num'.format(pName=pName), component.num() )
+    e, pt, num = names(pName, ('e', 'pt', 'num'))
+    fill(tree, e, component.e() )
+    fill(tree, pt, component.pt() )
+    fill(tree, num, component.num() )
     
     
 pdgids = [211, 22, 130, 11, 13]
@@ -94,20 +136,16 @@ def bookJet( tree, pName, taggers=None):
 def fillJet( tree, pName, jet, taggers=None):
     fillP4(tree, pName, jet )
     if taggers:
-        for tagger in taggers:
+        for tagger, name in zip(taggers, names(pName, tuple(taggers))):
             if tagger in jet.tags:
-                fill(tree,
-                     '{pName}_{tagger}'.format(pName=pName, tagger=tagger),
-                     jet.tags.get(tagger, None))
+                fill(tree, name, jet.tags.get(tagger, None))
             else:   
-                fill(tree, '{pName}_{tagger}'.format(pName=pName, tagger=tagger), -99)
+                fill(tree, name, -99)
                 
-    for pdgid in pdgids:
+    for pdgid, name in zip(pdgids, names(pName, tuple(pdgids))):
         component = jet.constituents.get(pdgid, None)
         if component is not None:
-            fillComponent(tree,
-                          '{pName}_{pdgid:d}'.format(pName=pName, pdgid=pdgid),
-                          component )
+            fillComponent(tree, name, component )
         else:
             import pdb; pdb.set_trace()
             print jet
@@ -123,9 +161,10 @@ def bookIso(tree, pName):
     var(tree, '{pName}_num'.format(pName=pName))    
     
 def fillIso(tree, pName, iso):
-    fill(tree, '{pName}_e'.format(pName=pName), iso.sume )
-    fill(tree, '{pName}_pt'.format(pName=pName), iso.sumpt )
-    fill(tree, '{pName}_num'.format(pName=pName), iso.num )    
+    e, pt, num = names(pName, ('e', 'pt', 'num'))
+    fill(tree, e, iso.sume )
+    fill(tree, pt, iso.sumpt )
+    fill(tree, num, iso.num )
 
 def bookLepton( tree, pName, pflow=True ):
     bookParticle(tree, pName )
@@ -135,14 +174,15 @@ def bookLepton( tree, pName, pflow=True ):
     bookIso(tree, '{pName}_iso'.format(pName=pName))
         
         
+iso_names = tuple('iso_{pdgid:d}'.format(pdgid=pdgid) for pdgid in iso_pdgids)
+iso_suffixes = tuple('iso{pdgid:d}'.format(pdgid=pdgid) for pdgid in iso_pdgids)
+
 def fillLepton( tree, pName, lepton ):
     fillParticle(tree, pName, lepton )
-    for pdgid in iso_pdgids:
-        #import pdb; pdb.set_trace()
-        isoname='iso_{pdgid:d}'.format(pdgid=pdgid)
+    for isoname, isoPName in zip(iso_names, names(pName, iso_suffixes)):
         if hasattr(lepton, isoname):
             iso = getattr(lepton, isoname)
-            fillIso(tree, '{pName}_iso{pdgid:d}'.format(pName=pName, pdgid=pdgid), iso)
+            fillIso(tree, isoPName, iso)
     #fillIso(tree, '{pName}_iso'.format(pName=pName), lepton.iso)
     
         
@@ -162,9 +202,10 @@ def bookResonance(pName, tree):
 
 def fillResonance(tree, pName, resonance):
     fillParticle(tree, pName, resonance)
-    fill(tree, '{pName}_acol'.format(pName=pName), resonance.acollinearity() )
-    fill(tree, '{pName}_acop'.format(pName=pName), resonance.acoplanarity() )
-    fill(tree, '{pName}_cross'.format(pName=pName), resonance.cross() )
+    acol, acop, cross = names(pName, ('acol', 'acop', 'cross'))
+    fill(tree, acol, resonance.acollinearity() )
+    fill(tree, acop, resonance.acoplanarity() )
+    fill(tree, cross, resonance.cross() )
    
 def bookZed(tree, pName):
     bookResonance(pName, tree)
@@ -173,8 +214,9 @@ def bookZed(tree, pName):
 
 def fillZed(tree, pName, zed):
     fillResonance(tree, pName, zed)
-    fillLepton(tree, '{pName}_1'.format(pName=pName), zed.leg1() )
-    fillLepton(tree, '{pName}_2'.format(pName=pName), zed.leg2() )
+    leg1, leg2 = names(pName, ('1', '2'))
+    fillLepton(tree, leg1, zed.leg1() )
+    fillLepton(tree, leg2, zed.leg2() )
 
 def bookHbb(tree, pName):
     bookResonance(pName, tree)
@@ -183,8 +225,9 @@ def bookHbb(tree, pName):
 
 def fillHbb(tree, pName, higgs):
     fillResonance(tree, pName, higgs)
-    fillParticle(tree, '{pName}_1'.format(pName=pName), higgs.leg1() )
-    fillParticle(tree, '{pName}_2'.format(pName=pName), higgs.leg2() )
+    leg1, leg2 = names(pName, ('1', '2'))
+    fillParticle(tree, leg1, higgs.leg1() )
+    fillParticle(tree, leg2, higgs.leg2() )
 
 def bookMet(tree, pName):
     var(tree, '{pName}_pt'.format(pName=pName)  )
@@ -192,8 +235,9 @@ def bookMet(tree, pName):
     var(tree, '{pName}_phi'.format(pName=pName)  )
 
 def fillMet(tree, pName, met):
-    fill(tree, '{pName}_pt'.format(pName=pName), met.pt() )
-    fill(tree, '{pName}_sumet'.format(pName=pName), met.sum_et() )
-    fill(tree, '{pName}_phi'.format(pName=pName), met.phi() )
+    pt, sumet, phi = names(pName, ('pt', 'sumet', 'phi'))
+    fill(tree, pt, met.pt() )
+    fill(tree, sumet, met.sum_et() )
+    fill(tree, phi, met.phi() )
 
 
@@ -0,0 +1,79 @@
+import unittest
+import os
+import copy
+import shutil
+import tempfile
+import logging
+from CachedSequence import CachedSequence
+from heppy.framework.analyzer import Analyzer
+from heppy.framework.looper import Looper
+import heppy.framework.config as cfg
+from heppy.test.text_example_cfg import config, text
+
+
+class Square(Analyzer):
+    '''Counts the processed events, and stores a reference to itself
+    in the event, as done by PapasSim'''
+
+    def beginLoop(self, setup):
+        super(Square, self).beginLoop(setup)
+        self.nprocessed = 0
+
+    def process(self, event):
+        self.nprocessed += 1
+        event.square = event.x1 ** self.cfg_ana.power
+        event.squarer = self
+        return event.x1 % 10 != 0
+
+
+class CachedSequenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        logging.disable(logging.CRITICAL)
+        self.square = cfg.Analyzer(Square, power=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        logging.disable(logging.NOTSET)
+
+    def run_loop(self, name, square):
+        cached = cfg.Analyzer(
+            CachedSequence,
+            sequence=[text, square],
+            cache_dir=os.path.join(self.outdir, 'cache')
+        )
+        cached_config = copy.copy(config)
+        cached_config.sequence = cfg.Sequence([cached])
+        loop = Looper(os.path.join(self.outdir, name), cached_config,
+                      nPrint=0, timeReport=False)
+        loop.loop()
+        loop.write()
+        return loop, loop.analyzer(cached.name)
+
+    def test_replay(self):
+        loop, cached = self.run_loop('first', self.square)
+        self.assertEqual(cached.analyzers[1].nprocessed, 100)
+        loop.process(12)
+        self.assertEqual(loop.event.square, 144)
+        loop, cached = self.run_loop('second', self.square)
+        self.assertEqual(cached.analyzers[1].nprocessed, 0)
+        self.assertEqual(cached.counters['cache']['Read from cache'][1], 100)
+        # the events rejected by the sequence are rejected again
+        self.assertEqual(loop.analyzer_counter[cached.name][1], 90)
+        self.assertEqual(loop.process(12), (True, cached.name))
+        self.assertEqual(loop.event.x1, 12)
+        self.assertEqual(loop.event.square, 144)
+        self.assertTrue(loop.event.squarer is cached.analyzers[1])
+        self.assertEqual(loop.process(20), (False, cached.name))
+
+    def test_config_change(self):
+        self.run_loop('first', self.square)
+        loop, cached = self.run_loop('second', self.square.clone(power=3))
+        self.assertEqual(cached.analyzers[1].nprocessed, 100)
+        loop.process(2)
+        self.assertEqual(loop.event.square, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
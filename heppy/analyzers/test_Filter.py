@@ -4,6 +4,7 @@ import shutil
 import tempfile
 from Selector import Selector 
 from heppy.framework.event import Event
+from heppy.particles.particlearray import ParticleArray
 import heppy.framework.config as cfg
 
 class SelectorTestCase(unittest.TestCase):
@@ -47,6 +48,26 @@ class SelectorTestCase(unittest.TestCase):
         filter = Selector(cfg_ana, cfg_comp, self.outdir)
         filter.process(event)
         self.assertDictEqual(event.filtered, {3:9})
+
+    def test_particle_array(self):
+        event = Event(0)
+        event.ptcs = ParticleArray(range(10), [0]*10, [0]*10, range(1, 11),
+                                   [211]*10, [1]*10)
+        cfg_ana = cfg.Analyzer(
+            Selector,
+            output = 'filtered',
+            input_objects = 'ptcs',
+            array_filter_func = lambda ptcs : ptcs.e() > 5,
+            nmax = 3
+            )
+        cfg_comp = cfg.Component(
+            'test',
+            files = []
+            )
+        filter = Selector(cfg_ana, cfg_comp, self.outdir)
+        filter.process(event)
+        self.assertTrue(isinstance(event.filtered, ParticleArray))
+        self.assertEqual(list(event.filtered.e()), [6, 7, 8])
         
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+'''Benchmark of the read-ahead of the input events.
+
+Usage:
+    python bench_prefetch.py [latency_ms processing_ms]
+
+The input is emulated by an events backend for which reading an entry
+takes latency_ms, unless the entry has already been read by any process,
+as for a network-mounted file going through the operating system cache.
+The processing of each event takes processing_ms.
+The wall time per event is printed for the synchronous reading,
+and for the read-ahead with several depths.
+'''
+import sys
+import time
+import timeit
+import multiprocessing
+from heppy.framework.prefetch import ReadAhead
+
+NEVENTS = 200
+
+
+class SlowEvents(object):
+    '''Events with a read latency, and a cache shared by all processes'''
+
+    def __init__(self, cache, latency):
+        self.cache = cache
+        self.latency = latency
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __getitem__(self, index):
+        if not self.cache[index]:
+            time.sleep(self.latency)
+            self.cache[index] = 1
+        return index
+
+
+def run(latency, processing, depth):
+    '''Returns the wall time per event'''
+    cache = multiprocessing.Array('b', NEVENTS)
+    open_events = lambda: SlowEvents(cache, latency)
+    events = open_events()
+    start = timeit.default_timer()
+    read_ahead = ReadAhead(open_events, depth, 0) if depth else None
+    for index in range(NEVENTS):
+        events[index]
+        time.sleep(processing)
+        if read_ahead:
+            read_ahead.done()
+    if read_ahead:
+        read_ahead.stop()
+    return (timeit.default_timer() - start) / NEVENTS
+
+
+def main(latency, processing):
+    print 'read latency {:.1f} ms, processing {:.1f} ms'.format(latency*1e3, processing*1e3)
+    print '{:>8} {:>12}'.format('depth', 'ms/event')
+    for depth in [0, 1, 2, 10]:
+        print '{:>8} {:>12.2f}'.format(depth if depth else 'sync',
+                                       run(latency, processing, depth) * 1e3)
+
+
+if __name__ == '__main__':
+    latency, processing = 2e-3, 3e-3
+    if len(sys.argv) > 2:
+        latency, processing = [float(arg) * 1e-3 for arg in sys.argv[1:3]]
+    main(latency, processing)
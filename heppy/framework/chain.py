@@ -5,6 +5,7 @@ import glob
 import os
 import pprint
 from ROOT import TChain, TFile, TTree, gSystem
+from heppy.framework.fileindex import FileIndex
 
 #TODO should use eostools
 def is_pfn(fn):
@@ -30,9 +31,46 @@ class Chain( object ):
 
        for event in the_chain:
            print event.var1
+
+    Branch learning:
+
+    By default, all branches are read for each event.
+    With the learn_branches option, the branches accessed as attributes
+    of the chain, e.g. event3.var1, are recorded for the first learn_branches
+    events. Then, only these branches are read. A branch accessed
+    later on is enabled on the fly, and the current event is read again.
+    The list of the branches is written to the branches_file option,
+    if given, and read from this file when creating the chain,
+    so that the next runs only read the listed branches from the start.
+    The options can be set in the component of the configuration file::
+
+       comp.options = dict(learn_branches=100,
+                           branches_file=os.path.join(os.path.dirname(__file__),
+                                                      'branches.txt'))
+
+    The numbers of bytes read per event before and after the learning are
+    given by read_report.
+    The branches given by name to the GetBranch, GetLeaf, SetBranchAddress
+    and SetBranchStatus methods are also recorded, or enabled.
+    The branches read by other means, e.g. TTree::Draw or a TTreeFormula,
+    are not recorded, and are disabled after the learning:
+    they must be listed in the branches_file.
+
+    File index:
+
+    With the file_index option, the tree name and the number of entries
+    of each file are taken from this index, see heppy.framework.fileindex,
+    and the files are not opened when the chain is created.
     """
 
-    def __init__(self, input_filenames, tree_name=None):
+    # the Looper passes the file_index of the component in the options
+    file_index_option = True
+
+    # TChain methods taking a branch name as first argument
+    branch_methods = set(['GetBranch', 'GetLeaf', 'SetBranchAddress',
+                          'SetBranchStatus'])
+
+    def __init__(self, input_filenames, tree_name=None, options=None):
         """
         Create a chain.
 
@@ -43,6 +81,10 @@ class Chain( object ):
           tree_name = key of the tree in each file.
                       if None and if each file contains only one TTree,
                       this TTree is used.
+          options   = dictionary of options, see branch learning above:
+                      learn_branches: number of events read with all branches.
+                      branches_file: file storing the list of the branches read.
+                      file_index: json file indexing the input files.
         """
         self.files = input_filenames
         if isinstance(input_filenames, basestring): # input is a pattern
@@ -57,11 +99,43 @@ class Chain( object ):
                 err = 'at least one input file does not exist\n'
                 err += pprint.pformat(self.files)
                 raise ValueError(err)
+        if options is None:
+            options = dict()
+        index = None
+        if options.get('file_index'):
+            index = FileIndex(options['file_index']).update(self.files)
         if tree_name is None:
-            tree_name = self._guessTreeName(input_filenames)
+            if index is not None:
+                tree_name = index.tree_name(self.files)
+            else:
+                tree_name = self._guessTreeName(input_filenames)
         self.chain = TChain(tree_name)
         for file in self.files:
-            self.chain.Add(file)
+            if index is not None:
+                # with a known number of entries, the file is only
+                # opened when its entries are read
+                self.chain.Add(file, index.entries(file, tree_name))
+            else:
+                self.chain.Add(file)
+        self._learn_branches = options.get('learn_branches', 0)
+        self._branches_file = options.get('branches_file', None)
+        # branches not read, for the branches accessed to be enabled on the fly
+        self._disabled = set()
+        self._selected = False
+        self._learning = False
+        # with branch learning, the chain returns itself as the event
+        # to keep track of the branches accessed.
+        self._tracking = bool(self._learn_branches or self._branches_file)
+        self._index = None
+        self._nbytes = dict(all=0, selected=0)
+        self._nentries = dict(all=0, selected=0)
+        if self._branches_file and os.path.isfile(self._branches_file):
+            with open(self._branches_file) as infile:
+                self._select_branches([line.strip() for line in infile
+                                       if line.strip()])
+        elif self._learn_branches > 0:
+            self._learning = True
+            self._accessed = set()
 
     def _guessTreeName(self, pattern):
         """
@@ -93,8 +167,86 @@ class Chain( object ):
         """
         All functions of the wrapped TChain are made available
         """
+        if attr.startswith('_'):
+            # e.g. the private attributes before they are set
+            raise AttributeError(attr)
+        if attr in self.branch_methods and (self._learning or self._disabled):
+            method = getattr(self.chain, attr)
+            def call(name, *args):
+                # top-level branch of e.g. 'jets.pt'
+                self._use_branch(name.split('.')[0])
+                return method(name, *args)
+            return call
+        self._use_branch(attr)
         return getattr(self.chain, attr)
 
+    def _use_branch(self, name):
+        '''records branch name when learning, or enables it if disabled'''
+        if self._learning:
+            self._accessed.add(name)
+        elif name in self._disabled:
+            self._enable_branch(name)
+
+    def _branch_names(self):
+        '''names of the top-level branches of the tree'''
+        if self.chain.GetTree() == None:
+            self.chain.LoadTree(0)
+        return set(branch.GetName() for branch in self.chain.GetListOfBranches())
+
+    def _set_branch_status(self, name, status):
+        '''sets the status of branch name and of its sub-branches'''
+        self.chain.SetBranchStatus(name, status)
+        branch = self.chain.GetBranch(name)
+        if branch and branch.GetListOfBranches().GetEntries():
+            self.chain.SetBranchStatus(name + '.*', status)
+
+    def _select_branches(self, names):
+        '''only reads the branches in names'''
+        all_names = self._branch_names()
+        names = all_names & set(names)
+        self.chain.SetBranchStatus('*', 0)
+        for name in names:
+            self._set_branch_status(name, 1)
+        self._disabled = all_names - names
+        self._selected = True
+
+    def _enable_branch(self, name):
+        '''enables branch name, and reads the current event again'''
+        self._set_branch_status(name, 1)
+        self._disabled.discard(name)
+        if self._index is not None:
+            self.chain.GetEntry(self._index)
+        self._write_branches()
+
+    def _write_branches(self):
+        if self._branches_file:
+            all_names = self._branch_names()
+            with open(self._branches_file, 'w') as outfile:
+                for name in sorted(all_names - self._disabled):
+                    outfile.write(name + '\n')
+
+    def _end_learning(self):
+        '''only reads the branches accessed until now.
+        If no branch was accessed, e.g. in a process reading events ahead,
+        all branches are kept.'''
+        self._learning = False
+        accessed = self._accessed & self._branch_names()
+        if not accessed:
+            return
+        self._select_branches(accessed)
+        self._write_branches()
+
+    def read_report(self):
+        '''Returns a string giving the number of bytes read per event,
+        with all branches and with the selected branches'''
+        lines = ['{} branches disabled'.format(len(self._disabled))]
+        for mode in ['all', 'selected']:
+            nentries = self._nentries[mode]
+            if nentries:
+                lines.append('{:>8} branches: {:>8} events, {:>10.1f} bytes/event'.format(
+                    mode, nentries, self._nbytes[mode] / float(nentries)))
+        return '\n'.join(lines)
+
     def __iter__(self):
         return iter(self.chain)
 
@@ -105,7 +257,13 @@ class Chain( object ):
         """
         Returns the event at position index.
         """
-        self.chain.GetEntry(index)
-        return self.chain
+        if self._learning and self._nentries['all'] >= self._learn_branches:
+            self._end_learning()
+        nbytes = self.chain.GetEntry(index)
+        self._index = index
+        mode = 'selected' if self._selected else 'all'
+        self._nbytes[mode] += nbytes
+        self._nentries[mode] += 1
+        return self if self._tracking else self.chain
 
 
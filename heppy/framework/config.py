@@ -5,6 +5,7 @@ from weight import Weight
 import glob
 import analyzer
 import copy
+from fileindex import FileIndex
 import dill  # necessary for lambdas in configuration objects
 
 def printComps(comps, details=False):
@@ -41,7 +42,15 @@ def split(comps):
 
     splitComps = []
     for comp in comps:
-        if hasattr( comp, 'fineSplitFactor') and comp.fineSplitFactor>1:
+        if getattr( comp, 'file_index', None) is not None:
+            nchunks = getattr(comp, 'splitFactor', 1)
+            if getattr(comp, 'fineSplitFactor', 1) > 1:
+                nchunks = len(comp.files) * comp.fineSplitFactor
+            if nchunks > 1:
+                splitComps.extend( split_events(comp, nchunks) )
+            else:
+                splitComps.append( comp )
+        elif hasattr( comp, 'fineSplitFactor') and comp.fineSplitFactor>1:
             subchunks = range(comp.fineSplitFactor)
             for ichunk, chunk in enumerate([(f,i) for f in comp.files for i in subchunks]):
                 newComp = copy.deepcopy(comp)
@@ -66,6 +75,47 @@ def split(comps):
     return splitComps
 
 
+def split_events(comp, nchunks):
+    '''splits component comp in nchunks chunks with the same number of events.
+
+    The number of events in each file is taken from the file index
+    of the component, see heppy.framework.fileindex.
+    Each chunk gets the files containing its events, and an eventRange
+    attribute (first, number) locating these events in the chain of its files.
+    The eventOrigin attribute (comp name, index) gives the index in comp 
+    of the first event of these files.
+    '''
+    index = FileIndex(comp.file_index).update(comp.files)
+    tree_name = getattr(comp, 'tree_name', None)
+    if tree_name is None:
+        tree_name = index.tree_name(comp.files)
+    # position of the first event of each file in the chain of all files
+    starts = [0]
+    for fname in comp.files:
+        starts.append(starts[-1] + index.entries(fname, tree_name))
+    total = starts[-1]
+    splitComps = []
+    for ichunk in range(nchunks):
+        first = ichunk * total / nchunks
+        last = (ichunk + 1) * total / nchunks
+        if last == first:
+            continue
+        ifiles = [i for i in range(len(comp.files))
+                  if starts[i] < last and starts[i+1] > first]
+        newComp = copy.deepcopy(comp)
+        newComp.files = [comp.files[i] for i in ifiles]
+        newComp.eventRange = (first - starts[ifiles[0]], last - first)
+        # the events of the chunk files start at this index in comp
+        newComp.eventOrigin = (comp.name, starts[ifiles[0]])
+        newComp.name = '{name}_Chunk{index}'.format(name=newComp.name,
+                                                    index=len(splitComps))
+        splitComps.append( newComp )
+    if not splitComps:
+        # no event in the component
+        splitComps.append( comp )
+    return splitComps
+
+
 class CFG(object):
     '''Base configuration class. The attributes are used to store parameters of any type'''
     def __init__(self, **kwargs):
@@ -293,6 +343,10 @@ class Component( CFG ):
         
         * tree_name:  name of your tree in your root files (is that used?)
         * triggers:   list of trigger names to be used for this component
+        * file_index: path of the json index of the files,
+                      see heppy.framework.fileindex.
+                      The component is then split in chunks with equal
+                      numbers of events.
         '''
         if isinstance(triggers, basestring):
             triggers = [triggers]
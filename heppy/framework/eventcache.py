@@ -0,0 +1,253 @@
+'''On-disk cache of the event attributes produced by a sequence of analyzers,
+used by heppy.analyzers.CachedSequence.
+
+The cache of a sequence is a directory named after a key computed by cache_key
+from:
+- the configuration of the analyzers of the sequence, including the code,
+  default arguments, closure cells and referenced globals of the functions
+  it contains, e.g. a filter_func;
+- the source code of the modules of the package of each analyzer class
+  reachable from the module of the class, e.g. heppy.papas.simulator for
+  heppy.analyzers.PapasSim. The modules of other packages are not hashed;
+- the input files of the component, identified by their path, size
+  and modification time;
+- the versions of the software recorded by heppy.utils.versions.Versions,
+  if the configuration provides them.
+Changing any of them gives a new key, so that the events are processed again.
+
+Each process writing to the cache writes its own segment: a data file with
+the compressed pickles of the events, and an index file giving the position
+of each event in the data file. The index is written when the segment is closed,
+so that an interrupted job does not leave incomplete events in the cache.
+'''
+
+import os
+import re
+import sys
+import glob
+import zlib
+import types
+import socket
+import hashlib
+import inspect
+import tempfile
+import dill
+import pickle
+
+
+class EventCache(object):
+    '''Cache of per-event data, stored in directory dirname.
+
+    Usage::
+
+       cache = EventCache(dirname)
+       data = cache.get(iEv)
+       if data is None:
+           data = compute(iEv)
+           cache.put(iEv, data)
+       cache.close()
+    '''
+
+    def __init__(self, dirname):
+        self.dirname = dirname
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # created by another process in the meanwhile
+                if not os.path.isdir(dirname):
+                    raise
+        # event index -> (data file name, offset, size)
+        self.index = dict()
+        for idxname in sorted(glob.glob(os.path.join(dirname, '*.idx'))):
+            datname = idxname.replace('.idx', '.dat')
+            with open(idxname) as infile:
+                for iEv, (offset, size) in pickle.load(infile).iteritems():
+                    self.index[iEv] = (datname, offset, size)
+        self._segment = None
+        self._segment_name = None
+        self._segment_index = dict()
+        self._infiles = dict()
+
+    def __contains__(self, iEv):
+        return iEv in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, iEv):
+        '''Returns the data of event iEv, or None if it is not in the cache.'''
+        location = self.index.get(iEv)
+        if location is None:
+            return None
+        datname, offset, size = location
+        if self._segment is not None and datname == self._segment_name:
+            self._segment.flush()
+        infile = self._infiles.get(datname)
+        if infile is None:
+            infile = self._infiles[datname] = open(datname, 'rb')
+        infile.seek(offset)
+        return pickle.loads(zlib.decompress(infile.read(size)))
+
+    def put(self, iEv, data):
+        '''Stores the data of event iEv.'''
+        if self._segment is None:
+            prefix = '{}_{}_'.format(socket.gethostname(), os.getpid())
+            fd, self._segment_name = tempfile.mkstemp(prefix=prefix, suffix='.dat',
+                                                      dir=self.dirname)
+            self._segment = os.fdopen(fd, 'wb')
+        blob = zlib.compress(pickle.dumps(data, protocol=-1))
+        offset = self._segment.tell()
+        self._segment.write(blob)
+        self._segment_index[iEv] = (offset, len(blob))
+        self.index[iEv] = (self._segment_name, offset, len(blob))
+
+    def close(self):
+        '''Writes the index of the events stored by put.'''
+        for infile in self._infiles.values():
+            infile.close()
+        self._infiles = dict()
+        if self._segment is None:
+            return
+        datname = self._segment_name
+        self._segment.close()
+        tmpname = datname.replace('.dat', '.tmp')
+        with open(tmpname, 'wb') as outfile:
+            pickle.dump(self._segment_index, outfile, protocol=-1)
+        os.rename(tmpname, datname.replace('.dat', '.idx'))
+        self._segment = None
+        self._segment_index = dict()
+
+
+def cache_key(cfg_anas, cfg_comp, versions=None):
+    '''Returns the key of the cache of the analyzers configured by cfg_anas
+    processing the files of component cfg_comp.
+
+    @param versions: heppy.utils.versions.Versions object, or None.
+    '''
+    sha = hashlib.sha1()
+    for cfg_ana in cfg_anas:
+        sha.update(_describe(cfg_ana))
+        for sourcefile in _source_files(cfg_ana.class_object):
+            with open(sourcefile) as source:
+                sha.update(source.read())
+    for fname in cfg_comp.files:
+        sha.update(fname)
+        if os.path.isfile(fname):
+            stat = os.stat(fname)
+            sha.update(repr((os.path.abspath(fname), stat.st_size, stat.st_mtime)))
+    sha.update(repr(getattr(cfg_comp, 'tree_name', None)))
+    if versions is not None:
+        sha.update(repr(sorted(versions.tracked.iteritems())))
+    return sha.hexdigest()
+
+
+def _source_files(class_object):
+    '''Returns the source files of the modules of the package of class_object,
+    e.g. heppy, reachable from the module of the class through the modules,
+    classes and functions of their namespaces, sorted by module name.'''
+    module = inspect.getmodule(class_object)
+    if module is None:
+        return []
+    package = module.__name__.split('.')[0] + '.'
+    def in_package(mod):
+        return mod is not None and (mod.__name__ + '.').startswith(package)
+    modules = dict()
+    pending = [module]
+    while pending:
+        module = pending.pop()
+        if module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                mod = value
+            else:
+                mod = sys.modules.get(getattr(value, '__module__', None) or '')
+            if in_package(mod) and mod.__name__ not in modules:
+                pending.append(mod)
+    sourcefiles = []
+    for name, module in sorted(modules.iteritems()):
+        try:
+            sourcefile = inspect.getsourcefile(module)
+        except TypeError:
+            # built-in module
+            sourcefile = None
+        if sourcefile and os.path.isfile(sourcefile):
+            sourcefiles.append(sourcefile)
+    return sourcefiles
+
+
+def _code_names(code):
+    '''names used by code and by the code objects nested in code'''
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _describe_code(code, seen):
+    '''bytecode, names and constants of code, with its nested code objects'''
+    consts = [_describe_code(const, seen) if isinstance(const, types.CodeType)
+              else _describe(const, seen)
+              for const in code.co_consts]
+    return 'code({},{},{})'.format(code.co_code.encode('hex'),
+                                   ','.join(code.co_names),
+                                   ','.join(consts))
+
+
+def _cell_contents(cell):
+    try:
+        return cell.cell_contents
+    except ValueError:
+        # empty cell
+        return '<empty cell>'
+
+
+_ADDRESS = re.compile(' at 0x[0-9a-fA-F]+')
+
+# configuration attributes not changing the output of the analyzers
+_IGNORED_ATTRS = set(['verbose', 'log_level'])
+
+
+def _describe(value, seen=None):
+    '''Returns a string describing value, which does not depend on the memory
+    addresses of the objects, to be hashed in cache_key.'''
+    if seen is None:
+        seen = set()
+    if isinstance(value, (int, long, float, bool, basestring, types.NoneType)):
+        return repr(value)
+    if id(value) in seen:
+        return '<cycle>'
+    seen = seen | set([id(value)])
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_describe(item, seen) for item in value]
+        if isinstance(value, (set, frozenset)):
+            items.sort()
+        return '{}({})'.format(type(value).__name__, ','.join(items))
+    if isinstance(value, dict):
+        return 'dict({})'.format(','.join(sorted(
+            '{}:{}'.format(_describe(key, seen), _describe(item, seen))
+            for key, item in value.iteritems())))
+    if isinstance(value, types.ModuleType):
+        return 'module({})'.format(value.__name__)
+    if isinstance(value, (types.FunctionType, types.MethodType)):
+        func = getattr(value, 'im_func', value)
+        code = func.func_code
+        cells = [_cell_contents(cell) for cell in func.func_closure or ()]
+        # globals referenced by the function, the builtins are not described
+        refs = dict((name, func.func_globals[name])
+                    for name in _code_names(code) if name in func.func_globals)
+        return 'function({}.{},{},{},{},{})'.format(
+            func.__module__, func.__name__, _describe_code(code, seen),
+            _describe(func.func_defaults, seen), _describe(cells, seen),
+            _describe(refs, seen))
+    if isinstance(value, (type, types.ClassType)):
+        return 'class({}.{})'.format(value.__module__, value.__name__)
+    if hasattr(value, '__dict__'):
+        attrs = dict((key, item) for key, item in vars(value).iteritems()
+                     if key not in _IGNORED_ATTRS)
+        return '{}.{}{}'.format(type(value).__module__, type(value).__name__,
+                                _describe(attrs, seen))
+    return _ADDRESS.sub('', repr(value))
@@ -0,0 +1,137 @@
+'''Index of the metadata of the input files of a dataset.
+
+For each file, the index stores the names and numbers of entries of the
+TTrees, together with the size and modification time of the file.
+The index is kept in a json file, built once for the dataset, and
+reused by:
+- split, to make chunks with equal numbers of events,
+  see heppy.framework.config.split;
+- Chain, which does not need to open the files to find the tree name
+  and the number of entries.
+
+To use an index, set the file_index attribute of the component,
+e.g.::
+
+   comp.file_index = 'ee_ZZ_index.json'
+
+The files missing from the index are scanned with ROOT, and the index file
+is written again. A local file is scanned again if its size or modification
+time changed. The remote files (root://, /store) cannot be checked, and their
+entry in the index is always considered up to date.
+'''
+
+import os
+import json
+import tempfile
+
+
+def _is_local(fname):
+    return not (fname.startswith('/store') or '://' in fname)
+
+
+class FileIndex(object):
+    '''Metadata of a set of files, stored in a json file.
+
+    Usage::
+
+       index = FileIndex('index.json').update(files)
+       tree_name = index.tree_name(files)
+       nentries = index.entries(files[0], tree_name)
+    '''
+
+    def __init__(self, path):
+        '''
+        @param path: path of the json file. The index is read from this file
+          if it exists.
+        '''
+        self.path = path
+        self.files = dict()
+        if os.path.isfile(path):
+            with open(path) as infile:
+                self.files = json.load(infile)['files']
+
+    @staticmethod
+    def _key(fname):
+        '''local files are indexed by absolute path'''
+        return os.path.abspath(fname) if _is_local(fname) else fname
+
+    @staticmethod
+    def _stat(fname):
+        '''size and modification time of a local file, None otherwise'''
+        if not _is_local(fname):
+            return None
+        stat = os.stat(fname)
+        return stat.st_size, stat.st_mtime
+
+    def get(self, fname):
+        '''Returns the metadata of fname, or None if fname is not in the index
+        or if the file changed since it was indexed.'''
+        info = self.files.get(self._key(fname))
+        if info is None:
+            return None
+        stat = self._stat(fname)
+        if stat is not None and (info['size'], info['mtime']) != stat:
+            return None
+        return info
+
+    def set(self, fname, trees):
+        '''Sets the metadata of fname.
+
+        @param trees: dictionary giving the number of entries for each tree name.
+        '''
+        info = dict(trees=dict(trees))
+        stat = self._stat(fname)
+        if stat is not None:
+            info['size'], info['mtime'] = stat
+        self.files[self._key(fname)] = info
+
+    def update(self, fnames):
+        '''Scans the files which are missing or out of date,
+        and writes the index if needed.
+        Returns self.'''
+        missing = [fname for fname in fnames if self.get(fname) is None]
+        for fname in missing:
+            self.set(fname, _scan(fname))
+        if missing:
+            self.write()
+        return self
+
+    def write(self):
+        '''Writes the index to its json file.
+        The file is replaced atomically, as several jobs may update
+        the index of a dataset at the same time.'''
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        fd, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        with os.fdopen(fd, 'w') as out:
+            json.dump(dict(files=self.files), out, indent=1, sort_keys=True)
+        os.rename(tmpname, self.path)
+
+    def tree_name(self, fnames):
+        '''Returns the name of the TTree present in all files,
+        or raises ValueError if there is not exactly one.'''
+        names = set()
+        for fname in fnames:
+            names.update(self.get(fname)['trees'])
+        if len(names) != 1:
+            raise ValueError('several TTree keys in the files:\n' +
+                             ','.join(sorted(names)))
+        return names.pop()
+
+    def entries(self, fname, tree_name):
+        '''Returns the number of entries of tree tree_name in file fname.'''
+        return self.get(fname)['trees'][tree_name]
+
+
+def _scan(fname):
+    '''Returns the number of entries of each TTree in fname'''
+    from ROOT import TFile, TTree
+    rfile = TFile.Open(fname)
+    if not rfile or rfile.IsZombie():
+        raise IOError('cannot open ' + fname)
+    trees = dict()
+    for key in rfile.GetListOfKeys():
+        obj = rfile.Get(key.GetName())
+        if type(obj) is TTree:
+            trees[key.GetName()] = int(obj.GetEntries())
+    rfile.Close()
+    return trees
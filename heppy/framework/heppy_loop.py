@@ -54,13 +54,23 @@ def runLoop( comp, outDir, config, cfgFileName, options):
     # import pdb; pdb.set_trace()
     config.components = [comp]
     memcheck = 2 if getattr(options,'memCheck',False) else -1
+    nworkers = getattr(options, 'nworkers', 1)
+    profile = getattr(options, 'profile', False)
+    cprofile = getattr(options, 'cprofile', False)
+    prefetch = getattr(options, 'prefetch', 0)
+    schedule = getattr(options, 'schedule', False)
     loop = Looper( fullName,
                    config,
                    options.nevents, 0,
                    nPrint = options.nprint, 
                    quiet = options.quiet,
                    memCheckFromEvent = memcheck,
-                   stopFlag = _globalGracefulStopFlag
+                   stopFlag = _globalGracefulStopFlag,
+                   nWorkers = nworkers,
+                   profile = profile,
+                   cprofile = cprofile,
+                   prefetch = prefetch,
+                   schedule = schedule
                    )
     shutil.copy( cfgFileName, loop.outDir )
     shutil.copy( cfgFileName, '/'.join([loop.outDir, '__cfg_to_run__.py'] ) )            
@@ -234,11 +244,36 @@ def create_parser():
                       type="int",
                       help="number of parallel tasks to span",
                       default=10)
+    parser.add_option("-w", "--nworkers",
+                      dest="nworkers",
+                      type="int",
+                      help="number of worker processes used to process the events of a component. Only used when a single component is processed.",
+                      default=1)
     parser.add_option("--memcheck", 
                       dest="memCheck",
                       action='store_true',
                       help="Activate memory checks per event",
                       default=False)
+    parser.add_option("--profile", 
+                      dest="profile",
+                      action='store_true',
+                      help="Record the processing time of each analyzer for each event, and write a timing summary and collapsed stacks to the output directory",
+                      default=False)
+    parser.add_option("--cprofile", 
+                      dest="cprofile",
+                      action='store_true',
+                      help="Same as --profile, and profile each analyzer with cProfile",
+                      default=False)
+    parser.add_option("--prefetch", 
+                      dest="prefetch",
+                      type="int",
+                      help="number of events read ahead of the event loop by a background process, to hide the read latency. 0 to read the events synchronously",
+                      default=0)
+    parser.add_option("--schedule", 
+                      dest="schedule",
+                      action='store_true',
+                      help="Remove the analyzers whose outputs are not used, and move the filters as early as possible in the sequence",
+                      default=False)
     parser.add_option("-t", "--trackversions", 
                       dest="track_versions",
                       help="list of the python packages to track, e.g. heppy,my_package",
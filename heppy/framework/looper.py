@@ -19,9 +19,17 @@ import json
 import dill
 import pickle
 import copy
+import shutil
+import traceback
+import multiprocessing
+import Queue
 
 from event import Event
 from heppy.framework.exceptions import UserStop
+from heppy.framework.merging import merge_dirs
+from heppy.framework.profiling import AnalyzerProfiler
+from heppy.framework.prefetch import ReadAhead
+from heppy.framework.scheduler import Scheduler
 from heppy.statistics.counter import Counter
 
 class Setup(object):
@@ -69,7 +77,12 @@ class Looper(object):
                   timeReport=True,
                   quiet=False,
                   memCheckFromEvent=-1,
-                  stopFlag = None):
+                  stopFlag = None,
+                  nWorkers=1,
+                  profile=False,
+                  cprofile=False,
+                  prefetch=0,
+                  schedule=False):
         """Handles the processing of an event sample.
         An Analyzer is built for each Config.Analyzer present
         in sequence. The Looper can then be used to process an event,
@@ -87,6 +100,30 @@ class Looper(object):
                   a graceful job termination. In this case, the looper will also
                   set up a signal handler for SIGUSR2.
                   (if set to None, nothing of all this happens)
+        nWorkers: number of worker processes used to process the events.
+                  If larger than 1, the events are split in nWorkers contiguous ranges,
+                  each processed by a worker process with its own Looper and analyzers
+                  in a subdirectory of the output directory.
+                  The outputs of the workers (counters, averages, root files)
+                  are merged into the output directory by Looper.write, and the
+                  time reports and analyzer counters are merged in this Looper.
+                  Only possible if the events backend supports indexing.
+                  Without RandomStreamService, the random generators of each
+                  worker are seeded from the component name and worker index.
+        profile : if True, the processing time of each analyzer is recorded
+                  for each event, and a timing summary (quantiles, histogram,
+                  slowest events) is written to profile.json in the output directory,
+                  together with collapsed stacks for flame graphs in profile.folded.
+                  See heppy.framework.profiling.
+        cprofile: if True, the analyzers are also profiled with cProfile, 
+                  and the statistics of each analyzer are written to the output
+                  directory. Implies profile.
+        prefetch: if larger than 0, a background process reads the input events
+                  up to prefetch events ahead of the event loop, to hide the read
+                  latency. See heppy.framework.prefetch.
+        schedule: if True, the analyzers whose outputs are not used are removed
+                  from the sequence, and the filters are moved as early as possible.
+                  See heppy.framework.scheduler.
         """
 
         self.config = config
@@ -108,7 +145,13 @@ class Looper(object):
         # and in a dict for easy user access
         self._analyzer_dict = dict()
         self.analyzer_counter = Counter('analyzers')
-        for anacfg in self.config.sequence:
+        self.schedule = schedule
+        sequence = self.config.sequence
+        if schedule:
+            scheduler = Scheduler(sequence)
+            self.logger.info(str(scheduler))
+            sequence = scheduler.sequence
+        for anacfg in sequence:
             anaobj = self._build(anacfg)
             self._analyzers.append(anaobj)
             self._analyzer_dict[anacfg.name] = anaobj
@@ -117,8 +160,15 @@ class Looper(object):
         self.firstEvent = firstEvent
         self.nPrint = int(nPrint)
         self.timeReport = [ {'time':0.0,'events':0} for a in self._analyzers ] if timeReport else False
+        self.profiler = None
+        if profile or cprofile:
+            self.profiler = AnalyzerProfiler([ana.name for ana in self._analyzers],
+                                             cprofile=cprofile)
         self.memReportFirstEvent = memCheckFromEvent
         self.memLast=0
+        self.nWorkers = nWorkers
+        self.prefetch = prefetch
+        self.workerDirs = []
         self.stopFlag = stopFlag
         if stopFlag:
             import signal
@@ -126,9 +176,6 @@ class Looper(object):
                 print 'SIGUSR2 received, signaling graceful stop'
                 self.stopFlag.value = 1
             signal.signal(signal.SIGUSR2, doSigUsr2)
-        tree_name = None
-        if( hasattr(self.cfg_comp, 'tree_name') ):
-            tree_name = self.cfg_comp.tree_name
         if len(self.cfg_comp.files)==0:
             errmsg = 'please provide at least an input file in the files attribute of this component\n' + str(self.cfg_comp)
             raise ValueError( errmsg )
@@ -139,11 +186,7 @@ class Looper(object):
                                                     nEvents)
         if hasattr(self.cfg_comp,"options"):
             print self.cfg_comp.files,self.cfg_comp.options
-            self.events = config.events_class(self.cfg_comp.files,
-                                              tree_name,
-                                              options=self.cfg_comp.options)
-        else :
-            self.events = config.events_class(self.cfg_comp.files, tree_name)
+        self.events = self._open_events()
         if hasattr(self.cfg_comp, 'fineSplit'):
             fineSplitIndex, fineSplitFactor = self.cfg_comp.fineSplit
             if fineSplitFactor > 1:
@@ -155,6 +198,13 @@ class Looper(object):
                 if self.firstEvent + self.nEvents >= totevents:
                     self.nEvents = totevents - self.firstEvent 
                 #print "For component %s will process %d events starting from the %d one, ending at %d excluded" % (self.cfg_comp.name, self.nEvents, self.firstEvent, self.nEvents + self.firstEvent)
+        if hasattr(self.cfg_comp, 'eventRange'):
+            # chunk with a given number of events, see config.split_events
+            rangeFirst, rangeEvents = self.cfg_comp.eventRange
+            self.firstEvent = firstEvent + rangeFirst
+            self.nEvents = rangeEvents
+            if nEvents and int(nEvents) not in [-1,0]:
+                self.nEvents = min(rangeEvents, int(nEvents))
         # self.event is set in self.process
         self.event = None
         services = dict()
@@ -165,6 +215,9 @@ class Looper(object):
         # so that analyzers cannot modify the config of other analyzers. 
         # but cannot copy the autofill config.
         self.setup = Setup(config, services)
+        # services called before each analyzer processes an event
+        self._analyzer_services = [service for service in services.itervalues()
+                                   if hasattr(service, 'beginAnalyzer')]
 
         ######### Save processing information to output directory
 
@@ -195,6 +248,43 @@ class Looper(object):
             pickle.dump(comp_data, out)
 
 
+    def _open_events(self):
+        '''Returns a new instance of the events backend reading the component files.'''
+        tree_name = None
+        if( hasattr(self.cfg_comp, 'tree_name') ):
+            tree_name = self.cfg_comp.tree_name
+        options = getattr(self.cfg_comp, 'options', None)
+        file_index = getattr(self.cfg_comp, 'file_index', None)
+        if file_index is not None:
+            # the events backend, e.g. Chain, takes the tree name
+            # and numbers of entries from the index
+            events_class = self.config.events_class
+            if not getattr(events_class, 'file_index_option', False):
+                raise ValueError(
+                    'component {}: the events backend {} does not support '
+                    'the file_index option'.format(self.cfg_comp.name,
+                                                   events_class))
+            if options is None or isinstance(options, dict):
+                options = dict(options or {}, file_index=file_index)
+        if options is not None:
+            return self.config.events_class(self.cfg_comp.files,
+                                            tree_name,
+                                            options=options)
+        else :
+            return self.config.events_class(self.cfg_comp.files, tree_name)
+
+    def _start_read_ahead(self, firstEvent, nEvents):
+        '''Returns a ReadAhead for the events to be processed,
+        or None if prefetching is disabled or not possible.'''
+        if self.prefetch <= 0:
+            return None
+        if multiprocessing.current_process().daemon:
+            self.logger.warning('cannot start the prefetching process from a daemon process, '
+                                'reading events synchronously')
+            return None
+        return ReadAhead(self._open_events, self.prefetch,
+                         firstEvent, firstEvent + nEvents)
+
     def _build(self, cfg):
         try: 
             theClass = cfg.class_object
@@ -272,51 +362,134 @@ Make sure that the configuration object is of class cfg.Analyzer.
                 'to process {nEvents} events.'.format(firstEvent=firstEvent,
                                                         nEvents=nEvents))
         self.logger.info( str( self.cfg_comp ) )
+        if self.nWorkers > 1 and hasattr(self.events, '__getitem__'):
+            if multiprocessing.current_process().daemon:
+                # e.g. several components processed in a multiprocessing.Pool
+                self.logger.warning('cannot start worker processes from a daemon process, '
+                                    'processing events sequentially')
+            else:
+                self._loop_parallel(firstEvent, nEvents)
+                self._write_log()
+                return
         for analyzer in self._analyzers:
             analyzer.beginLoop(self.setup)
 
-        if hasattr(self.events, '__getitem__'):
-            # events backend supports indexing, e.g. CMS, FCC, bare root
-            for iEv in range(firstEvent, firstEvent+nEvents):
-                initialize_timer(iEv)
-                try:
-                    self.process( iEv )
-                    self.nEvProcessed += 1
-                    if iEv<self.nPrint:
-                        self.logger.info(self.event.__str__())
-                    if self.stopFlag and self.stopFlag.value:
-                        print 'stopping gracefully at event %d' % (iEv)
+        read_ahead = self._start_read_ahead(firstEvent, nEvents)
+        try:
+            if hasattr(self.events, '__getitem__'):
+                # events backend supports indexing, e.g. CMS, FCC, bare root
+                for iEv in range(firstEvent, firstEvent+nEvents):
+                    initialize_timer(iEv)
+                    try:
+                        self.process( iEv )
+                        self.nEvProcessed += 1
+                        if read_ahead:
+                            read_ahead.done()
+                        if iEv<self.nPrint:
+                            self.logger.info(self.event.__str__())
+                        if self.stopFlag and self.stopFlag.value:
+                            print 'stopping gracefully at event %d' % (iEv)
+                            break
+                    except UserStop as err:
+                        print 'Stopped loop following a UserStop exception:'
+                        print err
                         break
-                except UserStop as err:
-                    print 'Stopped loop following a UserStop exception:'
-                    print err
-                    break
-        else:
-            # events backend does not support indexing, e.g. LCIO
-            iEv = 0
-            for ii, event in enumerate(self.events):
-                if ii < firstEvent:
-                    continue
-                initialize_timer(iEv)
-                iEv += 1
-                try:
-                    self.event = Event(iEv, event, self.setup)
-                    self.iEvent = iEv
-                    self._run_analyzers_on_event()
-                    self.nEvProcessed += 1
-                    if iEv<self.nPrint:
-                        self.logger.info(self.event.__str__())
-                    if self.stopFlag and self.stopFlag.value:
-                        print 'stopping gracefully at event %d' % (iEv)
+            else:
+                # events backend does not support indexing, e.g. LCIO
+                iEv = 0
+                for ii, event in enumerate(self.events):
+                    if ii < firstEvent:
+                        continue
+                    initialize_timer(iEv)
+                    iEv += 1
+                    try:
+                        self.event = Event(iEv, event, self.setup)
+                        self.iEvent = iEv
+                        self._run_analyzers_on_event()
+                        self.nEvProcessed += 1
+                        if read_ahead:
+                            read_ahead.done()
+                        if iEv<self.nPrint:
+                            self.logger.info(self.event.__str__())
+                        if self.stopFlag and self.stopFlag.value:
+                            print 'stopping gracefully at event %d' % (iEv)
+                            break
+                    except UserStop as err:
+                        print 'Stopped loop following a UserStop exception:'
+                        print err
                         break
-                except UserStop as err:
-                    print 'Stopped loop following a UserStop exception:'
-                    print err
-                    break            
+        finally:
+            # also stopped if an analyzer raises an exception
+            if read_ahead and not read_ahead.stop():
+                self.logger.warning('the prefetching process failed, '
+                                    'the events were read synchronously')
         for analyzer in self._analyzers:
             analyzer.endLoop(self.setup)            
         self._write_log()
 
+    def _loop_parallel(self, firstEvent, nEvents):
+        """Process the events in self.nWorkers worker processes.
+
+        Each worker processes a contiguous range of events,
+        so that the merged trees keep the order of the events.
+        The time reports, analyzer counters and numbers of processed events
+        sent back by the workers are added to the ones of this looper.
+        A UserStop exception only stops the worker in which it is raised.
+        """
+        nEvPerWorker = int(ceil(nEvents / float(self.nWorkers)))
+        stopFlag = self.stopFlag
+        if stopFlag is None:
+            stopFlag = multiprocessing.Value('i', 0)
+        results = multiprocessing.Queue()
+        processes = []
+        from heppy.framework.services.randomstreams import RandomStreamService
+        streams = any(isinstance(service, RandomStreamService)
+                      for service in self.setup.services.values())
+        if not streams:
+            self.logger.warning('no RandomStreamService: the random generators of the workers '
+                                'are seeded from their index, and the random numbers '
+                                'depend on the number of workers')
+        for iWorker in range(self.nWorkers):
+            first = firstEvent + iWorker * nEvPerWorker
+            nev = min(nEvPerWorker, firstEvent + nEvents - first)
+            if nev <= 0:
+                break
+            name = '/'.join([self.outDir, 'Worker_{}'.format(iWorker)])
+            self.workerDirs.append(name)
+            seed = None if streams else _worker_seed(self.cfg_comp.name, iWorker)
+            process = multiprocessing.Process(target=_run_worker,
+                                              args=(self, name, first, nev,
+                                                    stopFlag, results, seed))
+            process.start()
+            processes.append(process)
+        errors = []
+        nresults = 0
+        while nresults < len(processes):
+            try:
+                result = results.get(timeout=1)
+            except Queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    errors.append('a worker process died without sending its results')
+                    break
+                continue
+            nresults += 1
+            if 'error' in result:
+                errors.append('error in worker {name}:\n{error}'.format(**result))
+                continue
+            self.logger.info('worker {name} processed {nEvProcessed} events'.format(**result))
+            self.nEvProcessed += result['nEvProcessed']
+            self.analyzer_counter += result['analyzer_counter']
+            if self.timeReport:
+                for rep, worker_rep in zip(self.timeReport, result['timeReport']):
+                    rep['time'] += worker_rep['time']
+                    rep['events'] += worker_rep['events']
+            if self.profiler:
+                self.profiler += result['profiler']
+        for process in processes:
+            process.join()
+        if errors:
+            raise RuntimeError('\n'.join(errors))
+
     def _write_log(self):
         warning = self.logger.warning
         warning('')
@@ -339,6 +512,11 @@ Make sure that the configuration object is of class cfg.Analyzer.
             warning("%9s   %9s    %9s   %9s   %s" % ("---------","--------","---------", "---------", "-------------"))
             warning("%9d   %9d   %10.2f  %10.2f %5.1f%%   %s" % ( passev, allev, 1000*totPerProcEv, 1000*totPerAllEv, 100.0, "TOTAL"))
             warning("")
+        if self.profiler:
+            self.profiler.write(self.outDir)
+        if hasattr(self.events, 'read_report'):
+            warning(self.events.read_report())
+            warning("")
         warning( self.analyzer_counter )
         # the following must be printed to the log file in all cases,
         # as the heppy batch scripts rely on this line to decide whether
@@ -383,8 +561,14 @@ possibly skipping a number of events at the beginning.
                     print  "Mem Jump detected before analyzer %s at event %s. RSS(before,after,difference) %s %s %s "%( analyzer.name, iEv, self.memLast, memNow, memNow-self.memLast)
                 self.memLast=memNow
             ret = False
+            for service in self._analyzer_services:
+                service.beginAnalyzer(self.event, analyzer)
+            if self.profiler:
+                self.profiler.start(i)
             try:
                 ret = analyzer.process( self.event )
+                if self.profiler:
+                    self.profiler.stop(i, self.iEvent, start)
                 ret = True if ret is None else ret
                 self.event.analyzers.append((analyzer, ret))
             except:
@@ -419,12 +603,88 @@ possibly skipping a number of events at the beginning.
         and the output of all analyzers in the output directory.
 
         See Analyzer.Write for more information.
+        
+        If the events were processed by worker processes, the outputs 
+        of the workers are merged into the output directory instead,
+        and the worker directories are removed. The files which cannot
+        be merged, e.g. a yaml file, are copied from the first worker,
+        except those already written by this looper, e.g. log.txt.
         """
+        if self.workerDirs:
+            self.setup.close()
+            merge_dirs(self.workerDirs, self.outDir,
+                       skip=['config.pck', 'component.pck'],
+                       copy_other=True)
+            for dirname in self.workerDirs:
+                shutil.rmtree(dirname)
+            return
         for analyzer in self._analyzers:
             analyzer.write(self.setup)
         self.setup.close()
-        
-        
+
+
+def _worker_seed(comp_name, iWorker):
+    '''Seed of the random generators of worker iWorker processing component comp_name'''
+    from heppy.statistics.randomstreams import stream_seed
+    return stream_seed(('worker', comp_name, iWorker))[0] or 1
+
+
+def _reseed(seed):
+    '''Seeds the global random generators of the process:
+    heppy.statistics.rrandom, python's random, numpy's, and ROOT's gRandom'''
+    import random
+    import numpy
+    import heppy.statistics.rrandom as rrandom
+    rrandom.seed(seed)
+    random.seed(seed)
+    numpy.random.seed(seed)
+    if context.name != 'bare':
+        ROOT.gRandom.SetSeed(seed)
+
+
+def _run_worker(looper, name, firstEvent, nEvents, stopFlag, results, seed=None):
+    """Processes nEvents events starting at firstEvent with a new Looper 
+    built from the configuration of looper, in a worker process.
+
+    The worker Looper writes its output to directory name.
+    Its time report, analyzer counter, profiler and number of processed events 
+    are put in the results queue.
+    If seed is not None, the global random generators are seeded with it,
+    as the forked workers would otherwise draw the same random numbers.
+    """
+    try:
+        if seed is not None:
+            _reseed(seed)
+        config = copy.copy(looper.config)
+        comp = copy.copy(looper.cfg_comp)
+        # the event range is already defined by the main looper
+        for attr in ['fineSplit', 'eventRange']:
+            if hasattr(comp, attr):
+                delattr(comp, attr)
+        config.components = [comp]
+        config.preprocessor = None
+        worker = Looper(name, config,
+                        nEvents=nEvents,
+                        firstEvent=firstEvent,
+                        nPrint=looper.nPrint,
+                        timeReport=bool(looper.timeReport),
+                        quiet=True,
+                        memCheckFromEvent=looper.memReportFirstEvent,
+                        profile=bool(looper.profiler),
+                        cprofile=bool(looper.profiler and looper.profiler.cprofile),
+                        prefetch=looper.prefetch,
+                        schedule=looper.schedule)
+        # not given to the constructor, the signal handler of the main looper is used
+        worker.stopFlag = stopFlag
+        worker.loop()
+        worker.write()
+        results.put(dict(name=name,
+                         nEvProcessed=worker.nEvProcessed,
+                         analyzer_counter=worker.analyzer_counter,
+                         timeReport=worker.timeReport,
+                         profiler=worker.profiler))
+    except Exception:
+        results.put(dict(name=name, error=traceback.format_exc()))
 
 
 if __name__ == '__main__':
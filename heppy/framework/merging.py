@@ -0,0 +1,268 @@
+'''Merging of the output directories of several loopers processing the same component.
+
+Used by the Looper when running with several worker processes,
+and by heppy_hadd to merge the output directories of the chunks.
+
+Many files are merged with a tree reduction, see tree_merge:
+the files are merged by small groups, in parallel in a pool of processes,
+then the results are merged again by small groups, until a single file is left.
+'''
+
+import os
+import sys
+import dill
+import pickle
+import shutil
+import tempfile
+import multiprocessing
+
+# list of the input directories already merged in an output directory,
+# for the incremental merging
+MERGED_LIST = 'merged_dirs.txt'
+
+# pickled objects that cannot be added, copied from the first directory.
+# They may refer to the configuration module of the directory, __cfg_to_run__,
+# which cannot be imported from the intermediate files of tree_merge.
+COPIED_PCK = ['config.pck', 'component.pck']
+
+
+def merge_pck(ifnames, ofname, write_txt=True):
+    '''Merges the objects pickled in files ifnames into ofname.
+
+    The objects are added with +=, e.g. Counter or Average objects.
+    If += is not implemented, the first object is kept.
+    The directory of each file is added to sys.path while unpickling,
+    so that the configuration module of the chunk, __cfg_to_run__, can be found.
+    If write_txt is True, a text file is written next to ofname, as done by heppy_hadd.
+    @return: the merged object
+    '''
+    objsum = None
+    for ifname in ifnames:
+        with open(ifname) as pckfile:
+            sys.path.insert(0, os.path.dirname(os.path.abspath(ifname)))
+            try:
+                obj = pickle.load(pckfile)
+            finally:
+                sys.path.pop(0)
+        if objsum is None:
+            objsum = obj
+        else:
+            try:
+                objsum += obj
+            except TypeError:
+                # += not implemented, nevermind
+                pass
+    with open(ofname, 'w') as pckfile:
+        pickle.dump(objsum, pckfile, protocol=-1)
+    if write_txt:
+        _write_txt(objsum, ofname)
+    return objsum
+
+
+def _write_txt(obj, pckname):
+    with open(pckname.replace('.pck', '.txt'), 'w') as txtfile:
+        txtfile.write(str(obj))
+        txtfile.write('\n')
+
+
+def merge_root(ifnames, ofname):
+    '''Merges the root files ifnames (trees, histograms) into ofname.
+
+    The merging is done in process with a TFileMerger.
+    The entries of the trees are kept in the order of ifnames.
+    '''
+    from ROOT import TFileMerger
+    merger = TFileMerger(False)
+    merger.SetPrintLevel(0)
+    if not merger.OutputFile(ofname, 'RECREATE'):
+        raise IOError('cannot create ' + ofname)
+    for ifname in ifnames:
+        if not merger.AddFile(ifname, False):
+            raise IOError('cannot open ' + ifname)
+    if not merger.Merge():
+        raise IOError('failed to merge into ' + ofname)
+
+
+def merge_files(ifnames, ofname, final=True):
+    '''Merges ifnames into ofname with merge_pck or merge_root,
+    depending on the extension of ofname.
+
+    ofname may be one of the input files: the result is first written to
+    a temporary file, which then replaces ofname.
+    @param final: if False, ofname is an intermediate result of tree_merge,
+        and the text file of a .pck file is not written.
+    '''
+    base, ext = os.path.splitext(ofname)
+    tmpname = '{}.merging{}'.format(base, ext)
+    if ext == '.pck':
+        objsum = merge_pck(ifnames, tmpname, write_txt=False)
+        if final:
+            _write_txt(objsum, ofname)
+    elif ext == '.root':
+        merge_root(ifnames, tmpname)
+    else:
+        raise ValueError('cannot merge ' + ofname)
+    os.rename(tmpname, ofname)
+
+
+def _merge_task(task):
+    ifnames, ofname, final = task
+    merge_files(ifnames, ofname, final)
+    return ofname
+
+
+def tree_merge(jobs, nprocs=1, fanin=2, tmpdir=None, progress=None):
+    '''Merges files with a tree reduction.
+
+    @param jobs: list of merging jobs (ifnames, ofname),
+        where the files ifnames are to be merged into ofname.
+    @param nprocs: number of processes merging the files in parallel.
+    @param fanin: number of files merged together, or None to merge all
+        the files of a job at once.
+    @param tmpdir: directory of the intermediate files.
+        By default, a temporary directory is created next to the first output file,
+        and removed at the end.
+    @param progress: function called after each merge with the level
+        of the tree, the number of merges done, and the number of merges in this level.
+
+    At each level of the tree, the input files of each job are merged by
+    groups of fanin consecutive files, so that the order of the tree entries
+    is kept. The merges of all jobs are run in parallel.
+    '''
+    if not jobs:
+        return
+    if fanin is None:
+        fanin = max([2] + [len(ifnames) for ifnames, ofname in jobs])
+    if fanin < 2:
+        raise ValueError('fanin must be at least 2')
+    remove_tmpdir = tmpdir is None
+    if tmpdir is None:
+        tmpdir = tempfile.mkdtemp(prefix='merging_',
+                                  dir=os.path.dirname(os.path.abspath(jobs[0][1])))
+    pool = multiprocessing.Pool(nprocs) if nprocs > 1 else None
+    try:
+        pending = [list(ifnames) for ifnames, ofname in jobs]
+        level = 0
+        while True:
+            tasks = []
+            for ijob, (ifnames, ofname) in enumerate(jobs):
+                files = pending[ijob]
+                if not files:
+                    continue
+                if len(files) <= fanin:
+                    tasks.append((files, ofname, True))
+                    pending[ijob] = []
+                    continue
+                pending[ijob] = []
+                for igroup, first in enumerate(range(0, len(files), fanin)):
+                    group = files[first:first+fanin]
+                    if len(group) == 1:
+                        pending[ijob].append(group[0])
+                        continue
+                    tmpname = os.path.join(tmpdir, '{}_{}_{}{}'.format(
+                        ijob, level, igroup, os.path.splitext(ofname)[1]))
+                    tasks.append((group, tmpname, False))
+                    pending[ijob].append(tmpname)
+            if not tasks:
+                break
+            if pool:
+                results = pool.imap_unordered(_merge_task, tasks)
+            else:
+                results = (_merge_task(task) for task in tasks)
+            for ndone, result in enumerate(results, 1):
+                if progress:
+                    progress(level, ndone, len(tasks))
+            # the intermediate files of the previous level are not needed anymore
+            for fname in [fname for task in tasks for fname in task[0]]:
+                if os.path.dirname(fname) == tmpdir:
+                    os.remove(fname)
+            level += 1
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+        if remove_tmpdir:
+            shutil.rmtree(tmpdir)
+
+
+def prepare_merge(idirs, odir, skip=None, copy_ext=(), incremental=False,
+                  copy_other=False):
+    '''Prepares the merging of the output directories idirs into odir.
+
+    All directories in idirs must have the same structure as the first one.
+    The subdirectories of odir are created, and the files with an extension
+    in copy_ext, e.g. ['.yaml'], are copied from the first directory,
+    as well as the files listed in COPIED_PCK.
+
+    @param skip: list of file names that should not be merged,
+        e.g. ['config.pck', 'component.pck']
+    @param incremental: if True, the directories already merged into odir,
+        as listed by record_merged, are not merged again, and the files of
+        the other directories are merged into the existing files of odir.
+    @param copy_other: if True, the files which cannot be merged are copied
+        from the first directory, unless they already exist in odir.
+    @return: the list of the directories to merge, and the list of the
+        merging jobs (ifnames, ofname) for tree_merge.
+    '''
+    if skip is None:
+        skip = []
+    if incremental:
+        merged = read_merged(odir)
+        idirs = [idir for idir in idirs
+                 if os.path.basename(os.path.normpath(idir)) not in merged]
+    jobs = []
+    if not idirs:
+        return idirs, jobs
+    for root, dirs, files in os.walk(idirs[0]):
+        reldir = os.path.relpath(root, idirs[0])
+        outdir = os.path.normpath('/'.join([odir, reldir]))
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir)
+        for fname in files:
+            if fname in skip:
+                continue
+            ofname = '/'.join([outdir, fname])
+            ext = os.path.splitext(fname)[1]
+            if ext in copy_ext or fname in COPIED_PCK:
+                shutil.copy('/'.join([root, fname]), ofname)
+            elif ext in ['.pck', '.root']:
+                ifnames = ['/'.join([idir, reldir, fname]) for idir in idirs]
+                if incremental and os.path.isfile(ofname):
+                    ifnames.insert(0, ofname)
+                jobs.append((ifnames, ofname))
+            elif copy_other and not os.path.isfile(ofname):
+                shutil.copy('/'.join([root, fname]), ofname)
+    return idirs, jobs
+
+
+def read_merged(odir):
+    '''Returns the set of the names of the directories merged into odir'''
+    fname = '/'.join([odir, MERGED_LIST])
+    if not os.path.isfile(fname):
+        return set()
+    with open(fname) as infile:
+        return set(line.strip() for line in infile if line.strip())
+
+
+def record_merged(odir, idirs):
+    '''Adds the names of the directories idirs to the list of the
+    directories merged into odir'''
+    with open('/'.join([odir, MERGED_LIST]), 'a') as outfile:
+        for idir in idirs:
+            outfile.write(os.path.basename(os.path.normpath(idir)) + '\n')
+
+
+def merge_dirs(idirs, odir, skip=None, copy_other=False):
+    '''Merges the output directories idirs into odir.
+
+    All directories in idirs must have the same structure as the first one.
+    The .pck files are merged with merge_pck, and the .root files
+    with merge_root. The other files are ignored, or copied from the
+    first directory if copy_other is True and they do not exist in odir.
+    Existing .pck and .root files in odir are overwritten.
+
+    @param skip: list of file names that should not be merged,
+        e.g. ['config.pck', 'component.pck']
+    '''
+    idirs, jobs = prepare_merge(idirs, odir, skip, copy_other=copy_other)
+    tree_merge(jobs, fanin=None)
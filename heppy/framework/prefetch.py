@@ -0,0 +1,98 @@
+'''Read-ahead of the input events in a background process, used by the Looper
+when running with prefetch > 0.
+
+The events backends (Chain, eventstfile.Events, ...) return the same object
+at each index, updated in place, so that the events cannot be decoded
+in advance in the process running the analyzers.
+Instead, a background process opens its own instance of the events backend
+and reads the entries ahead of the event loop, at most depth entries
+ahead of the entry being processed.
+When the event loop reaches an entry, the data are in the operating system
+and storage caches, and the read latency, e.g. on network-mounted inputs,
+is hidden.
+If the background process fails, the event loop is not affected,
+and keeps on reading the events synchronously.
+'''
+
+import multiprocessing
+
+
+class ReadAhead(object):
+    '''Reads the entries of an events backend ahead of the event loop.
+
+    Usage::
+
+        read_ahead = ReadAhead(open_events, depth, first, last)
+        for iEv in range(first, last):
+            event = events[iEv]
+            # process the event
+            read_ahead.done()
+        read_ahead.stop()
+    '''
+
+    def __init__(self, open_events, depth, first, last=None):
+        '''Starts the background process.
+
+        @param open_events: function returning a new instance of the events backend.
+          It is called in the background process.
+        @param depth: maximum number of entries read ahead of the entry
+          being processed.
+        @param first: index of the first entry.
+        @param last: index of the entry after the last one, or None for all entries.
+        '''
+        if depth < 1:
+            raise ValueError('depth must be at least 1')
+        self.depth = depth
+        # one token for the entry being processed, and one per entry ahead
+        self._tokens = multiprocessing.Semaphore(depth + 1)
+        self._stop = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_read_ahead,
+            args=(open_events, first, last, self._tokens, self._stop)
+        )
+        self.process.daemon = True
+        self.process.start()
+
+    def done(self):
+        '''To be called when the event loop is done with an entry,
+        allowing the background process to read one more entry.'''
+        self._tokens.release()
+
+    def stop(self, timeout=5.):
+        '''Stops the background process.
+        @return: True if the background process did not fail.
+        '''
+        self._stop.set()
+        self._tokens.release()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+            return True
+        return self.process.exitcode == 0
+
+
+def _read_ahead(open_events, first, last, tokens, stop):
+    '''Reads the entries first to last, taking one token for each entry'''
+    events = open_events()
+    if hasattr(events, '__getitem__'):
+        if last is None:
+            last = len(events)
+        entries = (events[index] for index in xrange(first, last))
+    else:
+        # events backend does not support indexing, e.g. LCIO
+        def iterate():
+            for index, event in enumerate(events):
+                if index >= first:
+                    yield event
+                if last is not None and index + 1 >= last:
+                    break
+        entries = iterate()
+    while True:
+        tokens.acquire()
+        if stop.is_set():
+            break
+        try:
+            next(entries)
+        except StopIteration:
+            break
@@ -0,0 +1,276 @@
+'''Per-analyzer profiling of the event processing, used by the Looper
+when running with profile=True.
+
+For each analyzer, the processing time of each event is recorded,
+and optionally the cProfile statistics of its process method.
+The results are written to the output directory:
+- profile.json: for each analyzer, the number of events, the total and mean
+  times, the p50, p95, p99 quantiles and the maximum of the event time,
+  a histogram of the event times in logarithmic bins, the slowest events, and, with cProfile,
+  the functions with the largest cumulative time.
+- profile.folded: collapsed stacks in microseconds, one line per stack,
+  that can be given to flamegraph.pl or speedscope.
+  Without cProfile, the stacks are made of the analyzer names only.
+- profile_<analyzer name>.prof: with cProfile, the statistics of the analyzer,
+  to be read with pstats or snakeviz.
+'''
+
+import os
+import math
+import json
+import heapq
+import pstats
+import timeit
+import cProfile
+from array import array
+
+QUANTILES = [50, 95, 99]
+NSLOWEST = 10
+NFUNCTIONS = 20
+NBINS = 20
+# the branches of the collapsed stacks below this time (s) are cut
+MIN_STACK_TIME = 1e-6
+
+
+class _StatsHolder(object):
+    '''Gives cProfile statistics to pstats.Stats, which requires an
+    object with a create_stats method and a stats attribute.'''
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class AnalyzerProfiler(object):
+    '''Records the event processing times of a sequence of analyzers.
+
+    Usage in the event loop::
+
+        start = timeit.default_timer()
+        profiler.start(index)
+        analyzer.process(event)
+        profiler.stop(index, iEv, start)
+
+    Profilers of the same sequence can be added with +=,
+    e.g. to merge the results of several worker processes.
+    '''
+
+    def __init__(self, names, cprofile=False):
+        '''
+        @param names: names of the analyzers, in the sequence order.
+        @param cprofile: if True, the analyzers are also profiled with cProfile.
+        '''
+        self.names = list(names)
+        self.cprofile = cprofile
+        self.times = [array('d') for name in self.names]
+        self.slowest = [[] for name in self.names]
+        # statistics of the profiles already collected, see _collect_stats
+        self.stats = [dict() for name in self.names]
+        self._profiles = [None] * len(self.names)
+
+    def start(self, index):
+        '''To be called before the analyzer at index processes an event.'''
+        if self.cprofile:
+            if self._profiles[index] is None:
+                self._profiles[index] = cProfile.Profile()
+            self._profiles[index].enable()
+
+    def stop(self, index, iEv, start):
+        '''To be called after the analyzer at index processed event iEv.
+
+        @param start: time given by timeit.default_timer before the processing.
+        '''
+        if self.cprofile:
+            self._profiles[index].disable()
+        self.record(index, iEv, timeit.default_timer() - start)
+
+    def record(self, index, iEv, time):
+        '''Records the time in seconds taken by the analyzer at index to process event iEv.'''
+        self.times[index].append(time)
+        slowest = self.slowest[index]
+        if len(slowest) < NSLOWEST:
+            heapq.heappush(slowest, (time, iEv))
+        elif time > slowest[0][0]:
+            heapq.heapreplace(slowest, (time, iEv))
+
+    def _collect_stats(self):
+        '''Adds the statistics of the running cProfile profiles to self.stats.
+        Needed before pickling, as the profiles cannot be pickled.'''
+        for index, profile in enumerate(self._profiles):
+            if profile is None:
+                continue
+            profile.create_stats()
+            self.stats[index] = _add_stats(self.stats[index], profile.stats)
+            self._profiles[index] = None
+
+    def __getstate__(self):
+        self._collect_stats()
+        return self.__dict__
+
+    def __iadd__(self, other):
+        '''Add the results of other, a profiler of the same analyzers.'''
+        if other.names != self.names:
+            raise ValueError('cannot add profilers of different analyzers')
+        self._collect_stats()
+        other._collect_stats()
+        for index in range(len(self.names)):
+            self.times[index].extend(other.times[index])
+            self.slowest[index] = heapq.nlargest(
+                NSLOWEST, self.slowest[index] + other.slowest[index])
+            heapq.heapify(self.slowest[index])
+            self.stats[index] = _add_stats(self.stats[index], other.stats[index])
+        return self
+
+    def summary(self, index):
+        '''Returns a dictionary with the timing summary of the analyzer at index.
+        All times are in seconds.'''
+        times = sorted(self.times[index])
+        summary = dict(name=self.names[index], events=len(times))
+        if not times:
+            return summary
+        total = sum(times)
+        summary.update(
+            total=total,
+            mean=total / len(times),
+            max=times[-1],
+            slowest=[dict(event=iEv, time=time) for time, iEv
+                     in sorted(self.slowest[index], reverse=True)],
+            histogram=_histogram(times, NBINS),
+        )
+        for quantile in QUANTILES:
+            summary['p{}'.format(quantile)] = _quantile(times, quantile)
+        if self.stats[index]:
+            summary['functions'] = _top_functions(self.stats[index], NFUNCTIONS)
+        return summary
+
+    def folded_stacks(self):
+        '''Returns the collapsed stacks as a list of (stack, microseconds)'''
+        stacks = []
+        for index, name in enumerate(self.names):
+            if self.stats[index]:
+                stacks.extend(_stacks(self.stats[index], name))
+            else:
+                stacks.append((name, int(round(sum(self.times[index]) * 1e6))))
+        return [(stack, time) for stack, time in stacks if time > 0]
+
+    def write(self, dirname):
+        '''Writes the json, folded stack, and cProfile files to dirname.'''
+        self._collect_stats()
+        with open(os.path.join(dirname, 'profile.json'), 'w') as out:
+            json.dump(dict(analyzers=[self.summary(index)
+                                      for index in range(len(self.names))]),
+                      out, indent=2)
+        with open(os.path.join(dirname, 'profile.folded'), 'w') as out:
+            for stack, time in self.folded_stacks():
+                out.write('{} {}\n'.format(stack, time))
+        for name, stats in zip(self.names, self.stats):
+            if stats:
+                fname = os.path.join(dirname, 'profile_{}.prof'.format(name))
+                pstats.Stats(_StatsHolder(stats)).dump_stats(fname)
+
+
+def _quantile(sorted_times, quantile):
+    '''quantile (in percent) of the sorted times, with linear interpolation'''
+    position = (len(sorted_times) - 1) * quantile / 100.
+    low = int(position)
+    high = min(low + 1, len(sorted_times) - 1)
+    fraction = position - low
+    return sorted_times[low] * (1 - fraction) + sorted_times[high] * fraction
+
+
+def _histogram(sorted_times, nbins):
+    '''histogram of the times in nbins bins of logarithmic width,
+    between the minimum and maximum times'''
+    low, high = sorted_times[0], sorted_times[-1]
+    if low <= 0. or high <= low:
+        return dict(edges=[low, high], counts=[len(sorted_times)])
+    ratio = math.log(high / low)
+    counts = [0] * nbins
+    for time in sorted_times:
+        ibin = int(math.log(time / low) / ratio * nbins) if time > low else 0
+        counts[min(ibin, nbins - 1)] += 1
+    return dict(edges=[low * math.exp(ratio * ibin / nbins)
+                       for ibin in range(nbins + 1)],
+                counts=counts)
+
+
+def _add_stats(stats1, stats2):
+    '''Returns the sum of two cProfile statistics dictionaries'''
+    if not stats1:
+        return dict(stats2)
+    if not stats2:
+        return stats1
+    total = pstats.Stats(_StatsHolder(stats1))
+    total.add(_StatsHolder(stats2))
+    return total.stats
+
+
+def _function_name(func):
+    filename, line, name = func
+    if filename == '~':
+        # built-in function
+        return name
+    return '{}:{}({})'.format(os.path.basename(filename), line, name)
+
+
+_THIS_MODULE = os.path.splitext(os.path.abspath(__file__))[0]
+
+def _is_profiler(func):
+    '''True for the functions of the profiler, which appear in the stats'''
+    return '_lsprof.Profiler' in func[2] or \
+        os.path.splitext(os.path.abspath(func[0]))[0] == _THIS_MODULE
+
+
+def _top_functions(stats, nfunctions):
+    '''list of the nfunctions functions with the largest cumulative time'''
+    functions = []
+    for func, (cc, nc, tt, ct, callers) in stats.iteritems():
+        if _is_profiler(func):
+            continue
+        functions.append(dict(function=_function_name(func),
+                              calls=nc, tottime=tt, cumtime=ct))
+    functions.sort(key=lambda function: function['cumtime'], reverse=True)
+    return functions[:nfunctions]
+
+
+def _stacks(stats, root_name):
+    '''Reconstructs the collapsed stacks from the cProfile call graph.
+
+    cProfile only records the caller-callee pairs.
+    The time of a function is shared among its callees in proportion to the
+    cumulative time of each callee when called from this function.
+    The recursive calls and the branches shorter than MIN_STACK_TIME are cut,
+    their time being given to the calling function.
+    '''
+    callees = dict()
+    roots = []
+    for func, (cc, nc, tt, ct, callers) in stats.iteritems():
+        if _is_profiler(func):
+            continue
+        # time spent in func when called from outside the profiled code,
+        # e.g. the process method of the analyzer
+        root_time = ct
+        for caller, (ccc, cnc, ctt, cct) in callers.iteritems():
+            callees.setdefault(caller, []).append((func, cct))
+            if caller != func:
+                root_time -= cct
+        if root_time >= MIN_STACK_TIME:
+            roots.append((func, root_time))
+    stacks = []
+    def expand(func, stack, time, path):
+        cumtime = stats[func][3]
+        scale = time / cumtime if cumtime > 0 else 0.
+        stack = ';'.join([stack, _function_name(func)])
+        path = path | set([func])
+        children = 0.
+        for callee, calltime in callees.get(func, []):
+            if callee in path or calltime * scale < MIN_STACK_TIME:
+                continue
+            children += calltime * scale
+            expand(callee, stack, calltime * scale, path)
+        stacks.append((stack, int(round(max(time - children, 0.) * 1e6))))
+    for root, time in roots:
+        expand(root, root_name, time, frozenset())
+    return stacks
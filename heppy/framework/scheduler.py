@@ -0,0 +1,253 @@
+'''Dependency-aware scheduling of a sequence of analyzers,
+used by the Looper when running with schedule=True.
+
+The event attributes read and written by each analyzer are inferred from its
+configuration, e.g. input_objects and output for a Selector.
+The Scheduler then:
+- removes the producers whose outputs are not used, directly or through other
+  producers, by a sink (e.g. a tree producer), a filter, or an analyzer
+  with unknown dependencies. The analyzers modifying objects in place,
+  e.g. IsolationAnalyzer, are kept, as these objects may be used through
+  another collection, e.g. the output of a Selector;
+- moves the filters (e.g. EventFilter) as early in the sequence as their
+  inputs allow, so that the analyzers placed after a filter do not process
+  the rejected events.
+
+The dependencies of the analyzers of heppy are declared in this module.
+The dependencies of another analyzer can be declared:
+- for all its instances, with declare::
+
+    from heppy.framework.scheduler import declare, SINK
+    declare(MyTreeProducer, inputs=['zeds', 'jets'], role=SINK)
+
+  where inputs and outputs are the names of the configuration attributes
+  giving the names of the event attributes, or functions taking the configuration
+  and returning these names;
+- for a single instance, in its configuration, directly with the names of the
+  event attributes::
+
+    tree = cfg.Analyzer(
+        MyTreeProducer,
+        event_inputs = ['zeds', 'jets'],
+        event_outputs = [],
+        event_role = 'sink'
+    )
+
+An analyzer without declaration is assumed to read and modify all event attributes,
+and is never removed or moved.
+'''
+
+import copy
+
+PRODUCER = 'producer'
+FILTER = 'filter'
+SINK = 'sink'
+
+# class name -> (inputs, outputs, role)
+_declarations = dict()
+
+
+def declare(class_object, inputs=(), outputs=(), role=PRODUCER):
+    '''Declares the dependencies of all instances of an analyzer class.
+
+    @param class_object: the analyzer class, or its full name
+      e.g. 'heppy.analyzers.Selector.Selector'.
+    @param inputs: attributes of the analyzer configuration giving
+      the names of the event attributes read by the analyzer,
+      or functions of the configuration returning these names.
+    @param outputs: same for the event attributes written by the analyzer.
+      An event attribute modified in place is both an input and an output.
+    @param role: PRODUCER, FILTER (the analyzer may reject the event),
+      or SINK (the analyzer uses the event attributes for its output, e.g. a tree).
+    '''
+    if not isinstance(class_object, basestring):
+        class_object = _class_name(class_object)
+    _declarations[class_object] = (list(inputs), list(outputs), role)
+
+
+def _class_name(class_object):
+    return '.'.join([class_object.__module__, class_object.__name__])
+
+
+def _names(value):
+    '''event attribute names in value, a string or a nested list of strings.
+    Other items, e.g. the pdg ids in the match_particles of a Matcher, are ignored.'''
+    if isinstance(value, basestring):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [name for item in value for name in _names(item)]
+    return []
+
+
+def _resolve(cfg_ana, specs):
+    names = set()
+    for spec in specs:
+        if callable(spec):
+            names.update(_names(spec(cfg_ana)))
+        elif hasattr(cfg_ana, spec):
+            names.update(_names(getattr(cfg_ana, spec)))
+    return names
+
+
+def dependencies(cfg_ana):
+    '''Returns the event attributes read and written by the analyzer configured
+    by cfg_ana, and its role, as (inputs, outputs, role).
+    inputs and outputs are None if unknown.'''
+    if hasattr(cfg_ana, 'event_inputs') or hasattr(cfg_ana, 'event_outputs'):
+        return (set(getattr(cfg_ana, 'event_inputs', [])),
+                set(getattr(cfg_ana, 'event_outputs', [])),
+                getattr(cfg_ana, 'event_role', PRODUCER))
+    declaration = _declarations.get(_class_name(cfg_ana.class_object))
+    if declaration is None:
+        return None, None, SINK
+    inputs, outputs, role = declaration
+    return _resolve(cfg_ana, inputs), _resolve(cfg_ana, outputs), role
+
+
+class Scheduler(object):
+    '''Schedules a sequence of analyzer configurations.
+
+    Usage::
+
+        scheduler = Scheduler(config.sequence)
+        print scheduler
+        for cfg_ana in scheduler.sequence:
+            ...
+
+    Attributes:
+      sequence: the scheduled sequence.
+      removed: the configurations of the removed analyzers.
+      moved: the configurations of the filters moved earlier in the sequence.
+    '''
+
+    def __init__(self, sequence):
+        self.original = list(sequence)
+        deps = dict((id(cfg_ana), dependencies(cfg_ana))
+                    for cfg_ana in self.original)
+        self._deps = deps
+        kept = self._remove_unused(self.original)
+        self.removed = [cfg_ana for cfg_ana in self.original if cfg_ana not in kept]
+        self.sequence = copy.copy(sequence)
+        del self.sequence[:]
+        self.sequence.extend(self._move_filters(kept))
+        order = [id(cfg_ana) for cfg_ana in kept]
+        self.moved = [cfg_ana for index, cfg_ana in enumerate(self.sequence)
+                      if order.index(id(cfg_ana)) > index]
+
+    def _remove_unused(self, sequence):
+        '''Returns the analyzers of sequence which contribute to a sink or filter'''
+        kept = []
+        # event attributes used by the analyzers already kept, None for all
+        needed = set()
+        for cfg_ana in reversed(sequence):
+            inputs, outputs, role = self._deps[id(cfg_ana)]
+            # the objects modified in place may also be in other collections
+            in_place = inputs is not None and bool(outputs & inputs)
+            if role == PRODUCER and needed is not None and \
+               not in_place and not (outputs & needed):
+                continue
+            kept.append(cfg_ana)
+            if inputs is None:
+                needed = None
+            elif needed is not None:
+                needed = (needed - (outputs - inputs)) | inputs
+        kept.reverse()
+        return kept
+
+    def _depends(self, first, second):
+        '''True if analyzer second must run after analyzer first'''
+        inputs1, outputs1, role1 = self._deps[id(first)]
+        inputs2, outputs2, role2 = self._deps[id(second)]
+        if role1 != PRODUCER or inputs1 is None or inputs2 is None:
+            return True
+        return bool(outputs1 & (inputs2 | outputs2) or outputs2 & inputs1)
+
+    def _move_filters(self, sequence):
+        '''Moves each filter before the producers it does not depend on.
+        The order of the filters, sinks, and of the analyzers with unknown
+        dependencies is kept.'''
+        scheduled = []
+        for cfg_ana in sequence:
+            role = self._deps[id(cfg_ana)][2]
+            position = len(scheduled)
+            if role == FILTER:
+                while position > 0 and \
+                      not self._depends(scheduled[position-1], cfg_ana):
+                    position -= 1
+            scheduled.insert(position, cfg_ana)
+        return scheduled
+
+    def __str__(self):
+        lines = ['scheduled sequence:']
+        lines.extend('  ' + cfg_ana.name for cfg_ana in self.sequence)
+        if self.removed:
+            lines.append('removed, outputs not used:')
+            lines.extend('  ' + cfg_ana.name for cfg_ana in self.removed)
+        if self.moved:
+            lines.append('filters moved earlier:')
+            lines.extend('  ' + cfg_ana.name for cfg_ana in self.moved)
+        return '\n'.join(lines)
+
+
+def _instance_label(suffix=None):
+    '''event attribute named after the instance label of the analyzer,
+    optionally followed by a suffix given by a configuration attribute'''
+    def name(cfg_ana):
+        if suffix is None:
+            return cfg_ana.instance_label
+        return '_'.join([cfg_ana.instance_label, getattr(cfg_ana, suffix)])
+    return name
+
+
+def _suffixed(attr, suffix):
+    '''event attribute named after configuration attribute attr, followed by suffix'''
+    def name(cfg_ana):
+        return '_'.join([getattr(cfg_ana, attr), suffix])
+    return name
+
+
+for _name, _inputs, _outputs, _role in [
+    ('EventFilter', ['input_objects'], [], FILTER),
+    ('EventByNumber', [], [], FILTER),
+    ('EventSkipper', [], [], FILTER),
+    ('Selector', ['input_objects'], ['output'], PRODUCER),
+    ('Merger', ['inputs'], ['output'], PRODUCER),
+    ('Masker', ['input', 'mask'], ['output'], PRODUCER),
+    ('Subtractor', ['inputA', 'inputB'], ['output'], PRODUCER),
+    ('ResonanceBuilder', ['leg_collection'], ['output'], PRODUCER),
+    ('LeptonicZedBuilder', ['leptons'],
+     ['output', _suffixed('output', 'legs')], PRODUCER),
+    ('ResonanceLegExtractor', ['resonances'],
+     [_suffixed('resonances', 'legs')], PRODUCER),
+    ('P4SumBuilder', ['particles'], ['output'], PRODUCER),
+    ('SingleJetBuilder', ['particles'], ['output'], PRODUCER),
+    ('RecoilBuilder', ['to_remove'], ['output'], PRODUCER),
+    ('JetEnergyCorrector', ['input_jets'], ['output'], PRODUCER),
+    ('GaussianSmearer', ['input_objects'], ['output'], PRODUCER),
+    ('LeptonFsrDresser', ['leptons', 'particles'], ['output'], PRODUCER),
+    ('METBuilder', ['particles'], [_instance_label()], PRODUCER),
+    ('M3Builder', ['jets'], [_instance_label()], PRODUCER),
+    ('MTW', ['electron', 'muon', 'met'], [_instance_label()], PRODUCER),
+    # analyzers modifying their inputs in place
+    ('Tagger', ['input_objects'], ['input_objects'], PRODUCER),
+    ('Matcher', ['particles', 'match_particles'], ['particles'], PRODUCER),
+    ('IsolationAnalyzer', ['particles', 'candidates'], ['candidates'], PRODUCER),
+    ('ParametrizedBTagger',
+     ['input_jets',
+      lambda cfg_ana: ['papasevent', 'gen_particles', 'gen_vertices']],
+     ['input_jets', lambda cfg_ana: 'genbrowser'], PRODUCER),
+    ('ImpactParameterJetTag', ['jets'], ['jets'], PRODUCER),
+    ('ImpactParameterSmearer', ['jets'], ['jets'], PRODUCER),
+    # PapasSim rejects the events failing the simulation
+    ('PapasSim', ['gen_particles'],
+     [lambda cfg_ana: ['papasevent', 'simulator'],
+      _instance_label('sim_particles')], FILTER),
+    ('PapasPFBlockBuilder', [lambda cfg_ana: 'papasevent'],
+     [lambda cfg_ana: 'papasevent'], PRODUCER),
+    ('PapasPFReconstructor', [lambda cfg_ana: 'papasevent'],
+     [lambda cfg_ana: 'papasevent', 'output'], PRODUCER),
+    ('ParticleTreeProducer', ['particles'], [], SINK),
+    ('JetTreeProducer', ['jets'], [], SINK),
+    ('GlobalEventTreeProducer', ['sum_all', 'sum_all_gen'], [], SINK),
+    ]:
+    declare('.'.join(['heppy.analyzers', _name, _name]), _inputs, _outputs, _role)
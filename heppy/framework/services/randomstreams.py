@@ -0,0 +1,70 @@
+'''Random stream service, to make the random numbers reproducible for each event.
+'''
+
+from heppy.framework.services.service import Service
+from heppy.statistics.randomstreams import RandomStream
+import heppy.statistics.rrandom as rrandom
+
+class RandomStreamService(Service):
+    """Random stream service.
+
+    Before each analyzer processes an event, the looper calls beginAnalyzer,
+    which sets the stream of heppy.statistics.rrandom to an independent
+    stream derived from the seed, the position of the event in the input
+    files, and the analyzer name.
+    The random numbers drawn by an analyzer for a given event are then
+    the same whatever the other events processed, so that single-process,
+    multi-process and chunked runs give the same output.
+
+    Example::
+
+        random_streams = cfg.Service(
+          RandomStreamService,
+          'random',
+          seed=0xdeadbeef
+        )
+
+    @param seed: optional, defaults to 0.
+
+    The position of the event is, by order of preference:
+    - the input file name and the entry in this file, for the events backends
+      reading a TTree or a TChain, e.g. Chain;
+    - the input file name and the event index, for a component or chunk
+      with a single input file;
+    - the component name and the index of the event in this component,
+      for the chunks made by config.split_events, see eventOrigin.
+    Otherwise, e.g. for the chunks of several files made with splitFactor
+    from a component read by an events backend without TTree,
+    the index of the event in the chunk is used, and the random numbers
+    depend on the splitting.
+    The input file names must be the same in all runs, e.g. not a local
+    copy of a remote file.
+    """
+    def __init__(self, cfg, comp, outdir):
+        self.seed = getattr(cfg, 'seed', 0)
+        self.files = comp.files
+        self.component, self.offset = getattr(comp, 'eventOrigin', (comp.name, 0))
+
+    def position(self, event):
+        '''Returns the key of the position of event in the input'''
+        try:
+            tree = event.input.GetTree()
+        except (AttributeError, KeyError):
+            # not a TTree or a TChain, e.g. eventstext.Events
+            tree = None
+        if tree:
+            return tree.GetCurrentFile().GetName(), tree.GetReadEntry()
+        if len(self.files) == 1:
+            return self.files[0], event.iEv
+        return self.component, self.offset + event.iEv
+
+    def beginAnalyzer(self, event, analyzer):
+        '''Sets the random stream for analyzer and event.
+        Called by the looper, not by the user.
+        '''
+        rrandom.set_stream(RandomStream(self.seed,
+                                        *(self.position(event) + (analyzer.name,))))
+
+    def stop(self):
+        '''Goes back to the global generator'''
+        rrandom.set_stream(None)
@@ -2,6 +2,10 @@ class Service(object):
     '''Basic service interface.
     If you want your own service, you should respect this interface
     so that your service can be used by the looper. 
+
+    A service may also define a beginAnalyzer(event, analyzer) method,
+    called by the looper before each analyzer processes an event,
+    see RandomStreamService.
     '''
 
     def __init__(self, cfg, comp, outdir):
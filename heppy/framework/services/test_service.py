@@ -3,9 +3,51 @@ import os
 import shutil
 import heppy.framework.config as cfg
 import heppy.framework.context as context
+from heppy.framework.event import Event
+from randomstreams import RandomStreamService
 if context.name != 'bare':
     from tfile import TFileService
 
+
+class FakeTree(object):
+    '''TTree of file fname, at entry'''
+    def __init__(self, fname, entry):
+        self.fname = fname
+        self.entry = entry
+
+    def GetCurrentFile(self):
+        return self
+
+    def GetName(self):
+        return self.fname
+
+    def GetReadEntry(self):
+        return self.entry
+
+    def GetTree(self):
+        return self
+
+
+class RandomStreamServiceTestCase(unittest.TestCase):
+
+    def test_position(self):
+        '''the stream key does not depend on the splitting if the position
+        of the event in its input file is known'''
+        config = cfg.Service(RandomStreamService, 'random')
+        comp = cfg.Component('comp', ['a.root', 'b.root'])
+        service = RandomStreamService(config, comp, None)
+        event = Event(12, FakeTree('b.root', 2), None)
+        self.assertEqual(service.position(event), ('b.root', 2))
+        self.assertEqual(service.position(Event(12, None, None)), ('comp', 12))
+        chunk = cfg.Component('comp_Chunk1', ['b.root'])
+        service = RandomStreamService(config, chunk, None)
+        self.assertEqual(service.position(Event(2, None, None)), ('b.root', 2))
+        chunk.files = ['b.root', 'c.root']
+        chunk.eventOrigin = ('comp', 10)
+        service = RandomStreamService(config, chunk, None)
+        self.assertEqual(service.position(Event(2, None, None)), ('comp', 12))
+
+
 @unittest.skipIf(context.name=='bare', 'ROOT not available')
 class ServiceTestCase(unittest.TestCase):
 
@@ -1,6 +1,7 @@
 import unittest
 import os
 import shutil
+import tempfile
 
 import heppy.framework.config as cfg
 import heppy.framework.context as context
@@ -8,6 +9,7 @@ if context.name != 'bare':
     from ROOT import TFile
     from heppy.framework.chain import Chain
     from heppy.utils.debug_tree import create_tree
+    from heppy.statistics.tree import Tree
 
 testfname = 'test_tree.root'
 
@@ -60,6 +62,85 @@ class ChainTestCase(unittest.TestCase):
         event = self.chain[2]
         self.assertEqual(event.var1, 2.)
 
+    def test_file_index(self):
+        '''Test the tree name and number of entries taken from a file index'''
+        outdir = tempfile.mkdtemp()
+        index = os.path.join(outdir, 'index.json')
+        chain = Chain(testfname, options=dict(file_index=index))
+        self.assertTrue(os.path.isfile(index))
+        self.assertEqual(len(chain), self.nevents)
+        chain = Chain(testfname, options=dict(file_index=index))
+        self.assertEqual(len(chain), self.nevents)
+        self.assertEqual(chain[2].var1, 2.)
+        shutil.rmtree(outdir)
+
+
+@unittest.skipIf(context.name=='bare', 'ROOT not available')
+class BranchLearningTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.outdir, 'tree.root')
+        rootfile = TFile(self.fname, 'recreate')
+        tree = Tree('tree', 'a tree with several branches')
+        for name in ['var1', 'var2', 'var3']:
+            tree.var(name)
+        for i in range(20):
+            tree.fill('var1', i)
+            tree.fill('var2', 2 * i)
+            tree.fill('var3', 3 * i)
+            tree.tree.Fill()
+        rootfile.Write()
+        rootfile.Close()
+        self.branches_file = os.path.join(self.outdir, 'branches.txt')
+        self.options = dict(learn_branches=5, branches_file=self.branches_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def read_branches_file(self):
+        with open(self.branches_file) as infile:
+            return infile.read().split()
+
+    def test_learning(self):
+        chain = Chain(self.fname, 'tree', options=self.options)
+        for i in range(5):
+            self.assertEqual(chain[i].var1, i)
+        self.assertFalse(os.path.isfile(self.branches_file))
+        self.assertEqual(chain[5].var1, 5)
+        self.assertEqual(self.read_branches_file(), ['var1'])
+        # var2 is not read anymore, but enabled when accessed
+        self.assertEqual(chain[6].var2, 12)
+        self.assertEqual(self.read_branches_file(), ['var1', 'var2'])
+        self.assertEqual(chain[7].var2, 14)
+        report = chain.read_report()
+        self.assertTrue('all branches' in report)
+        self.assertTrue('selected branches' in report)
+        # the next chain only reads the branches listed in the file
+        chain = Chain(self.fname, 'tree', options=self.options)
+        event = chain[0]
+        self.assertEqual((event.var1, event.var2), (0, 0))
+        self.assertTrue('all branches' not in chain.read_report())
+
+    def test_indirect_access(self):
+        '''the branches given by name to the TChain methods are recorded'''
+        chain = Chain(self.fname, 'tree', options=self.options)
+        for i in range(6):
+            self.assertEqual(chain[i].GetLeaf('var2').GetValue(), 2 * i)
+        self.assertEqual(self.read_branches_file(), ['var2'])
+        self.assertEqual(chain[7].GetLeaf('var2').GetValue(), 14)
+        # var3 is enabled when accessed through its leaf
+        self.assertEqual(chain[8].GetLeaf('var3').GetValue(), 24)
+        self.assertEqual(self.read_branches_file(), ['var2', 'var3'])
+
+    def test_no_access(self):
+        '''If no branch is accessed, e.g. when reading ahead, all branches are kept'''
+        chain = Chain(self.fname, 'tree', options=self.options)
+        for i in range(10):
+            chain[i]
+        self.assertFalse(os.path.isfile(self.branches_file))
+        self.assertEqual(chain[10].var3, 30)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from eventcache import EventCache, cache_key
+import config as cfg
+from analyzer import Analyzer
+
+
+class EventCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.dirname = os.path.join(self.outdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_store(self):
+        cache = EventCache(self.dirname)
+        for iEv in range(10):
+            cache.put(iEv, dict(x=iEv, y=range(iEv)))
+        self.assertEqual(cache.get(3), dict(x=3, y=range(3)))
+        self.assertTrue(cache.get(10) is None)
+        # not visible to other caches before closing
+        self.assertEqual(len(EventCache(self.dirname)), 0)
+        cache.close()
+        other = EventCache(self.dirname)
+        self.assertEqual(len(other), 10)
+        other.put(10, dict(x=10))
+        other.close()
+        cache = EventCache(self.dirname)
+        self.assertEqual(cache.get(10), dict(x=10))
+        self.assertEqual(cache.get(9)['y'], range(9))
+
+    def test_key(self):
+        comp = cfg.Component('comp', files=[])
+        ana = cfg.Analyzer(Analyzer, 'ana', cut=lambda x: x > 1, verbose=False)
+        key = cache_key([ana], comp)
+        self.assertEqual(key, cache_key([ana.clone(verbose=True)], comp))
+        self.assertEqual(key, cache_key([ana.clone(cut=lambda x: x > 1)], comp))
+        self.assertNotEqual(key, cache_key([ana.clone(cut=lambda x: x > 2)], comp))
+        self.assertNotEqual(key, cache_key([ana.clone(instance_label='other')], comp))
+        # attribute called in a function
+        ana = cfg.Analyzer(Analyzer, 'ana', cut=lambda p: p.pt() > 10)
+        key = cache_key([ana], comp)
+        self.assertNotEqual(key, cache_key([ana.clone(cut=lambda p: p.e() > 10)], comp))
+        # value of a closure cell
+        def make_cut(ptmin):
+            return lambda p: p.pt() > ptmin
+        ana = cfg.Analyzer(Analyzer, 'ana', cut=make_cut(10))
+        key = cache_key([ana], comp)
+        self.assertEqual(key, cache_key([ana.clone(cut=make_cut(10))], comp))
+        self.assertNotEqual(key, cache_key([ana.clone(cut=make_cut(20))], comp))
+        # global referenced by a function
+        global PTMIN
+        ana = cfg.Analyzer(Analyzer, 'ana', cut=lambda p: p.pt() > PTMIN)
+        PTMIN = 10
+        key = cache_key([ana], comp)
+        PTMIN = 20
+        self.assertNotEqual(key, cache_key([ana], comp))
+        fname = os.path.join(self.outdir, 'input.txt')
+        with open(fname, 'w') as out:
+            out.write('data')
+        key = cache_key([ana], cfg.Component('comp', files=[fname]))
+        with open(fname, 'a') as out:
+            out.write('more data')
+        self.assertNotEqual(key, cache_key([ana], cfg.Component('comp', files=[fname])))
+
+    def test_source_files(self):
+        '''the modules used by an analyzer are hashed'''
+        from heppy.analyzers.IsolationAnalyzer import IsolationAnalyzer
+        from eventcache import _source_files
+        names = ['/'.join(os.path.abspath(fname).split(os.sep)[-2:])
+                 for fname in _source_files(IsolationAnalyzer)]
+        self.assertTrue('analyzers/IsolationAnalyzer.py' in names)
+        self.assertTrue('particles/isolation.py' in names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from fileindex import FileIndex
+import config as cfg
+
+
+class FileIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.outdir, 'index.json')
+        self.files = []
+        for name, nentries in [('a', 10), ('b', 50), ('c', 40)]:
+            fname = os.path.join(self.outdir, name + '.root')
+            with open(fname, 'w') as out:
+                out.write(name)
+            self.files.append(fname)
+        index = FileIndex(self.path)
+        for fname, nentries in zip(self.files, [10, 50, 40]):
+            index.set(fname, dict(events=nentries))
+        index.write()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_read(self):
+        index = FileIndex(self.path)
+        self.assertEqual(index.tree_name(self.files), 'events')
+        self.assertEqual(index.entries(self.files[1], 'events'), 50)
+        # no scan needed
+        self.assertTrue(index.update(self.files) is index)
+
+    def test_stale(self):
+        '''a file modified after indexing is not taken from the index'''
+        with open(self.files[0], 'a') as out:
+            out.write('more data')
+        index = FileIndex(self.path)
+        self.assertTrue(index.get(self.files[0]) is None)
+        self.assertTrue(index.get(self.files[1]) is not None)
+
+    def test_several_trees(self):
+        index = FileIndex(self.path)
+        index.set(self.files[0], dict(events=10, other=3))
+        self.assertRaises(ValueError, index.tree_name, self.files)
+
+    def test_split(self):
+        '''the chunks have the same number of events'''
+        comp = cfg.Component('comp', self.files, file_index=self.path)
+        comp.splitFactor = 4
+        chunks = cfg.split([comp])
+        self.assertEqual([chunk.eventRange for chunk in chunks],
+                         [(0, 25), (15, 25), (40, 25), (15, 25)])
+        self.assertEqual([len(chunk.files) for chunk in chunks], [2, 1, 2, 1])
+        self.assertEqual(chunks[2].files, self.files[1:])
+        self.assertEqual(chunks[3].name, 'comp_Chunk3')
+
+    def test_fine_split(self):
+        comp = cfg.Component('comp', self.files, file_index=self.path)
+        comp.fineSplitFactor = 2
+        chunks = cfg.split([comp])
+        self.assertEqual(len(chunks), 6)
+        nevents = [chunk.eventRange[1] for chunk in chunks]
+        self.assertEqual(sum(nevents), 100)
+        self.assertTrue(max(nevents) - min(nevents) <= 1)
+
+    def test_no_split(self):
+        comp = cfg.Component('comp', self.files, file_index=self.path)
+        self.assertEqual(cfg.split([comp]), [comp])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import pickle
+
+from merging import merge_dirs, merge_pck, prepare_merge, tree_merge, record_merged
+from heppy.statistics.counter import Counter
+from heppy.statistics.average import Average
+
+
+class TestMerging(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.idirs = []
+        for i in range(3):
+            idir = '/'.join([self.outdir, 'Worker_{}'.format(i)])
+            os.makedirs('/'.join([idir, 'analyzer']))
+            counter = Counter('counter')
+            counter.register('all events')
+            counter.inc('all events', i + 1)
+            counter.write('/'.join([idir, 'analyzer']))
+            average = Average('average')
+            average.add(i)
+            average.write('/'.join([idir, 'analyzer']))
+            with open('/'.join([idir, 'config.pck']), 'w') as pckfile:
+                pickle.dump(i, pckfile)
+            self.idirs.append(idir)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_merge_dirs(self):
+        odir = '/'.join([self.outdir, 'merged'])
+        merge_dirs(self.idirs, odir, skip=['config.pck'])
+        with open('/'.join([odir, 'analyzer', 'counter.pck'])) as pckfile:
+            counter = pickle.load(pckfile)
+        self.assertEqual(counter['all events'][1], 6)
+        with open('/'.join([odir, 'analyzer', 'average.pck'])) as pckfile:
+            average = pickle.load(pckfile)
+        self.assertEqual(average.value(), 1.)
+        self.assertTrue(os.path.isfile('/'.join([odir, 'analyzer', 'counter.txt'])))
+        self.assertFalse(os.path.isfile('/'.join([odir, 'config.pck'])))
+
+    def test_copy_other(self):
+        '''the files which cannot be merged are copied from the first directory'''
+        for i, idir in enumerate(self.idirs):
+            for fname in ['log.txt', 'analyzer/summary.yaml']:
+                with open('/'.join([idir, fname]), 'w') as outfile:
+                    outfile.write('worker {}\n'.format(i))
+        odir = '/'.join([self.outdir, 'merged'])
+        os.makedirs(odir)
+        with open('/'.join([odir, 'log.txt']), 'w') as outfile:
+            outfile.write('main\n')
+        merge_dirs(self.idirs, odir, skip=['config.pck'], copy_other=True)
+        with open('/'.join([odir, 'analyzer', 'summary.yaml'])) as infile:
+            self.assertEqual(infile.read(), 'worker 0\n')
+        # existing files are kept
+        with open('/'.join([odir, 'log.txt'])) as infile:
+            self.assertEqual(infile.read(), 'main\n')
+        # the text files of the merged objects are written again
+        with open('/'.join([odir, 'analyzer', 'counter.txt'])) as infile:
+            self.assertTrue('6' in infile.read())
+
+
+
+class TestTreeMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.chunks = [self.make_chunk(i) for i in range(11)]
+        self.odir = '/'.join([self.outdir, 'comp'])
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def make_chunk(self, i):
+        idir = '/'.join([self.outdir, 'comp_Chunk{}'.format(i)])
+        os.makedirs('/'.join([idir, 'analyzer']))
+        counter = Counter('counter')
+        counter.register('all events')
+        counter.inc('all events', i + 1)
+        counter.write('/'.join([idir, 'analyzer']))
+        with open('/'.join([idir, 'software.yaml']), 'w') as yamlfile:
+            yamlfile.write('chunk: {}\n'.format(i))
+        return idir
+
+    def make_config(self):
+        '''writes in each chunk a config.pck referring to the __cfg_to_run__ module
+        of the chunk, as done by heppy_batch'''
+        for idir in self.chunks:
+            with open('/'.join([idir, '__cfg_to_run__.py']), 'w') as cfgfile:
+                cfgfile.write('def is_lepton(ptc):\n    return True\n')
+        sys.path.insert(0, self.chunks[0])
+        try:
+            import __cfg_to_run__
+            for idir in self.chunks:
+                with open('/'.join([idir, 'config.pck']), 'w') as pckfile:
+                    pickle.dump(dict(filter_func=__cfg_to_run__.is_lepton), pckfile)
+        finally:
+            sys.path.pop(0)
+            del sys.modules['__cfg_to_run__']
+
+    def test_config(self):
+        '''the config.pck files are merged or copied without __cfg_to_run__ in sys.path'''
+        self.make_config()
+        try:
+            merge_pck(['/'.join([idir, 'config.pck']) for idir in self.chunks[:2]],
+                      '/'.join([self.outdir, 'config.pck']))
+            idirs, jobs = prepare_merge(self.chunks, self.odir, copy_ext=['.yaml', '.py'])
+            self.assertEqual(len(jobs), 1)
+            tree_merge(jobs, nprocs=2, fanin=2)
+            self.assertTrue(os.path.isfile('/'.join([self.odir, 'config.pck'])))
+            self.assertTrue(os.path.isfile('/'.join([self.odir, '__cfg_to_run__.py'])))
+        finally:
+            sys.modules.pop('__cfg_to_run__', None)
+
+    def merged_count(self):
+        with open('/'.join([self.odir, 'analyzer', 'counter.pck'])) as pckfile:
+            return pickle.load(pckfile)['all events'][1]
+
+    def test_tree_merge(self):
+        idirs, jobs = prepare_merge(self.chunks, self.odir, copy_ext=['.yaml'])
+        self.assertEqual(len(jobs), 1)
+        progress = []
+        tree_merge(jobs, nprocs=2, fanin=2,
+                   progress=lambda *args: progress.append(args))
+        self.assertEqual(self.merged_count(), 66)
+        self.assertTrue(os.path.isfile('/'.join([self.odir, 'software.yaml'])))
+        self.assertTrue(os.path.isfile('/'.join([self.odir, 'analyzer', 'counter.txt'])))
+        # 11 -> 6 -> 3 -> 2 -> 1 files
+        self.assertEqual([args for args in progress if args[1] == args[2]],
+                         [(0, 5, 5), (1, 3, 3), (2, 1, 1), (3, 1, 1)])
+        # no intermediate file left
+        self.assertEqual(sorted(os.listdir(self.odir)),
+                         ['analyzer', 'software.yaml'])
+
+    def test_incremental(self):
+        idirs, jobs = prepare_merge(self.chunks[:3], self.odir, incremental=True)
+        tree_merge(jobs)
+        record_merged(self.odir, idirs)
+        self.assertEqual(self.merged_count(), 6)
+        idirs, jobs = prepare_merge(self.chunks, self.odir, incremental=True)
+        self.assertEqual(idirs, self.chunks[3:])
+        # the existing result is merged with the new chunks
+        self.assertEqual(len(jobs[0][0]), 9)
+        tree_merge(jobs, fanin=3)
+        record_merged(self.odir, idirs)
+        self.assertEqual(self.merged_count(), 66)
+        idirs, jobs = prepare_merge(self.chunks, self.odir, incremental=True)
+        self.assertEqual(jobs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import multiprocessing
+import Queue
+
+from prefetch import ReadAhead
+
+
+class Events(object):
+    '''Indexed events reporting the entries read to a queue'''
+
+    def __init__(self, nevents, reads):
+        self.nevents = nevents
+        self.reads = reads
+
+    def __len__(self):
+        return self.nevents
+
+    def __getitem__(self, index):
+        self.reads.put(index)
+        return index
+
+
+class IterableEvents(object):
+    '''Events that can only be iterated'''
+
+    def __init__(self, nevents, reads):
+        self.nevents = nevents
+        self.reads = reads
+
+    def __iter__(self):
+        for index in range(self.nevents):
+            self.reads.put(index)
+            yield index
+
+
+class TestReadAhead(unittest.TestCase):
+
+    def read(self, reads, nreads):
+        return [reads.get(timeout=5) for i in range(nreads)]
+
+    def assertNothingRead(self, reads):
+        self.assertRaises(Queue.Empty, reads.get, timeout=0.1)
+
+    def check(self, events_class):
+        reads = multiprocessing.Queue()
+        read_ahead = ReadAhead(lambda: events_class(20, reads), 3, 5, 15)
+        if events_class is IterableEvents:
+            # the first entries have to be read to get to the first one
+            self.assertEqual(self.read(reads, 5), range(5))
+        # the entries are read up to depth entries ahead of the current one
+        self.assertEqual(self.read(reads, 4), [5, 6, 7, 8])
+        self.assertNothingRead(reads)
+        read_ahead.done()
+        read_ahead.done()
+        self.assertEqual(self.read(reads, 2), [9, 10])
+        self.assertNothingRead(reads)
+        # and not beyond the last entry
+        for i in range(10):
+            read_ahead.done()
+        self.assertEqual(self.read(reads, 4), [11, 12, 13, 14])
+        self.assertNothingRead(reads)
+        self.assertTrue(read_ahead.stop())
+
+    def test_indexed(self):
+        self.check(Events)
+
+    def test_iterable(self):
+        self.check(IterableEvents)
+
+    def test_failure(self):
+        def open_events():
+            raise IOError('cannot open')
+        read_ahead = ReadAhead(open_events, 3, 0)
+        self.assertFalse(read_ahead.stop())
+
+    def test_stop(self):
+        reads = multiprocessing.Queue()
+        read_ahead = ReadAhead(lambda: Events(20, reads), 2, 0)
+        self.assertEqual(self.read(reads, 3), [0, 1, 2])
+        self.assertTrue(read_ahead.stop())
+        self.assertFalse(read_ahead.process.is_alive())
+        self.assertNothingRead(reads)
+
+
+if __name__ == '__main__':
+    unittest.main()
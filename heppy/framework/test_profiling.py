@@ -0,0 +1,96 @@
+import unittest
+import os
+import json
+import shutil
+import pickle
+import timeit
+import tempfile
+
+from profiling import AnalyzerProfiler
+
+
+def fibonacci(n):
+    if n < 2:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_summary(self):
+        profiler = AnalyzerProfiler(['ana1', 'ana2'])
+        for iEv in range(101):
+            profiler.record(0, iEv, iEv * 1e-3)
+        summary = profiler.summary(0)
+        self.assertEqual(summary['events'], 101)
+        self.assertAlmostEqual(summary['p50'], 0.05)
+        self.assertAlmostEqual(summary['p95'], 0.095)
+        self.assertAlmostEqual(summary['p99'], 0.099)
+        self.assertAlmostEqual(summary['max'], 0.1)
+        self.assertAlmostEqual(summary['mean'], 0.05)
+        self.assertEqual([slow['event'] for slow in summary['slowest']],
+                         range(100, 90, -1))
+        self.assertEqual(sum(summary['histogram']['counts']), 101)
+        self.assertEqual(profiler.summary(1), dict(name='ana2', events=0))
+
+    def test_merge(self):
+        profilers = []
+        for first in [0, 50]:
+            profiler = AnalyzerProfiler(['ana'], cprofile=True)
+            for iEv in range(first, first + 50):
+                start = timeit.default_timer()
+                profiler.start(0)
+                fibonacci(5)
+                profiler.stop(0, iEv, start)
+            profiler.record(0, first, 1.)
+            # as done when sending the profiler from a worker process
+            profilers.append(pickle.loads(pickle.dumps(profiler)))
+        total = profilers[0]
+        total += profilers[1]
+        summary = total.summary(0)
+        self.assertEqual(summary['events'], 102)
+        self.assertEqual(sorted(slow['event'] for slow in summary['slowest'][:2]),
+                         [0, 50])
+        fibo = [function for function in summary['functions']
+                if function['function'].endswith('(fibonacci)')]
+        self.assertEqual(len(fibo), 1)
+        # 15 calls for each fibonacci(5)
+        self.assertEqual(fibo[0]['calls'], 100 * 15)
+        self.assertRaises(ValueError, total.__iadd__, AnalyzerProfiler(['other']))
+
+    def test_write(self):
+        profiler = AnalyzerProfiler(['ana1', 'ana2'], cprofile=True)
+        for iEv in range(10):
+            for index in range(2):
+                start = timeit.default_timer()
+                profiler.start(index)
+                fibonacci(15)
+                profiler.stop(index, iEv, start)
+        profiler.write(self.outdir)
+        with open(os.path.join(self.outdir, 'profile.json')) as infile:
+            data = json.load(infile)
+        self.assertEqual([ana['name'] for ana in data['analyzers']], ['ana1', 'ana2'])
+        with open(os.path.join(self.outdir, 'profile.folded')) as infile:
+            lines = infile.readlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, time = line.rsplit(' ', 1)
+            self.assertTrue(stack.split(';')[0] in ['ana1', 'ana2'])
+            self.assertTrue(int(time) > 0)
+            # the profiler functions are not shown
+            self.assertFalse(any(frame.startswith('profiling.py:')
+                                 for frame in stack.split(';')))
+        self.assertTrue(any('(fibonacci)' in line for line in lines))
+        for name in ['ana1', 'ana2']:
+            fname = os.path.join(self.outdir, 'profile_{}.prof'.format(name))
+            self.assertTrue(os.path.isfile(fname))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from scheduler import Scheduler, dependencies, declare, SINK
+import config as cfg
+from analyzer import Analyzer
+from heppy.analyzers.Selector import Selector
+from heppy.analyzers.EventFilter import EventFilter
+from heppy.analyzers.Tagger import Tagger
+from heppy.analyzers.Matcher import Matcher
+from heppy.analyzers.IsolationAnalyzer import IsolationAnalyzer
+
+
+class TreeProducer(Analyzer):
+    pass
+
+declare(TreeProducer, inputs=['collections'], role=SINK)
+
+
+def heppy_analyzer(name):
+    '''class with the name of the heppy analyzer name, to test its declaration
+    without importing it'''
+    return type(name, (Analyzer,), dict(__module__='heppy.analyzers.' + name))
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        select = lambda ptc: True
+        self.sel_leptons = cfg.Analyzer(Selector, 'sel_leptons',
+                                        input_objects='rec_particles',
+                                        output='leptons', filter_func=select)
+        self.sel_jets = cfg.Analyzer(Selector, 'sel_jets',
+                                     input_objects='rec_particles',
+                                     output='jets', filter_func=select)
+        self.sel_good = cfg.Analyzer(Selector, 'sel_good',
+                                     input_objects='leptons',
+                                     output='good_leptons', filter_func=select)
+        self.lepton_filter = cfg.Analyzer(EventFilter, 'lepton_filter',
+                                          input_objects='leptons',
+                                          min_number=2, veto=False)
+        self.tagger = cfg.Analyzer(Tagger, 'tagger',
+                                   input_objects='good_leptons', tags=dict())
+        self.tree = cfg.Analyzer(TreeProducer, 'tree',
+                                 collections=['good_leptons'])
+
+    def test_dependencies(self):
+        matcher = cfg.Analyzer(Matcher, particles='jets',
+                               match_particles=[('gen_particles', None),
+                                                ('gen_particles', 211)])
+        self.assertEqual(dependencies(matcher),
+                         (set(['jets', 'gen_particles']), set(['jets']), 'producer'))
+        self.assertEqual(dependencies(cfg.Analyzer(Analyzer)), (None, None, SINK))
+        explicit = cfg.Analyzer(Analyzer, event_inputs=['a'], event_outputs=['b'])
+        self.assertEqual(dependencies(explicit), (set(['a']), set(['b']), 'producer'))
+
+    def test_schedule(self):
+        sequence = cfg.Sequence([self.sel_leptons, self.sel_jets, self.sel_good,
+                                 self.tagger, self.lepton_filter, self.tree])
+        scheduler = Scheduler(sequence)
+        self.assertTrue(isinstance(scheduler.sequence, cfg.Sequence))
+        self.assertEqual(scheduler.sequence,
+                         [self.sel_leptons, self.lepton_filter, self.sel_good,
+                          self.tagger, self.tree])
+        self.assertEqual(scheduler.removed, [self.sel_jets])
+        self.assertEqual(scheduler.moved, [self.lepton_filter])
+        # the original sequence is not modified
+        self.assertEqual(len(sequence), 6)
+
+    def test_unknown(self):
+        '''an analyzer without declaration may use any attribute'''
+        unknown = cfg.Analyzer(Analyzer, 'unknown')
+        sequence = [self.sel_leptons, self.sel_jets, unknown,
+                    self.sel_good, self.lepton_filter]
+        scheduler = Scheduler(sequence)
+        self.assertEqual(scheduler.sequence,
+                         [self.sel_leptons, self.sel_jets, unknown,
+                          self.lepton_filter])
+        self.assertEqual(scheduler.removed, [self.sel_good])
+
+    def test_filter_order(self):
+        '''filters are not moved before other filters or sinks'''
+        skipper = cfg.Analyzer(EventFilter, 'other_filter',
+                               input_objects='rec_particles',
+                               min_number=1, veto=False)
+        sequence = [self.sel_leptons, self.tree, self.sel_jets,
+                    self.lepton_filter, skipper, self.sel_good]
+        scheduler = Scheduler(sequence)
+        self.assertEqual(scheduler.sequence,
+                         [self.sel_leptons, self.tree, self.lepton_filter, skipper])
+
+    def test_in_place(self):
+        '''an analyzer modifying objects also selected in another collection is kept'''
+        isolation = cfg.Analyzer(IsolationAnalyzer, 'isolation',
+                                 candidates='leptons',
+                                 particles='rec_particles',
+                                 iso_area=None)
+        tree = cfg.Analyzer(TreeProducer, 'tree', collections=['good_leptons'])
+        sequence = [self.sel_leptons, self.sel_good, isolation, tree]
+        scheduler = Scheduler(sequence)
+        self.assertEqual(scheduler.sequence, sequence)
+        self.assertEqual(scheduler.removed, [])
+
+    def test_papas(self):
+        '''PapasSim may reject events, and is kept even if its outputs are not used'''
+        papas = cfg.Analyzer(heppy_analyzer('PapasSim'), 'papas',
+                             gen_particles='gen_particles',
+                             sim_particles='sim_particles')
+        btag = cfg.Analyzer(heppy_analyzer('ParametrizedBTagger'), 'btag',
+                            input_jets='jets')
+        self.assertEqual(dependencies(btag)[0],
+                         set(['jets', 'papasevent', 'gen_particles', 'gen_vertices']))
+        self.assertEqual(dependencies(btag)[1], set(['jets', 'genbrowser']))
+        sequence = [self.sel_leptons, papas, self.sel_good, self.tree]
+        scheduler = Scheduler(sequence)
+        self.assertEqual(scheduler.removed, [])
+        self.assertEqual(scheduler.sequence, [papas, self.sel_leptons,
+                                              self.sel_good, self.tree])
+
+
+if __name__ == '__main__':
+    unittest.main()
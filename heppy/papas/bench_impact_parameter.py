@@ -0,0 +1,75 @@
+'''Benchmark of the impact parameter computation.
+
+Usage:
+    python bench_impact_parameter.py [ntracks ...]
+
+For each number of tracks in a toy jet, the wall time per track is printed for:
+- scipy: the former minimisation with scipy.optimize.minimize_scalar (brent method)
+- newton: the Newton minimisation, one helix at a time (ImpactParameter)
+- batch: the Newton minimisation, all helices of the jet at once (impact_parameters)
+The largest relative difference between the scipy and batch impact parameters
+is also given. The scipy minimisation stops when the time is known to 1e-11 s,
+which gives large relative differences for the tracks with a small IP:
+the Newton minimisation always finds a smaller distance, see test_path.py.
+'''
+import sys
+import math
+import random
+import timeit
+import scipy.optimize
+from ROOT import TVector3, TLorentzVector
+from heppy.papas.path import Helix, ImpactParameter, impact_parameters
+
+
+def make_jet(ntracks, seed=0xdead):
+    '''Returns a list of ntracks helices coming from displaced vertices,
+    and the jet direction'''
+    rng = random.Random(seed)
+    helices = []
+    for i in range(ntracks):
+        p4 = TLorentzVector()
+        p4.SetPtEtaPhiM(rng.uniform(0.5, 50), rng.uniform(-0.5, 0.5),
+                        rng.uniform(-0.5, 0.5), 0.14)
+        vertex = TVector3(rng.gauss(0, 1e-3), rng.gauss(0, 1e-3), rng.gauss(0, 1e-3))
+        helices.append(Helix(2., rng.choice([-1, 1]), p4, vertex))
+    return helices, TVector3(1, 0, 0)
+
+
+def scipy_ip(helix, origin):
+    '''impact parameter value with the former scipy minimisation'''
+    def distquad(time):
+        x, y, z = helix.coord_at_time(time)
+        return (x-origin.x())**2 + (y-origin.y())**2 + (z-origin.z())**2
+    time = scipy.optimize.minimize_scalar(
+        distquad, method='brent', bracket=[-5e-9, 5e-9],
+        options={'xtol': 1e-20, 'maxiter': 1e5}, tol=None).x
+    return (helix.point_at_time(time) - origin).Mag()
+
+
+def timed(func):
+    start = timeit.default_timer()
+    result = func()
+    return result, timeit.default_timer() - start
+
+
+def main(sizes):
+    origin = TVector3(0, 0, 0)
+    print '{:>8} {:>12} {:>12} {:>12} {:>10}'.format(
+        'tracks', 'scipy(us)', 'newton(us)', 'batch(us)', 'max diff')
+    for size in sizes:
+        helices, jet_dir = make_jet(size)
+        ref, time_scipy = timed(lambda: [scipy_ip(helix, origin) for helix in helices])
+        single, time_newton = timed(
+            lambda: [ImpactParameter(helix, origin, jet_dir) for helix in helices])
+        batch, time_batch = timed(lambda: impact_parameters(helices, origin, jet_dir))
+        diff = max(abs(abs(ip.value) - value) / value for ip, value in zip(batch, ref))
+        print '{:>8} {:>12.1f} {:>12.1f} {:>12.1f} {:>10.2e}'.format(
+            size, time_scipy / size * 1e6, time_newton / size * 1e6,
+            time_batch / size * 1e6, diff)
+
+
+if __name__ == '__main__':
+    sizes = [1, 10, 30, 100]
+    if len(sys.argv) > 1:
+        sizes = map(int, sys.argv[1:])
+    main(sizes)
@@ -0,0 +1,94 @@
+'''Benchmark of the propagation of particles to the detector cylinders.
+
+Usage:
+    python bench_propagator.py [nparticles [nevents]]
+
+Prints the time per event:
+ - to simulate events of nparticles charged and neutral hadrons and photons
+   with the CMS detector;
+ - to propagate the particles to all detector cylinders one by one,
+   with the helix built once per particle or once per cylinder;
+ - to propagate them with propagate_arrays.
+'''
+import sys
+import math
+import timeit
+import heppy.statistics.rrandom as random
+from heppy.papas.detectors.CMS import CMS
+from heppy.papas.simulator import Simulator
+from heppy.papas.propagator import propagator, propagate_arrays
+from heppy.papas.toyevents import particle
+from heppy.papas.graphtools.DAG import Node
+
+
+def make_event(nparticles):
+    ptcs = []
+    for i in range(nparticles):
+        pdgid = [211, -211, 130, 22][i % 4]
+        ptc = particle(pdgid, random.uniform(0.3, math.pi - 0.3),
+                       random.uniform(-math.pi, math.pi),
+                       random.uniform(1., 20.))
+        ptc.set_dagid(i)
+        ptcs.append(ptc)
+    return ptcs
+
+
+def simulate(detector, events):
+    simulator = Simulator(detector)
+    start = timeit.default_timer()
+    for ptcs in events:
+        simulator.simulate(ptcs, dict())
+    return timeit.default_timer() - start
+
+
+def propagate_one_by_one(detector, events, rebuild):
+    field = detector.elements['field'].magnitude
+    cylinders = detector.cylinders()
+    start = timeit.default_timer()
+    for ptcs in events:
+        for ptc in ptcs:
+            ptc.path = None
+            for cylinder in cylinders:
+                if rebuild:
+                    ptc._propagator_path = None
+                propagator(ptc.q()).propagate_one(ptc, cylinder, field)
+    return timeit.default_timer() - start
+
+
+def propagate_batch(detector, events):
+    field = detector.elements['field'].magnitude
+    cylinders = detector.cylinders()
+    start = timeit.default_timer()
+    for ptcs in events:
+        p4s = [ptc.p4() for ptc in ptcs]
+        propagate_arrays([ptc.q() for ptc in ptcs],
+                         [(p4.Px(), p4.Py(), p4.Pz()) for p4 in p4s],
+                         [p4.E() for p4 in p4s],
+                         [(ptc.vertex.X(), ptc.vertex.Y(), ptc.vertex.Z())
+                          for ptc in ptcs],
+                         cylinders, field)
+    return timeit.default_timer() - start
+
+
+def main(nparticles, nevents):
+    random.seed(0xdead)
+    detector = CMS()
+    events = [make_event(nparticles) for i in range(nevents)]
+    print 'time per event of {} particles, in ms'.format(nparticles)
+    print '{:>45} {:>8.2f}'.format('simulation', simulate(detector, events) / nevents * 1e3)
+    events = [make_event(nparticles) for i in range(nevents)]
+    for rebuild, label in [(True, 'propagation, helix built for each cylinder'),
+                           (False, 'propagation, helix built once')]:
+        time = propagate_one_by_one(detector, events, rebuild)
+        print '{:>45} {:>8.2f}'.format(label, time / nevents * 1e3)
+    print '{:>45} {:>8.2f}'.format('propagate_arrays',
+                                   propagate_batch(detector, events) / nevents * 1e3)
+
+
+if __name__ == '__main__':
+    nparticles, nevents = 100, 20
+    if len(sys.argv) > 1:
+        nparticles = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        nevents = int(sys.argv[2])
+    main(nparticles, nevents)
@@ -4,6 +4,15 @@ import struct
 from itertools import count
 from heppy.utils.pdebug import pdebugger
 
+_float_struct = struct.Struct('>f')
+_long_struct = struct.Struct('>l')
+
+#single letter for each PFOBJECTTYPE, the enum value (0 to 7) indexes into this string
+_type_letters = ".ehtpb.."
+
+#type and subtype strings indexed by the 11 upper bits of an identifier (type and subtype)
+_type_and_subtypes = [_type_letters[key >> 8] + chr(key & 0b11111111) for key in range(1 << 11)]
+
 class IdCoder(long):
     '''The Idcoder creates/manages an identifier (a uniqueid) that contains encoded information about an element
     
@@ -24,8 +33,13 @@ class IdCoder(long):
     subtype
     value (small to large)
     index
+
+    By default, the identifiers are not decoded again for verification when created.
+    Set IdCoder.debug to True to check each new identifier.
         '''    
 
+    debug = False
+
 
     class PFOBJECTTYPE:
         NONE = 0
@@ -44,19 +58,19 @@ class IdCoder(long):
         @param value: a float reprenting energy or momentum etc
         '''
         assert(value >= 0) #actually I would like it to work with negative numbers but need to change float to bit conversions
-        #shift all the parts and join together	
-        typeshift = type << 61
-        valueshift = IdCoder._float_to_bits(value) << 21
-        subtypeshift = ord(subtype.lower()) << 53
-        uid = subtypeshift | valueshift | typeshift | index
-        #verify		
-        assert (IdCoder.get_index(uid) == index )
-        if value != 0:
-            assert(abs(IdCoder.get_value(uid) - value) < abs(value) * 10 ** -6)
-        assert (IdCoder.get_type(uid) == type)
-        assert (IdCoder.get_subtype(uid) == subtype)
         if index >= 2**(21 -1):
             raise ValueError('identifer index has exceeded maximum value allowed')
+        #shift all the parts and join together	
+        uid = (ord(subtype.lower()) << 53) | \
+              (_long_struct.unpack(_float_struct.pack(value))[0] << 21) | \
+              (type << 61) | index
+        if cls.debug:
+            #verify
+            assert (IdCoder.get_index(uid) == index )
+            if value != 0:
+                assert(abs(IdCoder.get_value(uid) - value) < abs(value) * 10 ** -6)
+            assert (IdCoder.get_type(uid) == type)
+            assert (IdCoder.get_subtype(uid) == subtype)
         return uid
 
     @staticmethod      
@@ -145,36 +159,41 @@ class IdCoder(long):
     def type_letter(ident): #character/letter for this type
         '''returns a single letter representation of the PFOBJECTTYPE type eg 'p' for particle
         @param ident: unique identifier'''     
-        typelist=".ehtpb..." #the enum value (0 to 8) will index into this and return E is it is ECAL etc
-        return typelist[IdCoder.get_type(ident)]    
+        return _type_letters[ident >> 61 & 0b111]
 
     @staticmethod
     def type_and_subtype(ident):
         '''returns a two  letter representation of the type/ subtype eg 'pr' for reconstructed particle
         @param ident: unique identifier
         '''        
-        return  IdCoder.type_letter(ident) + IdCoder.get_subtype(ident) 
+        return _type_and_subtypes[ident >> 53 & 0b11111111111]
+
+    @staticmethod
+    def type_key(ident):
+        '''returns an integer which identifies the type and subtype, 
+        and can be used instead of type_and_subtype without building a string
+        @param ident: unique identifier
+        '''
+        return ident >> 53 & 0b11111111111
 
     @staticmethod
     def pretty(ident):
         '''returns a pretty string representation of the identifier with the two letter typ_and_subtype and the uniqueid
            @param ident: unique identifier
         '''          
-        return  IdCoder.type_and_subtype(ident) + str(IdCoder.get_index(ident))
+        return  _type_and_subtypes[ident >> 53 & 0b11111111111] + str(ident & 0b111111111111111111111)
 
     @staticmethod
     def _float_to_bits (floatvalue):  #standard float packing
         '''takes a float and returns a bit representation
         @param floatvalue: float'''
-        s = struct.pack('>f', floatvalue)
-        return struct.unpack('>l', s)[0]  # 32bit representation
+        return _long_struct.unpack(_float_struct.pack(floatvalue))[0]  # 32bit representation
 
     @staticmethod
     def _bits_to_float (bitvalue):
         '''takes a bit vlaue and returns a float representation
         @param bitvalue: bitvalue'''
-        s = struct.pack('>l', bitvalue)
-        return struct.unpack('>f', s)[0]	
+        return _float_struct.unpack(_long_struct.pack(bitvalue))[0]
     
     @classmethod
     def reset(cls):
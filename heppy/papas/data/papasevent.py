@@ -45,6 +45,8 @@ class PapasEvent(Event):
         IdCoder.reset()
         self.collections = dict()
         self.history = dict()    
+        #type_and_subtype of the collections, indexed by IdCoder.type_key, for get_object
+        self._type_names = dict()
         
     def add_collection(self, collection):
         '''Add a new collection into the PapasEvent. The collection should contain only one object type
@@ -60,6 +62,7 @@ class PapasEvent(Event):
         if the_type in self.collections:
             raise ValueError('type already present')
         self.collections[the_type] = collection        
+        self._type_names[IdCoder.type_key(next(iter(collection)))] = the_type
     
     def get_collection(self, type_and_subtype):
         return self.collections.get(type_and_subtype, {})
@@ -70,7 +73,7 @@ class PapasEvent(Event):
         #would it be better to let it fail when asking for something that does not exist like this:
         #    return self.get_collections(Identifier.type_and_subtype(uid))[uid]
         #
-        collection = self.get_collection(IdCoder.type_and_subtype(uid))
+        collection = self.collections.get(self._type_names.get(IdCoder.type_key(uid)))
         if collection:
             return collection.get(uid, None)
         return None
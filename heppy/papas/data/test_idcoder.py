@@ -1,5 +1,7 @@
 import unittest
 import itertools
+import random
+import struct
 from idcoder import IdCoder 
 
 class TestIdentifier(unittest.TestCase):
@@ -20,6 +22,28 @@ class TestIdentifier(unittest.TestCase):
         self.assertTrue(IdCoder.pretty(ids[3]) == 'ts1')
         self.assertTrue(IdCoder.get_value(ids[3]) == 0.5)        
 
+    def test_bit_layout(self):
+        '''the identifiers are the same as the ones made with struct.pack, see papascpp'''
+        rng = random.Random(0xdead)
+        for debug in [False, True]:
+            IdCoder.debug = debug
+            for i in range(1000):
+                pftype = rng.randint(0, 5)
+                index = rng.randint(0, 2**20 - 1)
+                subtype = rng.choice('grutsmb')
+                value = rng.choice([0, rng.expovariate(0.1)])
+                bits = struct.unpack('>l', struct.pack('>f', value))[0]
+                expected = ord(subtype) << 53 | bits << 21 | pftype << 61 | index
+                uid = IdCoder.make_id(pftype, index, subtype, value)
+                self.assertEqual(uid, expected)
+                self.assertEqual(IdCoder.type_and_subtype(uid),
+                                 '.ehtpb'[pftype] + subtype)
+                self.assertEqual(IdCoder.type_letter(uid), '.ehtpb'[pftype])
+                self.assertEqual(IdCoder.pretty(uid),
+                                 '.ehtpb'[pftype] + subtype + str(index))
+        IdCoder.debug = False
+        self.assertRaises(ValueError, IdCoder.make_id, 1, 2**20, 'u', 1.)
+
 if __name__ == '__main__':
     unittest.main()
 
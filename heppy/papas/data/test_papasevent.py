@@ -40,6 +40,9 @@ class TestPapasEvent(unittest.TestCase):
         #check get_object
         self.assertTrue( IdCoder.pretty(papasevent.get_object(lastid))  == 'et3' )
         self.assertTrue( papasevent.get_object(499)  is None )       
+        self.assertTrue( papasevent.get_object(tracks.keys()[0]) in tracks )
+        othertrack = IdCoder.make_id(IdCoder.PFOBJECTTYPE.TRACK, 0, 'r', 4.5)
+        self.assertTrue( papasevent.get_object(othertrack) is None )
 
 if __name__ == '__main__':
     unittest.main()
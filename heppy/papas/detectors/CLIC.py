@@ -9,6 +9,7 @@ from detector import Detector, DetectorElement
 import material as material
 from geometry import VolumeCylinder
 import math
+import numpy as np
 import heppy.statistics.rrandom as random
 
 def max_eta(inner_radius, inner_z, outer_z):
@@ -63,8 +64,17 @@ class ECAL(DetectorElement):
         constant = self.eres[part][2]
         return math.sqrt( stoch**2 + noise**2 + constant**2) 
 
+    def energy_resolution_array(self, energy, eta):
+        stoch = self.eres['barrel'][0] / np.sqrt(energy)
+        noise = self.eres['barrel'][1] / energy
+        constant = self.eres['barrel'][2]
+        return np.sqrt( stoch**2 + noise**2 + constant**2)
+
     def energy_response(self, energy, eta=0):
         return 1
+
+    def energy_response_array(self, energy, eta):
+        return np.ones(len(energy))
     
     def cluster_size(self, ptc):
         '''just guessing numbers (from Mogens, as in ILD).'''
@@ -84,6 +94,13 @@ class ECAL(DetectorElement):
         else:
             return False
 
+    def acceptance_array(self, energy, eta, pt):
+        eta = np.abs(eta)
+        barrel = eta < self.eta_junction
+        endcap = ~barrel & (eta < self.maxeta)
+        return (barrel & (energy>self.emin['barrel'])) | \
+               (endcap & (energy>self.emin['endcap']))
+
     def space_resolution(self, ptc):
         pass
     
@@ -115,8 +132,17 @@ class HCAL(DetectorElement):
         constant = self.eres[2]
         return math.sqrt( stoch**2 + noise**2 + constant**2)
 
+    def energy_resolution_array(self, energy, eta):
+        stoch = self.eres[0] / np.sqrt(energy)
+        noise = self.eres[1] / energy
+        constant = self.eres[2]
+        return np.sqrt( stoch**2 + noise**2 + constant**2)
+
     def energy_response(self, energy, eta=0):
         return 1.0
+
+    def energy_response_array(self, energy, eta):
+        return np.ones(len(energy))
     
     def cluster_size(self, ptc):
         '''returns cluster size in the HCAL
@@ -132,6 +158,9 @@ class HCAL(DetectorElement):
             return energy>1.
         else:
             return False
+
+    def acceptance_array(self, energy, eta, pt):
+        return (np.abs(eta) < self.maxeta) & (energy>1.)
     
     def space_resolution(self, ptc):
         pass
@@ -182,6 +211,11 @@ class Tracker(DetectorElement):
                 return rnd < 0.99
         return False
 
+    def acceptance_array(self, pt, p, eta, theta):
+        rnd = random.uniform(0, 1, size=len(pt))
+        efficiency = np.select([pt < 0.1, pt < 0.3, pt < 1], [0., 0.9, 0.95], 0.99)
+        return (np.abs(theta) < self.__class__.theta_max) & (rnd < efficiency)
+
     def _sigpt_over_pt2(self, x, a, b, c):
         return math.sqrt( a ** 2 + (b / x**c) ** 2 )
 
@@ -201,6 +235,16 @@ class Tracker(DetectorElement):
             res = self._sigpt_over_pt2(pt, *the_pars) * pt
         return res
 
+    def resolution_array(self, pt, p, eta, theta):
+        theta = np.abs(theta) * 180 / math.pi
+        conditions = [theta < maxtheta for maxtheta, pars in reversed(self.resmap)]
+        a, b, c = [np.select(conditions, [pars[i] for maxtheta, pars in reversed(self.resmap)])
+                   for i in range(3)]
+        inmap = np.any(conditions, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res = np.sqrt( a ** 2 + (b / pt**c) ** 2 ) * pt
+        return np.where(inmap, res, 0.1)
+
     
 
 class Field(DetectorElement):
@@ -237,6 +281,10 @@ class CLIC(Detector):
         else:
             return False
 
+    def electron_acceptance_array(self, pt, p, eta, theta):
+        rnd = random.uniform(0, 1, size=len(pt))
+        return (p > 5) & (np.abs(theta) < Tracker.theta_max) & (rnd < 0.95)
+
     def electron_resolution(self, track):
         '''returns the relative electron resolution.
         
@@ -245,6 +293,9 @@ class CLIC(Detector):
         (very thin tracker, low electron energy, low ECAL resolution w/r to CMS)
         '''
         return self.elements['tracker'].resolution(track)
+
+    def electron_resolution_array(self, pt, p, eta, theta):
+        return self.elements['tracker'].resolution_array(pt, p, eta, theta)
             
     def muon_acceptance(self, track):
         '''returns True if muon is seen.
@@ -253,6 +304,9 @@ class CLIC(Detector):
         '''
         return track.p3().Mag() > 7.5 and \
                abs(track.theta()) < Tracker.theta_max
+
+    def muon_acceptance_array(self, pt, p, eta, theta):
+        return (p > 7.5) & (np.abs(theta) < Tracker.theta_max)
             
     def muon_resolution(self, track):
         '''returns the relative muon resolution.
@@ -263,6 +317,9 @@ class CLIC(Detector):
         Therefore, using the momentum resolution of the tracker (CLIC CDR, section 8.1.1)
         '''
         return self.elements['tracker'].resolution(track)
+
+    def muon_resolution_array(self, pt, p, eta, theta):
+        return self.elements['tracker'].resolution_array(pt, p, eta, theta)
     
     def ip_resolution(self, ptc):
         '''Not used yet'''
@@ -2,6 +2,7 @@ from detector import Detector, DetectorElement
 import material as material
 from geometry import VolumeCylinder
 import math
+import numpy as np
 import heppy.statistics.rrandom as random
 
 class ECAL(DetectorElement):
@@ -24,12 +25,25 @@ class ECAL(DetectorElement):
         constant = self.eres[part][2]
         return math.sqrt( stoch**2 + noise**2 + constant**2) 
 
+    def energy_resolution_array(self, energy, eta):
+        endcap = (np.abs(eta)>1.479) & (np.abs(eta)<3.0)
+        pars = np.where(endcap[:, np.newaxis], self.eres['endcap'], self.eres['barrel'])
+        stoch = pars[:, 0] / np.sqrt(energy)
+        noise = pars[:, 1] / energy
+        constant = pars[:, 2]
+        return np.sqrt( stoch**2 + noise**2 + constant**2)
+
     def energy_response(self, energy, eta=0):
         part = 'barrel'
         if abs(eta)>self.eta_crack:
             part = 'endcap'
         return self.eresp[part][0]/(1+math.exp((energy-self.eresp[part][1])/self.eresp[part][2])) #using fermi-dirac function : [0]/(1 + exp( (energy-[1]) /[2] ))
 
+    def energy_response_array(self, energy, eta):
+        endcap = np.abs(eta)>self.eta_crack
+        pars = np.where(endcap[:, np.newaxis], self.eresp['endcap'], self.eresp['barrel'])
+        return pars[:, 0]/(1+np.exp((energy-pars[:, 1])/pars[:, 2]))
+
     def cluster_size(self, ptc):
         pdgid = abs(ptc.pdgid())
         if pdgid==22 or pdgid==11:
@@ -47,6 +61,13 @@ class ECAL(DetectorElement):
         else:
             return False
 
+    def acceptance_array(self, energy, eta, pt):
+        eta = np.abs(eta)
+        barrel = eta < self.eta_crack
+        endcap = ~barrel & (eta < 2.93)
+        return (barrel & (energy>self.emin['barrel'])) | \
+               (endcap & (energy>self.emin['endcap']) & (pt>0.2))
+
     def space_resolution(self, ptc):
         pass
     
@@ -72,6 +93,11 @@ class HCAL(DetectorElement):
         constant = 0.09
         return math.sqrt( stoch**2 + noise**2 + constant**2)
 
+    def energy_resolution_array(self, energy, eta):
+        stoch = 1.1 / np.sqrt(energy)
+        constant = 0.09
+        return np.sqrt( stoch**2 + constant**2)
+
     def energy_response(self, energy, eta=0):
         return 1.
         part = 'barrel'
@@ -102,6 +128,22 @@ class HCAL(DetectorElement):
             return energy>7.
         else:
             return False
+
+    def energy_response_array(self, energy, eta):
+        return np.ones(len(energy))
+
+    def acceptance_array(self, energy, eta, pt):
+        eta = np.abs(eta)
+        rnd = random.uniform(0, 1, size=len(energy))
+        barrel = eta < self.eta_crack
+        endcap = ~barrel & (eta < 3.)
+        forward = ~barrel & ~endcap & (eta < 5.)
+        endcap_eff = np.where(energy<10.,
+                              1.05634-1.66943e-01*energy+1.05997e-02*(energy**2),
+                              8.09522e-01/(1+np.exp((energy-9.90855)/-5.30366)))
+        return (barrel & (energy>1.) & (rnd<(1/(1+np.exp((energy-1.93816)/(-1.75330)))))) | \
+               (endcap & (energy>1.1) & (rnd<endcap_eff)) | \
+               (forward & (energy>7.))
     
     def space_resolution(self, ptc):
         pass
@@ -128,11 +170,20 @@ class Tracker(DetectorElement):
         else:
             return False
 
+    def acceptance_array(self, pt, p, eta, theta):
+        eta = np.abs(eta)
+        rnd = random.uniform(0, 1, size=len(pt))
+        efficiency = np.select([eta < 1.35, eta < 2.5], [0.95, 0.9], 0.)
+        return (pt>0.5) & (rnd<efficiency)
+
     def resolution(self, track):
         # TODO: depends on the field
         pt = track.p3() .Pt()
         return 1.1e-2
 
+    def resolution_array(self, pt, p, eta, theta):
+        return np.full(len(pt), 1.1e-2)
+
     
 
 class Field(DetectorElement):
@@ -175,8 +226,17 @@ class CMS(Detector):
             else:
                 return False
 
+    def electron_acceptance_array(self, pt, p, eta, theta):
+        rnd = random.uniform(0, 1, size=len(pt))
+        eta = np.abs(eta)
+        efficiency = np.select([eta < 1.5, eta < 2.5], [0.95, 0.85], 0.)
+        return (pt >= 10.) & (rnd < efficiency)
+
     def electron_resolution(self, track):
         return 0.03
+
+    def electron_resolution_array(self, pt, p, eta, theta):
+        return np.full(len(pt), 0.03)
             
     def muon_acceptance(self, track):
         """Delphes parametrization
@@ -192,6 +252,10 @@ class CMS(Detector):
             return rnd < 0.95
         else:
             return False
+
+    def muon_acceptance_array(self, pt, p, eta, theta):
+        rnd = random.uniform(0, 1, size=len(pt))
+        return (pt >= 10.) & (np.abs(eta) < 2.4) & (rnd < 0.95)
             
     def muon_resolution(self, track):
         """Delphes parametrization
@@ -215,6 +279,12 @@ class CMS(Detector):
             cstt, vart = 0.025, 3.5e-4
         res = math.sqrt(cstt**2 + (pt * vart)**2)
         return res
+
+    def muon_resolution_array(self, pt, p, eta, theta):
+        eta = np.abs(eta)
+        cstt = np.select([eta < 0.5, eta < 1.5], [0.01, 0.015], 0.025)
+        vart = np.select([eta < 0.5, eta < 1.5], [1e-4, 1.5e-4], 3.5e-4)
+        return np.sqrt(cstt**2 + (pt * vart)**2)
     
     def jet_energy_correction(self, jet):
         '''The factor roughly corresponds to the raw PF jet response in CMS,
@@ -1,6 +1,21 @@
 import operator
 
 class DetectorElement(object):
+    '''Detector element, e.g. a calorimeter or a tracker.
+
+    In addition to the methods taking a single cluster or track,
+    e.g. energy_resolution(energy, eta) or acceptance(track), an element may define
+    their array versions, suffixed by _array, which take numpy arrays and return
+    a numpy array. The Simulator then uses them to smear all the clusters and tracks
+    of an event at once. The array methods take as arguments:
+      - for the calorimeters:
+        energy_resolution_array(energy, eta), energy_response_array(energy, eta),
+        and acceptance_array(energy, eta, pt) for the smeared clusters;
+      - for the methods applied to tracks, e.g. resolution and acceptance of a tracker,
+        or electron_acceptance of a detector: (pt, p, eta, theta),
+        with theta = pi/2 - polar angle, as in Track.theta.
+    Without array versions, the methods are called for each cluster or track.
+    '''
 
     def __init__(self, name, volume, material):
         self.name = name
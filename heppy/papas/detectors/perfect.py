@@ -2,6 +2,7 @@ from detector import Detector, DetectorElement
 import material
 from geometry import VolumeCylinder
 import math
+import numpy as np
 
 class ECAL(DetectorElement):
 
@@ -15,9 +16,15 @@ class ECAL(DetectorElement):
     def energy_resolution(self, energy, theta=0.):
         return 0.
 
+    def energy_resolution_array(self, energy, eta):
+        return np.zeros(len(energy))
+
     def energy_response(self, energy, eta):
         return 1.
 
+    def energy_response_array(self, energy, eta):
+        return np.ones(len(energy))
+
     def cluster_size(self, ptc):
         pdgid = abs(ptc.pdgid())
         if pdgid==22 or pdgid==11:
@@ -28,6 +35,9 @@ class ECAL(DetectorElement):
     def acceptance(self, cluster):
         return True
 
+    def acceptance_array(self, energy, eta, pt):
+        return np.ones(len(energy), dtype=bool)
+
     def space_resolution(self, ptc):
         pass
 
@@ -42,14 +52,23 @@ class HCAL(DetectorElement):
     def energy_resolution(self, energy, theta=0.):
         return 0.
 
+    def energy_resolution_array(self, energy, eta):
+        return np.zeros(len(energy))
+
     def energy_response(self, energy, eta):
         return 1.
 
+    def energy_response_array(self, energy, eta):
+        return np.ones(len(energy))
+
     def cluster_size(self, ptc):
         return 0.2
 
     def acceptance(self, cluster):
         return True
+
+    def acceptance_array(self, energy, eta, pt):
+        return np.ones(len(energy), dtype=bool)
     
     def space_resolution(self, ptc):
         pass
@@ -67,8 +86,16 @@ class Tracker(DetectorElement):
     def acceptance(self, track):
         return True
 
-    def pt_resolution(self, track):
-       return 0.
+    def acceptance_array(self, pt, p, eta, theta):
+        return np.ones(len(pt), dtype=bool)
+
+    def resolution(self, track):
+        return 0.
+
+    def resolution_array(self, pt, p, eta, theta):
+        return np.zeros(len(pt))
+
+    pt_resolution = resolution
 
     
 
@@ -86,6 +113,23 @@ class Perfect(Detector):
     but without smearing, and with full acceptance (no thresholds).
     Used for testing purposes. 
     '''
+    def electron_acceptance(self, track):
+        return True
+
+    def electron_acceptance_array(self, pt, p, eta, theta):
+        return np.ones(len(pt), dtype=bool)
+
+    def electron_resolution(self, track):
+        return 0.
+
+    def electron_resolution_array(self, pt, p, eta, theta):
+        return np.zeros(len(pt))
+
+    muon_acceptance = electron_acceptance
+    muon_acceptance_array = electron_acceptance_array
+    muon_resolution = electron_resolution
+    muon_resolution_array = electron_resolution_array
+
     def __init__(self):
         super(Perfect, self).__init__()
         self.elements['tracker'] = Tracker()
@@ -0,0 +1,122 @@
+import unittest
+import math
+import random
+import numpy as np
+
+import heppy.statistics.rrandom as rrandom
+from CMS import CMS
+from CLIC import CLIC
+from perfect import Perfect
+
+
+class Vector(object):
+    '''minimal 3-vector, as needed by the scalar detector methods'''
+
+    def __init__(self, pt, eta):
+        self.pt = pt
+        self.eta = eta
+
+    def Eta(self):
+        return self.eta
+
+    def Perp(self):
+        return self.pt
+
+    Pt = Perp
+
+    def Mag(self):
+        return self.pt * math.cosh(self.eta)
+
+    def theta(self):
+        return math.pi / 2. - 2 * math.atan(math.exp(-self.eta))
+
+
+class FakeCluster(object):
+
+    def __init__(self, energy, eta):
+        self.energy = energy
+        self.position = Vector(1., eta)
+        self.pt = energy / math.cosh(eta)
+
+
+class FakeTrack(object):
+
+    def __init__(self, pt, eta):
+        self._p3 = Vector(pt, eta)
+
+    def p3(self):
+        return self._p3
+
+    def theta(self):
+        return self._p3.theta()
+
+
+class ConstantStream(object):
+    '''random stream always returning the same value'''
+
+    def __init__(self, value):
+        self.value = value
+
+    def uniform(self, a, b, size=None):
+        if size is None:
+            return self.value
+        return np.full(size, self.value)
+
+
+class TestArrays(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0xdead)
+        self.detectors = [CMS(), CLIC(), Perfect()]
+        self.clusters = [FakeCluster(rng.uniform(0.1, 50.), rng.uniform(-6, 6))
+                         for i in range(500)]
+        self.tracks = [FakeTrack(rng.uniform(0.05, 50.), rng.uniform(-3, 3))
+                       for i in range(500)]
+        self.energy = np.array([cluster.energy for cluster in self.clusters])
+        self.cluster_eta = np.array([cluster.position.Eta() for cluster in self.clusters])
+        self.cluster_pt = np.array([cluster.pt for cluster in self.clusters])
+        self.track_arrays = (np.array([track.p3().Perp() for track in self.tracks]),
+                             np.array([track.p3().Mag() for track in self.tracks]),
+                             np.array([track.p3().Eta() for track in self.tracks]),
+                             np.array([track.theta() for track in self.tracks]))
+
+    def tearDown(self):
+        rrandom.set_stream(None)
+
+    def test_calorimeters(self):
+        for detector in self.detectors:
+            for name in ['ecal', 'hcal']:
+                elem = detector.elements[name]
+                np.testing.assert_allclose(
+                    elem.energy_resolution_array(self.energy, self.cluster_eta),
+                    [elem.energy_resolution(e, eta)
+                     for e, eta in zip(self.energy, self.cluster_eta)])
+                np.testing.assert_allclose(
+                    elem.energy_response_array(self.energy, self.cluster_eta),
+                    [elem.energy_response(e, eta)
+                     for e, eta in zip(self.energy, self.cluster_eta)])
+                for rnd in [0.01, 0.5, 0.92, 0.99]:
+                    rrandom.set_stream(ConstantStream(rnd))
+                    self.assertEqual(
+                        list(elem.acceptance_array(self.energy, self.cluster_eta,
+                                                   self.cluster_pt)),
+                        [bool(elem.acceptance(cluster)) for cluster in self.clusters])
+
+    def test_tracks(self):
+        for detector in self.detectors:
+            tracker = detector.elements['tracker']
+            methods = [tracker.resolution, tracker.acceptance,
+                       detector.electron_resolution, detector.electron_acceptance,
+                       detector.muon_resolution, detector.muon_acceptance]
+            for method in methods:
+                array_method = getattr(method.__self__, method.__name__ + '_array')
+                for rnd in [0.01, 0.5, 0.92, 0.99]:
+                    rrandom.set_stream(ConstantStream(rnd))
+                    np.testing.assert_allclose(
+                        array_method(*self.track_arrays),
+                        [method(track) for track in self.tracks],
+                        err_msg=method.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+'''Benchmark of the SubgraphBuilder, against the previous implementation
+based on a Node graph and DAGFloodFill.
+
+Usage:
+    python bench_subgraphbuilder.py [nnodes ...]
+
+For each number of nodes, random graphs with about 0.5, 1 and 2 links per node
+are built, and the number of subgraphs and the wall times are printed.
+The subgraphs of both implementations are checked to be identical.
+'''
+import sys
+import random
+import timeit
+
+from heppy.papas.data.idcoder import IdCoder
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.DAG import Node, DAGFloodFill
+from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
+
+
+def make_graph(nnodes, links_per_node, rng):
+    '''Returns ids of ecal clusters, hcal clusters and tracks, and the dict of edges
+    between them, a fraction of which are linked'''
+    types = [IdCoder.PFOBJECTTYPE.ECALCLUSTER, IdCoder.PFOBJECTTYPE.HCALCLUSTER,
+             IdCoder.PFOBJECTTYPE.TRACK]
+    ids = [IdCoder.make_id(types[index % 3], index, 't', rng.uniform(1., 50.))
+           for index in range(nnodes)]
+    edges = dict()
+    for i in range(int(nnodes * links_per_node) * 2):
+        id1, id2 = rng.sample(ids, 2)
+        edge = Edge(id1, id2, rng.random() < 0.5, rng.random())
+        edges[edge.key] = edge
+    return ids, edges
+
+
+def floodfill(ids, edges):
+    '''the previous implementation of the SubgraphBuilder'''
+    nodes = dict((idt, Node(idt)) for idt in ids)
+    for edge in edges.itervalues():
+        if edge.linked:
+            nodes[edge.id1].add_child(nodes[edge.id2])
+    return [sorted((node.get_value() for node in subgraph), reverse=True)
+            for subgraph in DAGFloodFill(nodes, dosorting=True).subgraphs]
+
+
+def timing(func, args):
+    start = timeit.default_timer()
+    result = func(*args)
+    return result, timeit.default_timer() - start
+
+
+def main(sizes):
+    rng = random.Random(0xdead)
+    print '{:>8} {:>8} {:>10} {:>14} {:>14} {:>8}'.format(
+        'nodes', 'links', 'subgraphs', 'floodfill(s)', 'disjoint(s)', 'speedup')
+    for size in sizes:
+        for links_per_node in [0.5, 1., 2.]:
+            ids, edges = make_graph(size, links_per_node, rng)
+            nlinks = sum(1 for edge in edges.itervalues() if edge.linked)
+            expected, time_floodfill = timing(floodfill, (ids, edges))
+            builder, time_disjoint = timing(SubgraphBuilder, (ids, edges))
+            assert builder.subgraphs == expected
+            print '{:>8} {:>8} {:>10} {:>14.4f} {:>14.4f} {:>8.1f}'.format(
+                size, nlinks, len(expected), time_floodfill, time_disjoint,
+                time_floodfill / time_disjoint)
+
+
+if __name__ == '__main__':
+    sizes = [1000, 10000]
+    if len(sys.argv) > 1:
+        sizes = map(int, sys.argv[1:])
+    main(sizes)
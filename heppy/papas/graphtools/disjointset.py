@@ -0,0 +1,84 @@
+'''Disjoint set (union-find) and connected components of an undirected graph.
+
+Unlike DAGFloodFill, no Node graph is built: the connected components are
+found directly from the list of links.
+
+example::
+
+    subgraphs = connected_components(range(7), [(0, 1), (0, 2), (1, 3), (4, 5), (5, 6)])
+    # [[3, 2, 1, 0], [6, 5, 4]]
+'''
+
+
+class DisjointSet(object):
+    '''Disjoint set forest with union by size and path halving.
+
+    attributes:
+       parent : dict, element -> parent element (the root is its own parent)
+       size   : dict, root -> number of elements in the set
+    '''
+
+    def __init__(self, elements=()):
+        '''@param elements: initial elements, each one in its own set'''
+        self.parent = dict((elem, elem) for elem in elements)
+        self.size = dict.fromkeys(self.parent, 1)
+
+    def add(self, elem):
+        '''adds elem in its own set, if not already there'''
+        if elem not in self.parent:
+            self.parent[elem] = elem
+            self.size[elem] = 1
+
+    def find(self, elem):
+        '''returns the root of the set containing elem'''
+        parent = self.parent
+        while parent[elem] != elem:
+            parent[elem] = parent[parent[elem]]
+            elem = parent[elem]
+        return elem
+
+    def union(self, elem1, elem2):
+        '''merges the sets containing elem1 and elem2, and returns the new root'''
+        root1 = self.find(elem1)
+        root2 = self.find(elem2)
+        if root1 == root2:
+            return root1
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size.pop(root2)
+        return root1
+
+    def __len__(self):
+        '''number of sets'''
+        return len(self.size)
+
+
+def connected_components(ids, links):
+    '''Returns the connected components of the undirected graph with nodes ids
+    and edges links.
+
+    @param ids: the node ids
+    @param links: iterable of (id1, id2) pairs, e.g. the ids of the linked edges.
+       A KeyError is raised for a link to an id which is not in ids.
+    @return: list of subgraphs, each subgraph being the list of its ids sorted in
+       decreasing order. The subgraphs are ordered by increasing smallest id,
+       which is the ordering of DAGFloodFill(dosorting=True) needed for
+       a match with papascpp.
+    '''
+    sets = DisjointSet(ids)
+    parent = sets.parent
+    for id1, id2 in links:
+        sets.union(id1, id2)
+    subgraphs = dict()
+    ordered = []
+    for uid in sorted(parent):
+        root = sets.find(uid)
+        subgraph = subgraphs.get(root)
+        if subgraph is None:
+            subgraph = subgraphs[root] = []
+            ordered.append(subgraph)
+        subgraph.append(uid)
+    for subgraph in ordered:
+        subgraph.reverse()
+    return ordered
@@ -0,0 +1,77 @@
+import copy
+
+
+class EdgeOverlay(object):
+    '''A read-only dictionary of edges {edgekey : Edge}, made of a dictionary of base edges
+    and of a few edges unlinked on top of them, without copying or modifying the base edges.
+
+    It can be used instead of the dictionary of edges by the SubgraphBuilder, BlockBuilder
+    and BlockSplitter. An unlinked edge is a copy of the base edge with linked set to False,
+    all the other edges are the base edges themselves.
+
+    attributes:
+
+    base : the base dictionary of edges
+    unlinked : dictionary of the unlinked edges {edgekey : Edge}
+
+    Usage example:
+        edges = EdgeOverlay(block.edges)
+        edges.unlink(Edge.make_key(trackid, hcalid))
+        splitter = BlockSplitter(block.uniqueid, block.element_uniqueids, edges, 0, 's')
+    '''
+
+    def __init__(self, base):
+        '''@param base: dictionary of edges, which is not modified'''
+        self.base = base
+        self.unlinked = dict()
+
+    def unlink(self, key):
+        '''unlinks the edge with key, and returns the unlinked edge'''
+        edge = self.unlinked.get(key)
+        if edge is None:
+            edge = copy.copy(self.base[key])
+            edge.linked = False
+            self.unlinked[key] = edge
+        return edge
+
+    def __getitem__(self, key):
+        edge = self.unlinked.get(key)
+        if edge is None:
+            edge = self.base[key]
+        return edge
+
+    def get(self, key, default=None):
+        if key in self.base:
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        return key in self.base
+
+    def __len__(self):
+        return len(self.base)
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def keys(self):
+        return self.base.keys()
+
+    def iterkeys(self):
+        return self.base.iterkeys()
+
+    def iteritems(self):
+        unlinked = self.unlinked
+        for key, edge in self.base.iteritems():
+            yield key, unlinked.get(key, edge)
+
+    def itervalues(self):
+        unlinked = self.unlinked
+        for key, edge in self.base.iteritems():
+            yield unlinked.get(key, edge)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
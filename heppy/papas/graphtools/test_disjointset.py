@@ -0,0 +1,47 @@
+import unittest
+import random
+
+from disjointset import DisjointSet, connected_components
+from DAG import Node, DAGFloodFill
+
+
+def floodfill_subgraphs(ids, links):
+    '''subgraphs found by the previous implementation of the SubgraphBuilder'''
+    nodes = dict((idt, Node(idt)) for idt in ids)
+    for id1, id2 in links:
+        nodes[id1].add_child(nodes[id2])
+    return [sorted((node.get_value() for node in subgraph), reverse=True)
+            for subgraph in DAGFloodFill(nodes, dosorting=True).subgraphs]
+
+
+class TestDisjointSet(unittest.TestCase):
+
+    def test_union(self):
+        sets = DisjointSet(range(5))
+        self.assertEqual(len(sets), 5)
+        sets.union(0, 1)
+        sets.union(3, 4)
+        sets.union(1, 4)
+        self.assertEqual(len(sets), 2)
+        self.assertEqual(sets.find(0), sets.find(3))
+        self.assertNotEqual(sets.find(0), sets.find(2))
+        sets.add(5)
+        self.assertEqual(len(sets), 3)
+
+    def test_components(self):
+        links = [(0, 1), (0, 2), (1, 3), (4, 5), (5, 6)]
+        self.assertEqual(connected_components(range(8), links),
+                         [[3, 2, 1, 0], [6, 5, 4], [7]])
+        self.assertRaises(KeyError, connected_components, range(3), [(0, 3)])
+
+    def test_floodfill_parity(self):
+        rng = random.Random(0xdead)
+        for nlinks in [0, 50, 100, 300]:
+            ids = rng.sample(xrange(10 ** 6), 200)
+            links = [tuple(rng.sample(ids, 2)) for i in range(nlinks)]
+            self.assertEqual(connected_components(ids, links),
+                             floodfill_subgraphs(ids, links))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ from heppy.papas.graphtools.subgraphbuilder import SubgraphBuilder
 from heppy.papas.graphtools.edge import Edge
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfobjects import MergedCluster
+from heppy.papas.pfalgo.spatialindex import DirectionGrid
 from heppy.utils.pdebug import pdebugger
 
 class MergedClusterBuilder(SubgraphBuilder):
@@ -12,12 +13,17 @@ class MergedClusterBuilder(SubgraphBuilder):
         attributes:
              merged - the dictionary of merged clusters.
         
+        By default, the ruler is called for every pair of clusters and all edges are kept.
+        If spatial_index is True, the clusters are placed on a DirectionGrid, the ruler is only
+        called for clusters closer than twice the largest cluster angular size (plus a margin),
+        and only the linked edges are kept. The merged clusters and history are the same.
+        
         Usage example:
              This will return the merged clusters to the event.
             event.ecal_clusters =  MergingBlockBuilder(event.ecal_clusters, ruler.merged_clusters
             
     '''
-    def __init__(self, clusters, ruler, history_nodes):
+    def __init__(self, clusters, ruler, history_nodes, spatial_index=False, margin=0.01):
         '''
         @param clusters: a dictionary : {id1:ecal1, id2:ecal2, ...}.
         @param ruler: measures distance between two clusters,
@@ -33,6 +39,9 @@ class MergedClusterBuilder(SubgraphBuilder):
             and says what it is linked to (its parents and children).
             New mergedcluster history detailing which clusters the mergedcluster was made from
             will be added to the existing history
+        @param spatial_index: if True, only compute the distance between nearby clusters
+            and only store the linked edges
+        @param margin: safety margin in radians added to the search radius of the spatial index
         '''
         self.clusters = clusters
         
@@ -42,15 +51,22 @@ class MergedClusterBuilder(SubgraphBuilder):
         # collate ids of clusters
         uniqueids = list(clusters.keys())
              
-        #make the edges match cpp by using the same approach as cpp
         edges = dict()
-        for obj1 in  clusters.values():
-            for obj2 in  clusters.values():
-                if obj1.uniqueid < obj2.uniqueid:
-                    link_type, is_linked, distance = ruler(obj1, obj2)
-                    edge = Edge(obj1.uniqueid, obj2.uniqueid, is_linked, distance)
-                    #the edge object is added into the edges dictionary
+        if spatial_index:
+            for id1, id2 in self._candidate_pairs(margin):
+                link_type, is_linked, distance = ruler(clusters[id1], clusters[id2])
+                if is_linked:
+                    edge = Edge(id1, id2, is_linked, distance)
                     edges[edge.key] = edge
+        else:
+            #make the edges match cpp by using the same approach as cpp
+            for obj1 in  clusters.values():
+                for obj2 in  clusters.values():
+                    if obj1.uniqueid < obj2.uniqueid:
+                        link_type, is_linked, distance = ruler(obj1, obj2)
+                        edge = Edge(obj1.uniqueid, obj2.uniqueid, is_linked, distance)
+                        #the edge object is added into the edges dictionary
+                        edges[edge.key] = edge
 
         #make the subgraphs of clusters
         super(MergedClusterBuilder, self).__init__(uniqueids, edges)
@@ -59,6 +75,23 @@ class MergedClusterBuilder(SubgraphBuilder):
         self.history_nodes = history_nodes
         self._make_and_store_merged_clusters()
 
+    def _candidate_pairs(self, margin):
+        '''Returns the set of pairs of ids (id1, id2) with id1 < id2 of the clusters that may overlap.
+        
+        Two clusters overlap if one of their subclusters are closer than the sum of
+        their angular sizes, so the search radius is twice the largest angular size plus the margin.
+        '''
+        max_size = 0.
+        for cluster in self.clusters.itervalues():
+            for subcluster in cluster.subclusters:
+                max_size = max(max_size, subcluster.angular_size())
+        grid = DirectionGrid(2 * max_size + margin)
+        for uid, cluster in self.clusters.iteritems():
+            for subcluster in cluster.subclusters:
+                position = subcluster.position
+                grid.add(uid, position.X(), position.Y(), position.Z())
+        return grid.pairs()
+
     def _make_and_store_merged_clusters(self):
         '''
             This takes the subgraphs of connected clusters that are to be merged, and makes a new MergedCluster.
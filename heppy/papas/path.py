@@ -3,7 +3,7 @@ from scipy import constants
 from ROOT import TVector3, TLorentzVector
 from heppy.utils.deltar import deltaPhi
 from collections import OrderedDict
-import scipy.optimize 
+import numpy as np
 from numpy import sign
 import heppy.statistics.rrandom as random
 
@@ -105,12 +105,102 @@ class Helix(Path):
             + self.v_over_omega.Y() * math.sin(self.omega*time)
         z = self.vz() * time + self.origin.Z()
         return x,y,z
-       
+
+    def closest_approach_time(self, point, direction=None, bounds=None):
+        '''returns the time of the point of closest approach to point,
+        or to the line going through point along direction if direction is given.
+        See closest_approach_times.'''
+        pars = (self.origin.X(), self.origin.Y(), self.origin.Z(),
+                self.v_over_omega.X(), self.v_over_omega.Y(),
+                self.omega, self.vz())
+        return float(_closest_approach_times(pars, (point.X(), point.Y(), point.Z()),
+                                             _unit_direction(direction), bounds))
+
+
+def closest_approach_times(helices, point, direction=None, bounds=None):
+    '''Returns the numpy array of the times of the points of closest approach
+    of each helix to point, or to the line going through point along direction
+    if direction is given.
+
+    point and direction are TVector3-like.
+    The squared distance is minimised with Newton iterations,
+    all helices at once, starting from the time of closest approach
+    of the straight line tangent to the helix at its origin.
+    The minimum found is the closest to the helix origin.
+    If bounds=(tmin, tmax) is given, the times are restricted to this range.
+    '''
+    npars = len(helices)
+    pars = np.empty((7, npars))
+    for i, helix in enumerate(helices):
+        pars[:, i] = (helix.origin.X(), helix.origin.Y(), helix.origin.Z(),
+                      helix.v_over_omega.X(), helix.v_over_omega.Y(),
+                      helix.omega, helix.vz())
+    return _closest_approach_times(pars, (point.X(), point.Y(), point.Z()),
+                                   _unit_direction(direction), bounds)
+
+
+def _unit_direction(direction):
+    '''unit vector along direction as a tuple, null vector if direction is None'''
+    if direction is None:
+        return (0., 0., 0.)
+    direction = direction.Unit()
+    return (direction.X(), direction.Y(), direction.Z())
+
+
+def _closest_approach_times(pars, point, jdir, bounds=None, maxiter=50):
+    '''Newton minimisation of the squared distance between the helices
+    and the point, or the line along the unit vector jdir (null for a point).
+
+    pars is the (7, n) array of the helix parameters:
+    origin x, y, z, v_over_omega x, y, omega and vz,
+    or the tuple of these parameters for a single helix.
+    '''
+    ox, oy, oz, vox, voy, omega, vz = pars
+    px, py, pz = point
+    jx, jy, jz = jdir
+    tmin, tmax = bounds if bounds is not None else (-np.inf, np.inf)
+    # straight line tangent to the helix at the origin
+    vx = omega * vox
+    vy = omega * voy
+    dx, dy, dz = ox - px, oy - py, oz - pz
+    dj = dx * jx + dy * jy + dz * jz
+    vj = vx * jx + vy * jy + vz * jz
+    grad = dx * vx + dy * vy + dz * vz - dj * vj
+    curv = vx * vx + vy * vy + vz * vz - vj * vj
+    time = np.where(curv > 0., -grad / np.where(curv > 0., curv, 1.), 0.)
+    time = np.minimum(np.maximum(time, tmin), tmax)
+    for iteration in range(maxiter):
+        wt = omega * time
+        cos = np.cos(wt)
+        sin = np.sin(wt)
+        dx = ox + voy * (1 - cos) + vox * sin - px
+        dy = oy - vox * (1 - cos) + voy * sin - py
+        dz = oz + vz * time - pz
+        vx = omega * (voy * sin + vox * cos)
+        vy = omega * (voy * cos - vox * sin)
+        # acceleration: (omega * vy, - omega * vx, 0)
+        dj = dx * jx + dy * jy + dz * jz
+        vj = vx * jx + vy * jy + vz * jz
+        aj = omega * (vy * jx - vx * jy)
+        grad = dx * vx + dy * vy + dz * vz - dj * vj
+        gauss_newton = vx * vx + vy * vy + vz * vz - vj * vj
+        curv = gauss_newton + omega * (dx * vy - dy * vx) - dj * aj
+        # where the distance is not convex, fall back to a Gauss-Newton step
+        curv = np.where(curv > 0., curv, gauss_newton)
+        step = np.where(curv > 0., grad / np.where(curv > 0., curv, 1.), 0.)
+        new_time = np.minimum(np.maximum(time - step, tmin), tmax)
+        converged = np.abs(new_time - time) <= 1e-12 * np.abs(new_time) + 1e-25
+        time = new_time
+        if converged.all():
+            break
+    return time
+
     
 class ImpactParameter(object):
     '''Performs impact parameter calculation, and stores relevant information.'''
     
-    def __init__(self, helix, origin, jet_direction, resolution=0.):
+    def __init__(self, helix, origin, jet_direction, resolution=0.,
+                 time=None):
         '''Constructs impact parameter.
         
         @param helix: the helix for which the impact parameter is
@@ -121,11 +211,12 @@ class ImpactParameter(object):
           the sign of the impact parameter
         @param resolution: resolution estimate to calculate the
           impact parameter significance
+        @param time: time of the point of closest approach, if already
+          known, e.g. from impact_parameters.
         
-        The impact parameter calculation involves a minimization
-        performed using the brent method of scipy.optimize.minimize_scalar.
-        The point of closest approach must be within -5 and +5 ns
-        of the helix vertex (point of reference on the helix,
+        The point of closest approach is found with Newton iterations,
+        see closest_approach_times. It is the one closest to the
+        helix vertex (point of reference on the helix,
         not the primary vertex).
         
         Interesting attributes:
@@ -144,18 +235,9 @@ class ImpactParameter(object):
         '''
         self.helix = helix
         self.origin = origin
-        def distquad (time):
-            x,y,z = self.helix.coord_at_time(time)
-            dist2 = (x-origin.x())**2 + (y-origin.y())**2 + (z-origin.z())**2 
-            return dist2
-        minim_answer = scipy.optimize.minimize_scalar(
-            distquad,
-            method='brent', 
-            bracket = [-5e-9, 5e-9],
-            options={'xtol': 1e-20, 'maxiter': 1e5},
-            tol=None,
-        )
-        self.time = minim_answer.x
+        if time is None:
+            time = self.helix.closest_approach_time(origin)
+        self.time = time
         self.vector = self.helix.point_at_time(self.time) - origin
         jet_direction = jet_direction.Unit()
         self.sign  = self.vector.Dot(jet_direction)
@@ -174,6 +256,15 @@ class ImpactParameter(object):
                   vector_desc('IP', self.vector), ]
         return '\n'.join(lines)
         
+
+def impact_parameters(helices, origin, jet_direction):
+    '''Returns the list of the ImpactParameter of each helix,
+    e.g. for all tracks of a jet.
+    The points of closest approach are computed for all helices at once.'''
+    times = closest_approach_times(helices, origin)
+    return [ImpactParameter(helix, origin, jet_direction, time=float(time))
+            for helix, time in zip(helices, times)]
+
         
 if __name__ == '__main__':
 
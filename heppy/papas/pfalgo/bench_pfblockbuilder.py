@@ -0,0 +1,95 @@
+'''Benchmark of the PFBlockBuilder, with and without spatial index.
+
+Usage:
+    python bench_pfblockbuilder.py [nelements ...]
+
+For each number of elements, a toy event with the same number of tracks, ecal clusters and
+hcal clusters is built, and the number of edges and the wall time are printed for the
+exhaustive and for the spatial index modes.
+Above EXHAUSTIVE_MAX elements, the exhaustive mode does not fit in memory.
+It is not run, and only its number of edges is given.
+'''
+import sys
+import math
+import random
+import timeit
+from ROOT import TVector3, TLorentzVector
+from heppy.papas.pfobjects import Cluster, Track
+from heppy.papas.path import StraightLine
+from heppy.papas.data.papasevent import PapasEvent
+from heppy.papas.pfalgo.distance import Distance
+from heppy.papas.pfalgo.pfblockbuilder import PFBlockBuilder
+
+EXHAUSTIVE_MAX = 2000
+
+def make_event(nelements, seed=0xdead):
+    '''Returns a PapasEvent with about nelements tracks and clusters.
+    Each toy particle gives a track, an ecal cluster and an hcal cluster,
+    slightly displaced from the particle direction.
+    '''
+    rng = random.Random(seed)
+    event = PapasEvent(0)
+    ecals, hcals, tracks = dict(), dict(), dict()
+    def position(theta, phi, radius, smear):
+        theta += rng.gauss(0, smear)
+        phi += rng.gauss(0, smear)
+        pos = TVector3()
+        pos.SetMagThetaPhi(radius, theta, phi)
+        return pos
+    for index in range(nelements / 3):
+        theta = rng.uniform(0.3, math.pi - 0.3)
+        phi = rng.uniform(-math.pi, math.pi)
+        p3 = TVector3()
+        p3.SetMagThetaPhi(rng.uniform(1., 50.), theta, phi)
+        p4 = TLorentzVector()
+        p4.SetVectM(p3, 0.14)
+        path = StraightLine(p4, TVector3(0, 0, 0))
+        path.points['ecal_in'] = position(theta, phi, 1.3, 0.)
+        path.points['hcal_in'] = position(theta, phi, 1.9, 0.)
+        track = Track(p3, 1, path, index)
+        tracks[track.uniqueid] = track
+        ecal = Cluster(rng.uniform(1., 50.), position(theta, phi, 1.3, 0.005),
+                       rng.uniform(0.01, 0.03), 'ecal_in', index)
+        ecals[ecal.uniqueid] = ecal
+        hcal = Cluster(rng.uniform(1., 50.), position(theta, phi, 1.9, 0.01),
+                       rng.uniform(0.02, 0.05), 'hcal_in', index)
+        hcals[hcal.uniqueid] = hcal
+    for collection in [ecals, hcals, tracks]:
+        event.add_collection(collection)
+    return event
+
+
+def run(event, spatial_index):
+    '''Builds the blocks and returns the builder and the wall time'''
+    event.history = None
+    uniqueids = []
+    for collection in event.collections.values():
+        uniqueids += collection.keys()
+    start = timeit.default_timer()
+    builder = PFBlockBuilder(event, uniqueids, Distance(), spatial_index=spatial_index)
+    return builder, timeit.default_timer() - start
+
+
+def main(sizes):
+    print '{:>10} {:>12} {:>12} {:>10} {:>10} {:>8}'.format(
+        'elements', 'edges', 'edges(grid)', 'time(s)', 'time(grid)', 'blocks')
+    for size in sizes:
+        event = make_event(size)
+        nelements = sum(len(collection) for collection in event.collections.values())
+        spatial, time_spatial = run(event, True)
+        if size <= EXHAUSTIVE_MAX:
+            exhaustive, time_exhaustive = run(event, False)
+            assert sorted(exhaustive.blocks.keys()) == sorted(spatial.blocks.keys())
+            time_exhaustive = '{:.3f}'.format(time_exhaustive)
+        else:
+            time_exhaustive = '-'
+        print '{:>10} {:>12} {:>12} {:>10} {:>10.3f} {:>8}'.format(
+            nelements, nelements * (nelements - 1) / 2, len(spatial.edges),
+            time_exhaustive, time_spatial, len(spatial.blocks))
+
+
+if __name__ == '__main__':
+    sizes = [100, 1000, 10000]
+    if len(sys.argv) > 1:
+        sizes = map(int, sys.argv[1:])
+    main(sizes)
@@ -50,8 +50,8 @@ class BlockBuilder(SubgraphBuilder):
         self._make_blocks()        
     
     def _make_blocks (self) :
-        ''' uses the DAGfloodfill algorithm in connection with the BlockBuilder nodes
-            to work out which elements are connected
+        ''' uses the subgraphs of connected elements found by the SubgraphBuilder
+            (a disjoint set on the linked edges)
             Each set of connected elements will be used to make a new PFBlock
         ''' 
         for subgraph in self.subgraphs:
@@ -15,6 +15,8 @@ class PFBlock(object):
                underlying objects given their uniqueid
      edges : Dictionary of all the edge cominations in the block dict{edgekey : Edge}
              use  get_edge(id1,id2) to find an edge
+     The linked edges of each element, sorted by increasing distance, are indexed
+     at construction, see linked_edges.
      
      Usage:
             block = PFBlock(element_ids,  edges, index, 'r') 
@@ -49,6 +51,36 @@ class PFBlock(object):
         for id1, id2 in itertools.combinations(self.element_uniqueids, 2):
             key = Edge.make_key(id1, id2)
             self.edges[key] = edges[key]
+        self._index_linked_edges()
+
+    def _index_linked_edges(self):
+        '''Builds the adjacency index: for each element, the list of (edge, linked id)
+        for its linked edges, sorted by increasing distance (edges without distance last).
+        The edges are taken in the order of the edges dictionary before the stable sort,
+        so that the edges at equal distance are ordered as if sorted on each call.
+        '''
+        self._linked = dict((uid, []) for uid in self.element_uniqueids)
+        for edge in self.edges.itervalues():
+            if edge.linked:
+                self._linked[edge.id1].append((edge, edge.id2))
+                self._linked[edge.id2].append((edge, edge.id1))
+        for linked in self._linked.itervalues():
+            linked.sort(key=lambda x: (x[0].distance is None, x[0].distance))
+        # uniqueid -> edgetype -> list of (edge, linked id), filled on demand
+        self._linked_by_type = dict()
+
+    def _linked_of_type(self, uniqueid, edgetype):
+        '''list of (edge, linked id) for the linked edges of the given type'''
+        if uniqueid not in self._linked:
+            return []
+        if edgetype is None:
+            return self._linked[uniqueid]
+        by_type = self._linked_by_type.setdefault(uniqueid, dict())
+        linked = by_type.get(edgetype)
+        if linked is None:
+            linked = [pair for pair in self._linked[uniqueid] if pair[0].edge_type == edgetype]
+            by_type[edgetype] = linked
+        return linked
 
     def count_ecal(self):
         ''' Counts how many ecal cluster ids are in the block '''
@@ -74,38 +106,20 @@ class PFBlock(object):
     def linked_edges(self, uniqueid, edgetype=None) :
         '''
         Returns list of all edges of a given edge type that are connected to a given id.
-        The list is sorted in order of increasing distance
+        The list is sorted in order of increasing distance.
+        It is taken from the index built at construction, in a time proportional to the number of links.
 
         Arguments:
         @param uniqueid: is the id of item of interest
         @param edgetype: is an optional type of edge. If specified only links of the given edgetype will be returned
         '''
-        linked_edges = []
-        for edge in self.edges.itervalues():
-            if edge.linked and (edge.id1 == uniqueid or edge.id2 == uniqueid):
-                if edgetype is None or ((edgetype != None) and (edge.edge_type == edgetype)):
-                    linked_edges.append(edge)
-
-
-        #this is a bit yucky and temporary solution as need to make sure the order returned is consistent
-        # maybe should live outside of this class
-        linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
-        return linked_edges
+        return [edge for edge, linked_id in self._linked_of_type(uniqueid, edgetype)]
 
     def linked_ids(self, uniqueid, edgetype=None) :
         '''Returns the list of ids linked to uniqueid, sorted by increasing distance. the type of link can be specified through the parameter edgetype.
             eg block.linked_ids(trackid, "ecal_track") returns all the ids that are linked and of type "ecal_track"
             '''
-        linked_ids = []
-        linked_edges = []
-        linked_edges = self.linked_edges(uniqueid, edgetype)
-        if len(linked_edges):
-            for edge in linked_edges:
-                if edge.id1 == uniqueid:
-                    linked_ids.append(edge.id2)
-                else:
-                    linked_ids.append(edge.id1)
-        return linked_ids
+        return [linked_id for edge, linked_id in self._linked_of_type(uniqueid, edgetype)]
     
     def short_elements_string(self):
         ''' Construct a string description of each of the elements in a block.
@@ -1,4 +1,7 @@
+import math
+import itertools
 from blockbuilder import BlockBuilder
+from spatialindex import DirectionGrid
 from heppy.papas.graphtools.edge import Edge
 from heppy.papas.graphtools.DAG import Node
 
@@ -17,13 +20,20 @@ class PFBlockBuilder(BlockBuilder):
                                 the history (if not found it will be created)
                                 get_object() which allows a cluster or track to be found from its id
         
+        By default, the ruler is called for every pair of elements.
+        If spatial_index is True, the elements are first placed on a DirectionGrid and the ruler
+        is only called for pairs of elements that are closer than the largest cluster angular size
+        (plus a safety margin). The missing edges between elements of the same block
+        are computed afterwards, so that the blocks and history are the same as in the default mode.
+        
         Usage example:
 
             builder = PFBlockBuilder(papasevent, uniqueids, ruler)
             for b in builder.blocks.itervalues() :
                 print b
     '''
-    def __init__(self, papasevent, uniqueids, ruler, startindex=0, subtype='r'):
+    def __init__(self, papasevent, uniqueids, ruler, startindex=0, subtype='r',
+                 spatial_index=False, margin=0.01):
         '''
             papasevent a PapasEvent (see above)            
             uniqueids list of which ids from papasevent to build blocks out of
@@ -36,24 +46,86 @@ class PFBlockBuilder(BlockBuilder):
                     distance = float
             startindex is the index number for this block within the collection of blocks being created
             subtype says which identifier subtype to use when creating new blocks eg 'r' reconstructed, 's' split
+            spatial_index: if True, only compute the edges between nearby elements (see above)
+            margin: safety margin in radians added to the search radius of the spatial index
         '''
         self.papasevent = papasevent
         if self.papasevent.history is None:
             self.papasevent.history = dict((idt, Node(idt)) for idt in uniqueids)
+        self.ruler = ruler
+        self.spatial_index = spatial_index
         
         # compute edges between each pair of nodes
         edges = dict()
-
-        for id1 in uniqueids:
-            for  id2 in uniqueids:
-                if id1 < id2 :
-                    edge = self._make_edge(id1, id2, ruler)
-                    #the edge object is added into the edges dictionary
-                    edges[edge.key] = edge
+        if spatial_index:
+            pairs = self._candidate_pairs(uniqueids, margin)
+        else:
+            pairs = ((id1, id2) for id1 in uniqueids for id2 in uniqueids if id1 < id2)
+        for id1, id2 in pairs:
+            edge = self._make_edge(id1, id2, ruler)
+            #the edge object is added into the edges dictionary
+            edges[edge.key] = edge
 
         #use the underlying BlockBuilder to construct the blocks        
         super(PFBlockBuilder, self).__init__(uniqueids, edges, startindex, subtype, self.papasevent.history)
 
+    def _make_blocks(self):
+        '''with the spatial index, the edges between elements of the same block that were not
+        candidate pairs are computed before making the blocks, as PFBlock needs all of them.
+        '''
+        if self.spatial_index:
+            for subgraph in self.subgraphs:
+                #subgraph is sorted by decreasing id
+                for id2, id1 in itertools.combinations(subgraph, 2):
+                    if Edge.make_key(id1, id2) not in self.edges:
+                        edge = self._make_edge(id1, id2, self.ruler)
+                        self.edges[edge.key] = edge
+        super(PFBlockBuilder, self)._make_blocks()
+
+    def _candidate_pairs(self, uniqueids, margin):
+        '''Returns the set of pairs of ids (id1, id2) with id1 < id2 that may be linked.
+        
+        The search radius is twice the largest angular size of the (sub)clusters plus the margin.
+        Two clusters can only be linked if two of their subclusters overlap,
+        and a cluster and a track can only be linked if the track point in the
+        cluster layer lies inside one of the subclusters.
+        Elements for which no direction can be determined are paired with all other elements.
+        '''
+        directions = dict()
+        max_reach = 0.
+        for uid in uniqueids:
+            obj = self.papasevent.get_object(uid)
+            directions[uid], reach = self._directions(obj)
+            max_reach = max(max_reach, reach)
+        grid = DirectionGrid(2 * max_reach + margin)
+        for uid, points in directions.iteritems():
+            if points is None:
+                grid.add_wildcard(uid)
+                continue
+            for point in points:
+                grid.add(uid, point.X(), point.Y(), point.Z())
+        return grid.pairs()
+
+    def _directions(self, obj):
+        '''returns a tuple with the list of points used to place obj on the spatial index
+        and the largest angle under which a linked point can be seen from one of these points.
+        The list of points is None if obj is neither a track nor a cluster.
+        '''
+        if obj.layer == 'tracker':
+            points = [obj.path.points[layer] for layer in ['ecal_in', 'hcal_in']
+                      if layer in obj.path.points]
+            return points, 0.
+        elif hasattr(obj, 'subclusters'):
+            points = []
+            reach = 0.
+            for subcluster in obj.subclusters:
+                points.append(subcluster.position)
+                # all points at a distance smaller than the size from the cluster position are
+                # seen within this angle. It is larger than the angular size of the cluster.
+                reach = max(reach, math.asin(min(1., subcluster.size() / subcluster.position.Mag())))
+            return points, reach
+        return None, 0.
+
     def _make_edge(self, id1, id2, ruler):
         ''' id1, id2 are the unique ids of the two items
             ruler is something that measures distance between two objects eg track and hcal
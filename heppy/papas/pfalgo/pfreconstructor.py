@@ -1,8 +1,8 @@
 import math
-import copy
 from heppy.papas.data.idcoder import IdCoder
 from heppy.papas.data.historyhelper import HistoryHelper
 from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.edgeoverlay import EdgeOverlay
 from heppy.papas.graphtools.DAG import Node
 from heppy.papas.pfalgo.pfblocksplitter import BlockSplitter
 from heppy.papas.pdt import particle_data
@@ -114,8 +114,8 @@ class PFReconstructor(object):
          have the tracks and cluster elements as parents, and also the original block as a parent
         '''
         ids = block.element_uniqueids
-        #create a copy of the edges and unlink some of these edges if needed
-        newedges = copy.deepcopy(block.edges)
+        #unlink some of the edges if needed, on top of the block edges which are not modified
+        newedges = EdgeOverlay(block.edges)
         if len(ids) > 1 :   
             for uid in ids :
                 if IdCoder.is_track(uid):
@@ -124,14 +124,14 @@ class PFReconstructor(object):
                     if linked_ids != None and len(linked_ids) > 1:
                         first_hcal = True
                         for id2 in linked_ids:
-                            newedge = newedges[Edge.make_key(uid, id2)]
+                            key = Edge.make_key(uid, id2)
                             if first_hcal:
-                                first_dist = newedge.distance
+                                first_dist = newedges[key].distance
                                 first_hcal = False
                             else:
-                                if newedge.distance == first_dist:
+                                if newedges[key].distance == first_dist:
                                     pass 
-                                newedge.linked = False 
+                                newedges.unlink(key)
         #create new block(s)               
         splitblocks = BlockSplitter(block.uniqueid, ids, newedges, len(self.splitblocks), 's', history_nodes).blocks
         return splitblocks
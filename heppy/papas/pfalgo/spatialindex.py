@@ -0,0 +1,78 @@
+'''Spatial index used to find pairs of nearby elements without testing all pairs'''
+import math
+import itertools
+
+class DirectionGrid(object):
+    '''Buckets directions in space in a grid of cubic cells, so that all pairs of
+    directions closer than a given angle can be found quickly.
+
+    Each direction is normalised to a point on the unit sphere. Two directions
+    separated by an angle alpha are separated by a chord 2 sin(alpha/2) <= alpha
+    on the unit sphere. Using a cell size equal to the search radius, all pairs of
+    points within the radius are found by comparing each cell to its 26 neighbours.
+    Using unit vectors rather than (theta, phi) avoids any problem with the phi
+    wrap-around and with the poles.
+
+    Several directions may be registered with the same key (eg the subclusters
+    of a merged cluster, or the points of a track path).
+    Keys that cannot be placed on the grid can be added as wildcards,
+    and are paired with all other keys.
+
+    Usage example:
+        grid = DirectionGrid(0.1)
+        grid.add(id1, position1.X(), position1.Y(), position1.Z())
+        grid.add(id2, position2.X(), position2.Y(), position2.Z())
+        for id1, id2 in grid.pairs():
+            print id1, id2
+    '''
+
+    def __init__(self, radius):
+        '''@param radius: angular search radius in radians.'''
+        if radius <= 0:
+            raise ValueError('radius must be positive, got {}'.format(radius))
+        self.radius = radius
+        self.cells = dict()
+        self.keys = set()
+        self.wildcards = set()
+
+    def add(self, key, x, y, z):
+        '''Registers direction (x, y, z) for key. The direction does not need to be normalised.'''
+        mag = math.sqrt(x*x + y*y + z*z)
+        if mag == 0.:
+            self.add_wildcard(key)
+            return
+        x, y, z = x/mag, y/mag, z/mag
+        cell = (int(math.floor(x/self.radius)),
+                int(math.floor(y/self.radius)),
+                int(math.floor(z/self.radius)))
+        self.cells.setdefault(cell, []).append((key, x, y, z))
+        self.keys.add(key)
+
+    def add_wildcard(self, key):
+        '''Registers a key with an unknown direction. It will be paired with all other keys.'''
+        self.wildcards.add(key)
+        self.keys.add(key)
+
+    def pairs(self):
+        '''Returns the set of candidate pairs (key1, key2) with key1 < key2
+        having at least one pair of directions closer than the radius.
+        '''
+        radius2 = self.radius**2
+        result = set()
+        for (ix, iy, iz), points in self.cells.iteritems():
+            for dx, dy, dz in itertools.product((-1, 0, 1), repeat=3):
+                neighbours = self.cells.get((ix + dx, iy + dy, iz + dz))
+                if neighbours is None:
+                    continue
+                for key1, x1, y1, z1 in points:
+                    for key2, x2, y2, z2 in neighbours:
+                        if key1 >= key2:
+                            # each pair of cells is seen twice, keep only one ordering
+                            continue
+                        if (x1-x2)**2 + (y1-y2)**2 + (z1-z2)**2 < radius2:
+                            result.add((key1, key2))
+        for wildcard in self.wildcards:
+            for key in self.keys:
+                if key != wildcard:
+                    result.add((min(key, wildcard), max(key, wildcard)))
+        return result
@@ -0,0 +1,46 @@
+import unittest
+import random
+
+from heppy.papas.pfalgo.pfblock import PFBlock
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.data.idcoder import IdCoder
+
+
+def scan_linked_edges(block, uniqueid, edgetype=None):
+    '''linked edges found by scanning all the edges of the block'''
+    linked_edges = [edge for edge in block.edges.itervalues()
+                    if edge.linked and uniqueid in (edge.id1, edge.id2) and
+                    (edgetype is None or edge.edge_type == edgetype)]
+    linked_edges.sort(key=lambda x: (x.distance is None, x.distance))
+    return linked_edges
+
+
+class TestPFBlock(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0xdead)
+        types = [IdCoder.PFOBJECTTYPE.ECALCLUSTER, IdCoder.PFOBJECTTYPE.HCALCLUSTER,
+                 IdCoder.PFOBJECTTYPE.TRACK]
+        self.ids = [IdCoder.make_id(types[index % 3], index, 'r', rng.uniform(1., 10.))
+                    for index in range(30)]
+        self.edges = dict()
+        for index, id1 in enumerate(self.ids):
+            for id2 in self.ids[index + 1:]:
+                # few distinct distances, to test the ordering of the ties
+                distance = rng.choice([None, 0., 0.01, 0.02])
+                edge = Edge(id1, id2, rng.random() < 0.3, distance)
+                self.edges[edge.key] = edge
+        self.block = PFBlock(self.ids, self.edges, 0, 'r')
+
+    def test_linked(self):
+        for uid in self.ids:
+            for edgetype in [None, 'ecal_track', 'hcal_track', 'hcal_hcal']:
+                expected = scan_linked_edges(self.block, uid, edgetype)
+                self.assertEqual(self.block.linked_edges(uid, edgetype), expected)
+                self.assertEqual(self.block.linked_ids(uid, edgetype),
+                                 [edge.id2 if edge.id1 == uid else edge.id1
+                                  for edge in expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
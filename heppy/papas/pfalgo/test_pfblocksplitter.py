@@ -0,0 +1,80 @@
+import unittest
+import copy
+import random
+
+from heppy.papas.pfalgo.pfblock import PFBlock
+from heppy.papas.pfalgo.pfblocksplitter import BlockSplitter
+from heppy.papas.graphtools.edge import Edge
+from heppy.papas.graphtools.edgeoverlay import EdgeOverlay
+from heppy.papas.graphtools.DAG import Node
+from heppy.papas.data.idcoder import IdCoder
+
+
+class TestBlockSplitter(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0xdead)
+        types = [IdCoder.PFOBJECTTYPE.ECALCLUSTER, IdCoder.PFOBJECTTYPE.HCALCLUSTER,
+                 IdCoder.PFOBJECTTYPE.TRACK]
+        self.ids = [IdCoder.make_id(types[index % 3], index, 'r', rng.uniform(1., 10.))
+                    for index in range(60)]
+        self.edges = dict()
+        for index, id1 in enumerate(self.ids):
+            for id2 in self.ids[index + 1:]:
+                edge = Edge(id1, id2, rng.random() < 0.05, rng.random())
+                self.edges[edge.key] = edge
+        self.block = PFBlock(self.ids, self.edges, 0, 'r')
+        # track - hcal edges to unlink, as done by PFReconstructor.simplify_blocks
+        self.to_unlink = []
+        for uid in self.ids:
+            if IdCoder.is_track(uid):
+                for id2 in self.block.linked_ids(uid, 'hcal_track')[1:]:
+                    self.to_unlink.append(Edge.make_key(uid, id2))
+        self.assertTrue(self.to_unlink)
+
+    def split(self, edges):
+        history = dict((uid, Node(uid)) for uid in self.ids)
+        history[self.block.uniqueid] = Node(self.block.uniqueid)
+        splitter = BlockSplitter(self.block.uniqueid, self.block.element_uniqueids,
+                                 edges, 0, 's', history)
+        return splitter.blocks, history
+
+    def test_overlay(self):
+        edges = EdgeOverlay(self.edges)
+        key = self.to_unlink[0]
+        unlinked = edges.unlink(key)
+        self.assertFalse(unlinked.linked)
+        self.assertTrue(edges[key] is unlinked)
+        self.assertTrue(self.edges[key].linked)
+        self.assertEqual(len(edges), len(self.edges))
+        self.assertEqual(sum(1 for edge in edges.itervalues() if not edge.linked),
+                         sum(1 for edge in self.edges.itervalues() if not edge.linked) + 1)
+
+    def test_split(self):
+        '''the blocks and history are the same as with a deep copy of the edges'''
+        copied = copy.deepcopy(self.block.edges)
+        for key in self.to_unlink:
+            copied[key].linked = False
+        expected_blocks, expected_history = self.split(copied)
+        overlay = EdgeOverlay(self.block.edges)
+        for key in self.to_unlink:
+            overlay.unlink(key)
+        blocks, history = self.split(overlay)
+        self.assertTrue(len(blocks) > 1)
+        self.assertEqual(sorted(blocks), sorted(expected_blocks))
+        for blockid, block in blocks.iteritems():
+            expected = expected_blocks[blockid]
+            self.assertEqual(block.element_uniqueids, expected.element_uniqueids)
+            self.assertEqual(str(block), str(expected))
+            for uid in block.element_uniqueids:
+                self.assertEqual(block.linked_ids(uid), expected.linked_ids(uid))
+        self.assertEqual(sorted(history), sorted(expected_history))
+        for uid, node in history.iteritems():
+            self.assertEqual([child.get_value() for child in node.children],
+                             [child.get_value() for child in expected_history[uid].children])
+        # the edges of the original block are not modified
+        self.assertTrue(all(self.edges[key].linked for key in self.to_unlink))
+
+
+if __name__ == '__main__':
+    unittest.main()
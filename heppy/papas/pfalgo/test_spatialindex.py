@@ -0,0 +1,77 @@
+import unittest
+import math
+import random
+import itertools
+from spatialindex import DirectionGrid
+
+import heppy.framework.context as context
+if context.name != 'bare':
+    from bench_pfblockbuilder import make_event, run
+
+
+class TestDirectionGrid(unittest.TestCase):
+
+    def test_pairs(self):
+        '''Test that the grid finds the same pairs as the brute force search'''
+        rng = random.Random(1)
+        radius = 0.15
+        grid = DirectionGrid(radius)
+        points = []
+        for key in range(300):
+            point = [rng.gauss(0, 1) for i in range(3)]
+            mag = math.sqrt(sum(x**2 for x in point))
+            points.append((key, [x/mag for x in point]))
+            grid.add(key, *point)
+        expected = set()
+        for (key1, p1), (key2, p2) in itertools.combinations(points, 2):
+            if sum((x1-x2)**2 for x1, x2 in zip(p1, p2)) < radius**2:
+                expected.add((key1, key2))
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(grid.pairs(), expected)
+
+    def test_phi_wrap(self):
+        '''Test that directions on both sides of phi = pi are paired'''
+        grid = DirectionGrid(0.1)
+        grid.add(1, -1, 0.01, 0.)
+        grid.add(2, -1, -0.01, 0.)
+        grid.add(3, 1, 0., 0.)
+        self.assertEqual(grid.pairs(), set([(1, 2)]))
+
+    def test_several_directions_and_wildcards(self):
+        grid = DirectionGrid(0.1)
+        grid.add(1, 1, 0, 0)
+        grid.add(1, 0, 1, 0)
+        grid.add(2, 0, 1, 0.01)
+        grid.add(3, 0, 0, 1)
+        grid.add_wildcard(0)
+        self.assertEqual(grid.pairs(), set([(1, 2), (0, 1), (0, 2), (0, 3)]))
+
+
+@unittest.skipIf(context.name=='bare', 'ROOT not available')
+class TestSpatialBlockBuilder(unittest.TestCase):
+
+    def test_same_blocks(self):
+        '''Test that the spatial index gives the same blocks, edges and history'''
+        event = make_event(600)
+        exhaustive, time = run(event, False)
+        exhaustive_history = event.history
+        spatial, time = run(event, True)
+        self.assertTrue(len(spatial.edges) < len(exhaustive.edges))
+        self.assertEqual(sorted(exhaustive.blocks.keys()), sorted(spatial.blocks.keys()))
+        for uid, block in exhaustive.blocks.iteritems():
+            other = spatial.blocks[uid]
+            self.assertEqual(block.element_uniqueids, other.element_uniqueids)
+            self.assertEqual(sorted(block.edges.keys()), sorted(other.edges.keys()))
+            for key, edge in block.edges.iteritems():
+                self.assertEqual(edge.linked, other.edges[key].linked)
+                self.assertEqual(edge.distance, other.edges[key].distance)
+        self.assertTrue(any(len(block.element_uniqueids) > 1
+                            for block in spatial.blocks.values()))
+        self.assertEqual(sorted(exhaustive_history.keys()), sorted(event.history.keys()))
+        for uid, node in exhaustive_history.iteritems():
+            self.assertEqual([child.get_value() for child in node.children],
+                             [child.get_value() for child in event.history[uid].children])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 from vectors import Point
 import math
 import copy
+import numpy as np
+from collections import OrderedDict
+from scipy import constants
 from ROOT import TVector3
+from heppy.utils.deltarmatrix import deltaPhiArray
 from geotools import circle_intersection
 from papas_exceptions import PropagationError
 from path import Helix, StraightLine
@@ -15,12 +19,33 @@ class Propagator(object):
         for ptc in particles:
             for cyl in cylinders:
                 self.propagate_one(ptc, cyl, *args, **kwargs)
+
+    def path(self, particle, *args):
+        '''Returns the path of particle, built with make_path.
+
+        The path is built only once for a given particle, and reused
+        when the particle is propagated to other cylinders, as long as
+        the particle charge, 4-momentum and vertex, and args, are unchanged.
+        '''
+        p4 = particle.p4()
+        vertex = particle.vertex
+        key = (args, particle.q(), p4.Px(), p4.Py(), p4.Pz(), p4.E(),
+               vertex.X(), vertex.Y(), vertex.Z())
+        cached = getattr(particle, '_propagator_path', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        path = self.make_path(particle, *args)
+        particle._propagator_path = (key, path)
+        return path
                 
                 
 class StraightLinePropagator(Propagator):        
 
+    def make_path(self, particle):
+        return StraightLine(particle.p4(), particle.vertex)
+
     def propagate_one(self, particle, cylinder, dummy=None):
-        line = StraightLine(particle.p4(), particle.vertex) 
+        line = self.path(particle)
         particle.set_path( line ) # TODO 
         theta = line.udir.Theta()
         if abs(line.origin.Z()) > cylinder.z or \
@@ -61,9 +86,11 @@ class StraightLinePropagator(Propagator):
         
 class HelixPropagator(Propagator):
     
+    def make_path(self, particle, field):
+        return Helix(field, particle.q(), particle.p4(), particle.vertex)
+
     def propagate_one(self, particle, cylinder, field, debug_info=None):
-        helix = Helix(field, particle.q(), particle.p4(),
-                      particle.vertex)
+        helix = self.path(particle, field)
         particle.set_path(helix)
         is_looper = helix.extreme_point_xy.Mag() < cylinder.rad
         is_positive = particle.p4().Z() > 0.
@@ -111,4 +138,150 @@ def propagator(charge):
     if abs(charge) > 0.5:
         return helix
     else:
-        return straight_line
\ No newline at end of file
+        return straight_line
+
+def propagate_arrays(charges, momenta, energies, vertices, cylinders, field):
+    '''Propagates a set of particles to all cylinders at once.
+
+    Gives the same points as propagator(charge).propagate_one for each particle
+    and cylinder, using numpy arrays only.
+    Particles with abs(charge) > 0.5 follow a helix, the others a straight line.
+    Neutral particles with a momentum in the transverse plane
+    are propagated to the barrel.
+
+    @param charges: array of n charges
+    @param momenta: (n, 3) array of px, py, pz
+    @param energies: array of n energies
+    @param vertices: (n, 3) array of the x, y, z coordinates of the particle vertices
+    @param cylinders: list of SurfaceCylinders
+    @param field: magnetic field magnitude
+    @return: OrderedDict {cylinder name: (n, 3) array of x, y, z}.
+      the coordinates are nan if the particle does not reach the cylinder.
+    '''
+    charges = np.asarray(charges, dtype=float)
+    momenta = np.asarray(momenta, dtype=float).reshape(-1, 3)
+    energies = np.asarray(energies, dtype=float)
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    charged = np.abs(charges) > 0.5
+    results = OrderedDict()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        helix = _HelixArrays(field, charges[charged], momenta[charged],
+                             energies[charged], vertices[charged])
+        line = _LineArrays(momenta[~charged], vertices[~charged])
+        for cylinder in cylinders:
+            points = np.empty((len(charges), 3))
+            points[charged] = helix.propagate(cylinder)
+            points[~charged] = line.propagate(cylinder)
+            results[cylinder.name] = points
+    return results
+
+
+class _HelixArrays(object):
+    '''Helix parameters for arrays of particles, as in path.Helix'''
+
+    def __init__(self, field, charges, momenta, energies, vertices):
+        c = constants.c
+        px, py, pz = momenta.T
+        self.ox, self.oy, self.oz = vertices.T
+        pt = np.hypot(px, py)
+        p = np.sqrt(px**2 + py**2 + pz**2)
+        self.rho = pt / (np.abs(charges)*field) * 1e9/c
+        factor = 1./(charges*field)*1e9/c
+        self.vox = px * factor
+        self.voy = py * factor
+        # M * Gamma = E
+        self.omega = charges*field*c**2 / (energies*1e9)
+        self.cx = self.ox + charges * py / pt * self.rho
+        self.cy = self.oy - charges * px / pt * self.rho
+        center = np.hypot(self.cx, self.cy)
+        self.extreme = np.where(center > 0., center + self.rho, self.rho)
+        self.phi0 = np.arctan2(self.oy - self.cy, self.ox - self.cx)
+        self.udirz = pz / p
+        self.vz = p / energies * c * self.udirz
+
+    def coord_at_time(self, time):
+        omegat = self.omega * time
+        x = self.ox + self.voy * (1 - np.cos(omegat)) + self.vox * np.sin(omegat)
+        y = self.oy - self.vox * (1 - np.cos(omegat)) + self.voy * np.sin(omegat)
+        z = self.vz * time + self.oz
+        return x, y, z
+
+    def time_at_phi(self, phi):
+        return deltaPhiArray(self.phi0, phi) / self.omega
+
+    def propagate(self, cylinder):
+        points = np.full((len(self.rho), 3), np.nan)
+        is_looper = self.extreme < cylinder.rad
+        xm, ym, xp, yp = _circle_intersection(self.cx, self.cy, self.rho,
+                                              cylinder.rad)
+        phi_m = np.arctan2(ym - self.cy, xm - self.cx)
+        phi_p = np.arctan2(yp - self.cy, xp - self.cx)
+        time = self.time_at_phi(phi_p)
+        z = self.coord_at_time(time)[2]
+        time = np.where(z * self.udirz < 0., self.time_at_phi(phi_m), time)
+        barrel = np.column_stack(self.coord_at_time(time))
+        # no intersection: the particle is not propagated
+        reached = ~np.isnan(xm) & ~np.isnan(xp)
+        in_barrel = ~is_looper & reached & (np.abs(barrel[:, 2]) < cylinder.z)
+        points[in_barrel] = barrel[in_barrel]
+        to_endcap = is_looper | (reached & ~in_barrel)
+        destz = np.where(self.udirz > 0., cylinder.z, -cylinder.z)
+        time = (destz - self.oz) / self.vz
+        endcap = np.column_stack(self.coord_at_time(time))
+        points[to_endcap] = endcap[to_endcap]
+        return points
+
+
+def _circle_intersection(x1, y1, r1, r2):
+    '''Vectorised version of geotools.circle_intersection.
+    The coordinates are nan when there is no solution.'''
+    switchxy = x1 == 0.
+    x1, y1 = np.where(switchxy, y1, x1), np.where(switchxy, x1, y1)
+    A = (r2**2 - r1**2 + x1**2 + y1**2) / (2*x1)
+    B = y1/x1
+    a = 1 + B**2
+    b = -2*A*B
+    c = A**2 - r2**2
+    delta = b**2 - 4*a*c
+    delta[delta < 0.] = np.nan
+    yp = ( -b + np.sqrt(delta) ) / (2*a)
+    ym = ( -b - np.sqrt(delta) ) / (2*a)
+    xp = np.sqrt(r2**2 - yp**2)
+    xp = np.where(np.abs((xp-x1)**2 + (yp-y1)**2 - r1**2) > 1e-9, -xp, xp)
+    xm = np.sqrt(r2**2 - ym**2)
+    xm = np.where(np.abs((xm-x1)**2 + (ym-y1)**2 - r1**2) > 1e-9, -xm, xm)
+    xm, ym = np.where(switchxy, ym, xm), np.where(switchxy, xm, ym)
+    xp, yp = np.where(switchxy, yp, xp), np.where(switchxy, xp, yp)
+    return xm, ym, xp, yp
+
+
+class _LineArrays(object):
+    '''Straight line parameters for arrays of particles, as in path.StraightLine'''
+
+    def __init__(self, momenta, vertices):
+        p = np.sqrt((momenta**2).sum(axis=1))
+        self.udir = momenta / p[:, np.newaxis]
+        self.origin = vertices
+        self.cos_theta = np.cos(np.arctan2(np.hypot(self.udir[:, 0], self.udir[:, 1]),
+                                           self.udir[:, 2]))
+
+    def propagate(self, cylinder):
+        ux, uy, uz = self.udir.T
+        ox, oy, oz = self.origin.T
+        points = np.full((len(ux), 3), np.nan)
+        inside = (np.abs(oz) <= cylinder.z) & (np.hypot(ox, oy) <= cylinder.rad)
+        destz = np.where(uz > 0., cylinder.z, -cylinder.z)
+        length = (destz - oz) / self.cos_theta
+        endcap = self.origin + self.udir * length[:, np.newaxis]
+        to_barrel = (uz == 0.) | (np.hypot(endcap[:, 0], endcap[:, 1]) > cylinder.rad)
+        a = ux**2 + uy**2
+        b = 2*(ux*ox + uy*oy)
+        c = ox**2 + oy**2 - cylinder.rad**2
+        delta = b**2 - 4*a*c
+        kp = (-b + np.sqrt(delta))/(2*a)
+        barrel = self.origin + self.udir * kp[:, np.newaxis]
+        in_endcap = inside & ~to_barrel
+        points[in_endcap] = endcap[in_endcap]
+        in_barrel = inside & to_barrel & (delta >= 0.)
+        points[in_barrel] = barrel[in_barrel]
+        return points
@@ -1,6 +1,7 @@
 import sys
 import copy
 import shelve
+import numpy as np
 from heppy.papas.propagator import propagator
 from heppy.papas.pfobjects import Cluster, SmearedCluster, SmearedTrack, Track
 from heppy.papas.data.papasevent import  PapasEvent
@@ -12,7 +13,35 @@ import heppy.statistics.rrandom as random
 from heppy.papas.graphtools.DAG import Node
 
 
+def _evaluate(method, arrays, args):
+    '''Evaluates a detector method, e.g. energy_resolution, for several objects.
+
+    The array version of the method, e.g. energy_resolution_array, is used
+    with the numpy arrays if the detector element defines it.
+    Otherwise, the method is called for each tuple in args.
+    '''
+    array_method = getattr(getattr(method, '__self__', None),
+                           getattr(method, '__name__', '') + '_array', None)
+    if array_method is not None:
+        return array_method(*arrays)
+    return np.array([method(*arg) for arg in args], dtype=float)
+
+
+def _groups(keys):
+    '''returns a list of (key, array of the indices of key in keys)'''
+    indices = dict()
+    for index, key in enumerate(keys):
+        indices.setdefault(key, []).append(index)
+    return [(key, np.array(value)) for key, value in indices.iteritems()]
+
+
 class Simulator(object):
+    '''Simulates the detector response to the generated particles.
+
+    During simulate, the true clusters and tracks are made particle by particle,
+    and then smeared in one go at the end of the event,
+    see make_and_store_smeared_clusters and make_and_store_smeared_tracks.
+    '''
 
     def __init__(self, detector, logger=None):
         self.verbose = True
@@ -39,6 +68,9 @@ class Simulator(object):
         self.history = dict()
         Cluster.max_energy = 0.
         SmearedCluster.max_energy = 0.
+        self._deferred = False
+        self._pending_clusters = []
+        self._pending_tracks = []
 
     def propagate(self, ptc):
         '''propagate the particle to all detector cylinders'''
@@ -119,26 +151,71 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         @param acceptance: optional detedctor object for acceptance.
           if provided, and if accept is False, used in place of detector.acceptance
         '''
-        eres = detector.energy_resolution(cluster.energy, cluster.position.Eta())
-        response = detector.energy_response(cluster.energy, cluster.position.Eta())
-        energy = cluster.energy * random.gauss(response, eres)
-        clusters = self.cluster_collection(cluster.layer, smeared=True)
-        smeared_cluster = SmearedCluster(cluster,
-                                         energy,
-                                         cluster.position,
-                                         cluster.size(),
-                                         cluster.layer,
-                                         len(clusters),
-                                         cluster.particle)
-        pdebugger.info(str('Made {}'.format(smeared_cluster)))
-        det = acceptance if acceptance else detector
-        if det.acceptance(smeared_cluster) or accept:
-            clusters[smeared_cluster.uniqueid] = smeared_cluster                      
-            self.update_history(cluster.uniqueid, smeared_cluster.uniqueid)
-            return smeared_cluster
-        else:
-            pdebugger.info(str('Rejected {}'.format(smeared_cluster)))
-            return None
+        return self.make_and_store_smeared_clusters(
+            [(cluster, detector, accept, acceptance)]
+        )[0]
+
+    def make_and_store_smeared_clusters(self, jobs):
+        '''Smears several clusters at once, see make_and_store_smeared_cluster.
+
+        The energy resolution, energy response and acceptance are evaluated
+        with the array methods of the detector elements if available,
+        and the random numbers are drawn in one go.
+
+        @param jobs: list of (cluster, detector, accept, acceptance),
+          the arguments of make_and_store_smeared_cluster.
+        Returns the list of the smeared clusters, with None for the rejected clusters.
+        '''
+        if not jobs:
+            return []
+        clusters, detectors, accepts, acceptances = zip(*jobs)
+        energy = np.array([cluster.energy for cluster in clusters])
+        eta = np.array([cluster.position.Eta() for cluster in clusters])
+        eres = np.empty(len(jobs))
+        response = np.empty(len(jobs))
+        for detector, indices in _groups(detectors):
+            arrays = (energy[indices], eta[indices])
+            args = zip(*arrays)
+            eres[indices] = _evaluate(detector.energy_resolution, arrays, args)
+            response[indices] = _evaluate(detector.energy_response, arrays, args)
+        smeared_energy = energy * random.gauss(response, eres, size=len(jobs))
+        unit_perp = np.array([cluster.position.Unit().Perp() for cluster in clusters])
+        # acceptance is None for the detectors without acceptance_array,
+        # and then evaluated below for each smeared cluster
+        accepted = [None] * len(jobs)
+        acceptance_dets = [acceptance if acceptance else detector
+                           for detector, acceptance in zip(detectors, acceptances)]
+        for det, indices in _groups(acceptance_dets):
+            if hasattr(det, 'acceptance_array'):
+                flags = det.acceptance_array(smeared_energy[indices], eta[indices],
+                                             smeared_energy[indices] * unit_perp[indices])
+                for index, flag in zip(indices, flags):
+                    accepted[index] = bool(flag)
+        if smeared_energy.max() > SmearedCluster.max_energy:
+            SmearedCluster.max_energy = float(smeared_energy.max())
+        smeared_clusters = []
+        for index, (cluster, det) in enumerate(zip(clusters, acceptance_dets)):
+            smeared_collection = self.cluster_collection(cluster.layer, smeared=True)
+            smeared_cluster = None
+            if accepted[index] is not False or accepts[index]:
+                smeared_cluster = SmearedCluster(cluster,
+                                                 smeared_energy[index],
+                                                 cluster.position,
+                                                 cluster.size(),
+                                                 cluster.layer,
+                                                 len(smeared_collection),
+                                                 cluster.particle)
+                pdebugger.info(str('Made {}'.format(smeared_cluster)))
+                if accepted[index] is None:
+                    accepted[index] = det.acceptance(smeared_cluster)
+            if accepted[index] or accepts[index]:
+                smeared_collection[smeared_cluster.uniqueid] = smeared_cluster
+                self.update_history(cluster.uniqueid, smeared_cluster.uniqueid)
+                smeared_clusters.append(smeared_cluster)
+            else:
+                pdebugger.info(str('Rejected smeared cluster of {}'.format(cluster)))
+                smeared_clusters.append(None)
+        return smeared_clusters
         
     def update_history(self, parentid, childid) :
         '''Updates the history adding new nodes if needed and recording parent child relationship'''
@@ -159,23 +236,88 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
     def make_and_store_smeared_track(self, ptc, track,
                                      detector_resolution, detector_acceptance):
         '''create a new smeared track'''
+        return self.make_and_store_smeared_tracks(
+            [(ptc, track, detector_resolution, detector_acceptance)]
+        )[0]
+
+    def make_and_store_smeared_tracks(self, jobs):
+        '''Smears several tracks at once, see make_and_store_smeared_track.
+
+        The resolution and acceptance are evaluated with the array methods
+        of the detector if available, and the random numbers are drawn in one go.
+
+        @param jobs: list of (ptc, track, detector_resolution, detector_acceptance),
+          the arguments of make_and_store_smeared_track.
+        Returns the list of the smeared tracks, with None for the rejected tracks.
+        '''
         #TODO smearing depends on particle type!
-        resolution = detector_resolution(track)
-        scale_factor = random.gauss(1, resolution)
-        smeared_track = SmearedTrack(track,
-                                     track._p3 * scale_factor,
-                                     track.charge,
-                                     track.path,
-                                     index = len(self.smeared_tracks))
-        pdebugger.info(" ".join(("Made", smeared_track.__str__())))
-        if detector_acceptance(track):
-            self.smeared_tracks[smeared_track.uniqueid] = smeared_track
-            self.update_history(track.uniqueid, smeared_track.uniqueid)   
-            ptc.track_smeared = smeared_track             
-            return smeared_track  
-        else:
-            pdebugger.info(str('Rejected {}'.format(smeared_track)))
-            return None
+        if not jobs:
+            return []
+        ptcs, tracks, resolutions, acceptances = zip(*jobs)
+        p3s = [track.p3() for track in tracks]
+        arrays = (np.array([p3.Perp() for p3 in p3s]),
+                  np.array([p3.Mag() for p3 in p3s]),
+                  np.array([p3.Eta() for p3 in p3s]),
+                  np.array([track.theta() for track in tracks]))
+        resolution = np.empty(len(jobs))
+        for method, indices in _groups(resolutions):
+            resolution[indices] = _evaluate(method,
+                                            [array[indices] for array in arrays],
+                                            [(tracks[index],) for index in indices])
+        accepted = np.empty(len(jobs), dtype=bool)
+        for method, indices in _groups(acceptances):
+            accepted[indices] = _evaluate(method,
+                                          [array[indices] for array in arrays],
+                                          [(tracks[index],) for index in indices])
+        scale_factors = random.gauss(1, resolution, size=len(jobs))
+        smeared_tracks = []
+        for ptc, track, scale_factor, track_accepted in zip(ptcs, tracks,
+                                                            scale_factors, accepted):
+            if track_accepted:
+                smeared_track = SmearedTrack(track,
+                                             track._p3 * float(scale_factor),
+                                             track.charge,
+                                             track.path,
+                                             index = len(self.smeared_tracks))
+                pdebugger.info(" ".join(("Made", smeared_track.__str__())))
+                self.smeared_tracks[smeared_track.uniqueid] = smeared_track
+                self.update_history(track.uniqueid, smeared_track.uniqueid)
+                ptc.track_smeared = smeared_track
+                smeared_tracks.append(smeared_track)
+            else:
+                pdebugger.info(str('Rejected smeared track of {}'.format(track)))
+                smeared_tracks.append(None)
+        return smeared_tracks
+
+    def smear_cluster(self, ptc, cluster, detector, acceptance=None):
+        '''Smears cluster, and stores the smeared cluster in ptc if accepted.
+
+        Within simulate, the smearing is deferred to the end of the event.
+        '''
+        self._pending_clusters.append((ptc, (cluster, detector, False, acceptance)))
+        if not self._deferred:
+            self.smear_pending()
+
+    def smear_track(self, ptc, track, detector_resolution, detector_acceptance):
+        '''Smears track, and stores the smeared track in ptc if accepted.
+
+        Within simulate, the smearing is deferred to the end of the event.
+        '''
+        self._pending_tracks.append((ptc, track, detector_resolution, detector_acceptance))
+        if not self._deferred:
+            self.smear_pending()
+
+    def smear_pending(self):
+        '''Smears all the pending clusters and tracks'''
+        pending_clusters, self._pending_clusters = self._pending_clusters, []
+        pending_tracks, self._pending_tracks = self._pending_tracks, []
+        if pending_clusters:
+            ptcs, jobs = zip(*pending_clusters)
+            smeared_clusters = self.make_and_store_smeared_clusters(jobs)
+            for ptc, smeared in zip(ptcs, smeared_clusters):
+                if smeared:
+                    ptc.clusters_smeared[smeared.layer] = smeared
+        self.make_and_store_smeared_tracks(pending_tracks)
 
     def simulate_photon(self, ptc):
         pdebugger.info("Simulating Photon")
@@ -184,9 +326,7 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         propagator(ptc.q()).propagate_one(ptc,
                                           ecal.volume.inner)
         cluster = self.make_and_store_cluster(ptc, detname)
-        smeared = self.make_and_store_smeared_cluster(cluster,  ecal)
-        if smeared:
-            ptc.clusters_smeared[smeared.layer] = smeared
+        self.smear_cluster(ptc, cluster, ecal)
 
     def simulate_neutrino(self, ptc):
         self.propagate(ptc)
@@ -205,7 +345,7 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
             #track is now made outside of the particle and then the particle is told where the track is
             track = self.make_and_store_track(ptc)
             tracker = self.detector.elements['tracker']
-            smeared_track = self.make_and_store_smeared_track(
+            self.smear_track(
                 ptc, 
                 track, 
                 tracker.resolution,
@@ -232,13 +372,9 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
                     # For now, using the hcal resolution and acceptance
                     # for hadronic cluster
                     # in the ECAL. That's not a bug!
-                    smeared = self.make_and_store_smeared_cluster(cluster, hcal, acceptance=ecal)
-                    if smeared:
-                        ptc.clusters_smeared[smeared.layer] = smeared
+                    self.smear_cluster(ptc, cluster, hcal, acceptance=ecal)
         cluster = self.make_and_store_cluster(ptc, 'hcal', 1-frac_ecal)
-        smeared = self.make_and_store_smeared_cluster(cluster, hcal)
-        if smeared:
-            ptc.clusters_smeared[smeared.layer] = smeared
+        self.smear_cluster(ptc, cluster, hcal)
 
     def simulate_electron(self, ptc):
         '''Simulate an electron corresponding to gen particle ptc.
@@ -258,7 +394,7 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
             ecal.volume.inner,
             self.detector.elements['field'].magnitude
         )
-        smeared_track = self.make_and_store_smeared_track(
+        self.smear_track(
             ptc, track,
             self.detector.electron_resolution,
             self.detector.electron_acceptance
@@ -278,7 +414,7 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
         pdebugger.info("Simulating Muon")  
         track = self.make_and_store_track(ptc)
         self.propagate(ptc)
-        smeared_track = self.make_and_store_smeared_track(
+        self.smear_track(
             ptc, track,
             self.detector.muon_resolution,
             self.detector.muon_acceptance
@@ -287,7 +423,17 @@ cannot be extrapolated to : {det}\n'''.format(ptc=ptc,
     def simulate(self, ptcs, history):
         self.reset()
         self.history = history
-        # import pdb; pdb.set_trace()
+        # the clusters and tracks are smeared at the end, all at once
+        self._deferred = True
+        try:
+            self._simulate(ptcs)
+            self.smear_pending()
+        finally:
+            self._deferred = False
+            self._pending_clusters = []
+            self._pending_tracks = []
+
+    def _simulate(self, ptcs):
         for ptc in ptcs:
             if ptc.q() and ptc.pt() < 0.2 and abs(ptc.pdgid()) >= 100:
                 # to avoid numerical problems in propagation (and avoid making a particle that is not used)
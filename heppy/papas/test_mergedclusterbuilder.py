@@ -0,0 +1,56 @@
+import unittest
+import math
+import random
+
+import heppy.framework.context as context
+if context.name != 'bare':
+    from ROOT import TVector3
+    from heppy.papas.pfobjects import Cluster
+    from heppy.papas.pfalgo.distance import Distance
+    from heppy.papas.graphtools.DAG import Node
+    from heppy.papas.mergedclusterbuilder import MergedClusterBuilder
+
+
+@unittest.skipIf(context.name=='bare', 'ROOT not available')
+class TestMergedClusterBuilder(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(2)
+        self.clusters = dict()
+        for index in range(300):
+            position = TVector3()
+            position.SetMagThetaPhi(1.9, rng.uniform(0.3, math.pi - 0.3),
+                                    rng.uniform(-math.pi, math.pi))
+            cluster = Cluster(rng.uniform(1, 20), position,
+                              rng.uniform(0.05, 0.2), 'hcal_in', index)
+            self.clusters[cluster.uniqueid] = cluster
+
+    def merge(self, spatial_index):
+        history = dict((uid, Node(uid)) for uid in self.clusters)
+        builder = MergedClusterBuilder(self.clusters, Distance(), history,
+                                       spatial_index=spatial_index)
+        return builder, history
+
+    def test_spatial_index(self):
+        '''Test that the spatial index gives the same merged clusters and history'''
+        exhaustive, exhaustive_history = self.merge(False)
+        spatial, spatial_history = self.merge(True)
+        self.assertTrue(len(spatial.edges) < len(exhaustive.edges))
+        self.assertTrue(all(edge.linked for edge in spatial.edges.values()))
+        self.assertTrue(len(spatial.merged_clusters) < len(self.clusters))
+        self.assertEqual(sorted(exhaustive.merged_clusters.keys()),
+                         sorted(spatial.merged_clusters.keys()))
+        for uid, merged in exhaustive.merged_clusters.iteritems():
+            other = spatial.merged_clusters[uid]
+            self.assertEqual([c.uniqueid for c in merged.subclusters],
+                             [c.uniqueid for c in other.subclusters])
+            self.assertEqual(merged.energy, other.energy)
+            self.assertEqual(merged.position, other.position)
+        self.assertEqual(sorted(exhaustive_history.keys()), sorted(spatial_history.keys()))
+        for uid, node in exhaustive_history.iteritems():
+            self.assertEqual([child.get_value() for child in node.children],
+                             [child.get_value() for child in spatial_history[uid].children])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,16 @@ import unittest
 import numpy as np
 import math 
 import copy
+import random
+import scipy.optimize
 
 import heppy.framework.context as context
 if context.name != 'bare':
-    from path import Helix, ImpactParameter
+    from path import Helix, ImpactParameter, impact_parameters
     from heppy.analyzers.ImpactParameterSmearer import smear_IP
     from ROOT import TLorentzVector, TVector3
-    from heppy.utils.computeIP import compute_IP
+    from heppy.utils.computeIP import compute_IP, compute_IPs, straight_line
+    from heppy.utils.computeIP import compute_IP_wrt_direction, compute_IPs_wrt_direction
 
 @unittest.skipIf(context.name=='bare', 'ROOT not available')
 class TestPath(unittest.TestCase):        
@@ -82,6 +85,67 @@ class TestPath(unittest.TestCase):
         self.p4.Vect().Print()
         ip = ImpactParameter(self.helix, self.origin, self.p4.Vect())
         self.assertAlmostEqual(ip.value, self.true_IP, places=5)
+
+    def random_helices(self, nhelices):
+        rng = random.Random(1)
+        helices = []
+        for i in range(nhelices):
+            p4 = TLorentzVector()
+            p4.SetPtEtaPhiM(rng.uniform(0.5, 50), rng.uniform(-2, 2),
+                            rng.uniform(-math.pi, math.pi), 0.14)
+            vertex = TVector3(rng.gauss(0, 1e-3), rng.gauss(0, 1e-3),
+                              rng.gauss(0, 1e-3))
+            helices.append(Helix(2., rng.choice([-1, 1]), p4, vertex))
+        return helices
+
+    def test_closest_approach(self):
+        '''Test the Newton minimisation against scipy, to 1e-9 relative.
+
+        The scipy minimisation is done with times in ns, as its
+        tolerance on the time is at least 1e-11 in absolute.
+        '''
+        jet_dir = TVector3(1, 0.2, 0.3)
+        jet_line = straight_line(self.origin, jet_dir)
+        for helix in self.random_helices(100):
+            def dist2(time_ns):
+                x, y, z = helix.coord_at_time(time_ns * 1e-9)
+                return x**2 + y**2 + z**2
+            ref = scipy.optimize.minimize_scalar(
+                dist2, method='brent', bracket=[-5, 5],
+                options={'xtol': 1e-20, 'maxiter': 1e5}, tol=None).x
+            time = helix.closest_approach_time(self.origin)
+            self.assertAlmostEqual(math.sqrt(dist2(time * 1e9)) / math.sqrt(dist2(ref)),
+                                   1., places=9)
+            def dist2_jet(time_ns):
+                point = helix.point_at_time(time_ns * 1e-9)
+                return jet_line.distance_from_point(point).Mag2()
+            ref = scipy.optimize.minimize_scalar(
+                dist2_jet, method='bounded', bounds=[-1e-2, 1e-2],
+                options={'xatol': 1e-20, 'maxiter': 1e5}).x
+            time = helix.closest_approach_time(self.origin, jet_dir, (-1e-11, 1e-11))
+            # the scipy minimum can be slightly inside the bounds
+            self.assertLessEqual(math.sqrt(dist2_jet(time * 1e9)),
+                                 math.sqrt(dist2_jet(ref)) * (1 + 1e-9))
+
+    def test_batch(self):
+        '''Test that the impact parameters computed for all helices at once
+        are the ones computed for each helix'''
+        helices = self.random_helices(20)
+        jet_dir = TVector3(1, 0.2, 0.3)
+        ips = impact_parameters(helices, self.origin, jet_dir)
+        for helix, ip in zip(helices, ips):
+            single = ImpactParameter(helix, self.origin, jet_dir)
+            self.assertAlmostEqual(ip.value / single.value, 1., places=12)
+        values = compute_IPs(helices, self.origin, jet_dir)
+        for helix, value in zip(helices, values):
+            self.assertEqual(helix.impact_parameter, value)
+            self.assertAlmostEqual(compute_IP(helix, self.origin, jet_dir) / value,
+                                   1., places=12)
+        compute_IPs_wrt_direction(helices, self.origin, jet_dir)
+        values = [helix.impact_parameter for helix in helices]
+        for helix, value in zip(helices, values):
+            compute_IP_wrt_direction(helix, self.origin, jet_dir)
+            self.assertAlmostEqual(helix.impact_parameter / value, 1., places=12)
         
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,13 @@
 import unittest
+import math
+import random
+import numpy as np
 
 import heppy.framework.context as context
 if context.name != 'bare':
     from detectors.geometry import SurfaceCylinder
     from pfobjects import Particle
-    from propagator import straight_line, helix
+    from propagator import straight_line, helix, propagator, propagate_arrays
     from vectors import LorentzVector, Point
 
 
@@ -85,6 +88,59 @@ class TestPropagator(unittest.TestCase):
                              Point(0., 0., 0.), -1, -211)        
         debug_info = helix.propagate_one(particle, cyl1, field)
 
+    def test_helix_cache(self):
+        '''Test that the helix is built once for all cylinders'''
+        cyl1 = SurfaceCylinder('cyl1', 1., 2.)
+        cyl2 = SurfaceCylinder('cyl2', 2., 1.)
+        particle = Particle( LorentzVector(2., 0, 1, 5),
+                             Point(0., 0., 0.), -1, -211)
+        helix.propagate_one(particle, cyl1, 3.8)
+        path = helix.path(particle, 3.8)
+        self.assertTrue(path is particle.path)
+        helix.propagate_one(particle, cyl2, 3.8)
+        self.assertTrue(helix.path(particle, 3.8) is path)
+        self.assertFalse(helix.path(particle, 2.) is path)
+
+    def test_arrays(self):
+        '''Test that propagate_arrays gives the same points as propagate_one'''
+        rng = random.Random(1)
+        cylinders = [SurfaceCylinder('cyl1', 1.3, 2.),
+                     SurfaceCylinder('cyl2', 1.9, 2.6),
+                     SurfaceCylinder('cyl3', 0.5, 0.5)]
+        field = 3.8
+        particles = []
+        for i in range(300):
+            charge = rng.choice([-1, 0, 1])
+            p3 = Point()
+            p3.SetMagThetaPhi(rng.uniform(0.3, 20), rng.uniform(0.05, math.pi - 0.05),
+                              rng.uniform(-math.pi, math.pi))
+            p4 = LorentzVector()
+            p4.SetVectM(p3, 0.14)
+            vertex = Point(rng.gauss(0, 0.05), rng.gauss(0, 0.05), rng.gauss(0, 0.1))
+            particles.append(Particle(p4, vertex, charge, 211 * charge or 22))
+        for particle in particles:
+            propagator(particle.q()).propagate([particle], cylinders, field)
+        points = propagate_arrays(
+            [ptc.q() for ptc in particles],
+            [(ptc.p4().Px(), ptc.p4().Py(), ptc.p4().Pz()) for ptc in particles],
+            [ptc.p4().E() for ptc in particles],
+            [(ptc.vertex.X(), ptc.vertex.Y(), ptc.vertex.Z()) for ptc in particles],
+            cylinders, field
+        )
+        self.assertEqual(points.keys(), ['cyl1', 'cyl2', 'cyl3'])
+        nreached = 0
+        for cylinder in cylinders:
+            for ptc, point in zip(particles, points[cylinder.name]):
+                expected = ptc.points.get(cylinder.name)
+                if expected is None:
+                    self.assertTrue(np.all(np.isnan(point)))
+                else:
+                    nreached += 1
+                    for coord, value in zip([expected.X(), expected.Y(), expected.Z()],
+                                            point):
+                        self.assertAlmostEqual(coord, value, places=9)
+        self.assertTrue(nreached > 500)
+
         
 if __name__ == '__main__':
     unittest.main()
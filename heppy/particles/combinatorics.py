@@ -0,0 +1,81 @@
+'''Combinatorics of particles with numpy, to build resonances.
+
+The four-momenta of the particles are extracted once in a numpy array,
+and the combinations of k particles are represented by an array of indices,
+so that the invariant masses or transverse momenta of all the combinations
+are computed in a few numpy operations.
+The resonance objects only need to be built for the selected combinations.
+
+Example::
+
+    p4s = p4_array(leptons)
+    combs = select(combinations(len(leptons), 2), leptons,
+                   charge=0, same_flavour=True)
+    dmass = np.abs(masses(sum_p4s(p4s, combs)) - 91.)
+    best = [Resonance2(leptons[i], leptons[j], 23)
+            for i, j in combs[smallest(dmass, 1)]]
+'''
+
+import itertools
+import numpy as np
+
+
+def p4_array(ptcs):
+    '''Returns the (n, 4) array of the (px, py, pz, e) of the particles ptcs.'''
+    p4s = [ptc.p4() for ptc in ptcs]
+    return np.array([(p4.Px(), p4.Py(), p4.Pz(), p4.E()) for p4 in p4s],
+                    dtype=float).reshape(-1, 4)
+
+
+def combinations(n, k):
+    '''Returns the (ncombinations, k) array of the indices of the combinations
+    of k elements among n, in the order of itertools.combinations.'''
+    indices = itertools.chain.from_iterable(itertools.combinations(range(n), k))
+    return np.fromiter(indices, dtype=int).reshape(-1, k)
+
+
+def select(combs, ptcs, charge=None, same_flavour=False):
+    '''Returns the combinations of particles satisfying the constraints.
+
+    @param combs: combinations of indices of ptcs, see combinations.
+    @param charge: if not None, total charge of the combination.
+    @param same_flavour: if True, all particles must have the same abs(pdgid).
+    '''
+    if charge is not None:
+        charges = np.array([ptc.q() for ptc in ptcs])
+        combs = combs[charges[combs].sum(axis=1) == charge]
+    if same_flavour:
+        flavours = np.abs(np.array([ptc.pdgid() for ptc in ptcs], dtype=int))
+        combs = combs[(flavours[combs] == flavours[combs[:, :1]]).all(axis=1)]
+    return combs
+
+
+def sum_p4s(p4s, combs):
+    '''Returns the (ncombinations, 4) array of the summed four-momenta
+    of the combinations of the four-momenta p4s.'''
+    total = p4s[combs[:, 0]]
+    for leg in range(1, combs.shape[1]):
+        total = total + p4s[combs[:, leg]]
+    return total
+
+
+def masses(p4s):
+    '''Returns the invariant masses of the four-momenta p4s.
+    As for TLorentzVector.M, -sqrt(-m^2) is returned if m^2 < 0.'''
+    px, py, pz, e = p4s.T
+    m2 = e * e - (px * px + py * py + pz * pz)
+    mass = np.sqrt(np.abs(m2))
+    return np.where(m2 < 0, -mass, mass)
+
+
+def pts(p4s):
+    '''Returns the transverse momenta of the four-momenta p4s.'''
+    px, py = p4s[:, 0], p4s[:, 1]
+    return np.sqrt(px * px + py * py)
+
+
+def smallest(scores, k=None):
+    '''Returns the indices of the k smallest scores, by increasing score.
+    Equal scores are kept in their original order.
+    If k is None, all indices are returned.'''
+    return np.argsort(scores, kind='mergesort')[:k]
@@ -1,7 +1,21 @@
 import copy
 
 class GenBrowser(object):
-    """Browser for gen particle history."""
+    """Browser for gen particle history.
+
+    The history is indexed once at construction: each particle is identified
+    by its index in the list of particles, and the mothers and daughters
+    of each particle are stored as tuples of indices.
+    The history is then walked iteratively, without recursion,
+    and the ancestors and descendants of each particle are memoised.
+
+    Example::
+
+        browser = GenBrowser(event.gen_particles, event.gen_vertices)
+        ancestors = browser.ancestors(ptc)
+        # for all particles at once:
+        from_b = browser.descends_from(lambda ptc: hasBottom(ptc.pdgid()))
+    """
     
     def __init__(self, particles, vertices):
         """
@@ -51,44 +65,111 @@ class GenBrowser(object):
             for ptc in vtx.outgoing:
                 # print ptc
                 ptc.mothers = vtx.incoming
-                
+
+        # indexing the history
+        self._index = dict((id(ptc), index) for index, ptc in enumerate(particles))
+        self._mothers = [self._indices(ptc.mothers) for ptc in particles]
+        self._daughters = [self._indices(ptc.daughters) for ptc in particles]
+        self._ancestors = dict()
+        self._descendants = dict()
+        self._descends_from = dict()
+
+    def _indices(self, ptcs):
+        '''returns the tuple of the indices of particles ptcs'''
+        try:
+            return tuple(self._index[id(ptc)] for ptc in ptcs)
+        except KeyError:
+            raise ValueError('particle not found in the browsed particles')
+
+    def _walk(self, start, links):
+        '''Returns the tuple of the indices of the particles reached from
+        the particles start by following links (mothers or daughters),
+        in depth-first order, each particle appearing once.'''
+        result = []
+        visited = set()
+        stack = list(reversed(start))
+        while stack:
+            index = stack.pop()
+            if index in visited:
+                continue
+            visited.add(index)
+            result.append(index)
+            stack.extend(reversed(links[index]))
+        return tuple(result)
+
+    def _related(self, particle, links, attribute, cache):
+        '''ancestors or descendants of particle, memoised'''
+        index = self._index.get(id(particle))
+        if index is None:
+            # particle not browsed, e.g. a copy
+            related = self._walk(self._indices(getattr(particle, attribute)), links)
+        else:
+            related = cache.get(index)
+            if related is None:
+                related = self._walk(links[index], links)
+                cache[index] = related
+        return [self.particles[i] for i in related]
+
     def ancestors(self, particle):
         """Returns the list of ancestors for a given particle, 
         that is mothers, grandmothers, etc.
-        Recursive.
+        Each ancestor appears once, in depth-first order.
         """
-        result = []
-        for mother in particle.mothers:
-            result.append(mother)
-            result.extend(self.ancestors(mother))
-        return result
+        return self._related(particle, self._mothers, 'mothers', self._ancestors)
 
     def descendants(self, particle):
         """Returns the list of descendants for a given particle, 
         that is daughters, granddaughters, etc.
-        Recursive.
+        Each descendant appears once, in depth-first order.
         """
-        result = []
-        for daughter in particle.daughters:
-            result.append(daughter)
-            result.extend(self.descendants(daughter))
-        return result
+        return self._related(particle, self._daughters, 'daughters', self._descendants)
+
+    def descends_from(self, predicate):
+        '''Returns a list of booleans, one for each particle, in the order of
+        self.particles. The boolean is True if the particle has an ancestor
+        for which predicate(ancestor) is True.
+
+        All particles are processed in a single pass over the history,
+        and the result is memoised for each predicate.
+        '''
+        flags = self._descends_from.get(predicate)
+        if flags is None:
+            seeds = [index for index, ptc in enumerate(self.particles) if predicate(ptc)]
+            flags = [False] * len(self.particles)
+            stack = [dau for index in seeds for dau in self._daughters[index]]
+            while stack:
+                index = stack.pop()
+                if not flags[index]:
+                    flags[index] = True
+                    stack.extend(self._daughters[index])
+            self._descends_from[predicate] = flags
+        return flags
+
+    def has_ancestor(self, particle, predicate):
+        '''Returns True if particle has an ancestor for which
+        predicate(ancestor) is True, see descends_from.'''
+        flags = self.descends_from(predicate)
+        index = self._index.get(id(particle))
+        if index is None:
+            return any(flags[mother] or predicate(self.particles[mother])
+                       for mother in self._indices(particle.mothers))
+        return flags[index]
 
     def decay_daughters(self, particle):
         '''Returns decay daughters.
         If particle decays to a single particle (itself), return daughters of daughter.
-        Recursive.
         '''
-        result = []
-        self_decay = None
-        for dau in particle.daughters:
-            if dau.pdgid() == particle.pdgid():
-                self_decay = dau
+        visited = set()
+        while id(particle) not in visited:
+            visited.add(id(particle))
+            self_decay = None
+            for dau in particle.daughters:
+                if dau.pdgid() == particle.pdgid():
+                    self_decay = dau
+                    break
+            if not self_decay:
                 break
-        if self_decay:
-            result.extend(self.decay_daughters(self_decay))
-        else:
-            result.extend(particle.daughters)
-        return result
+            particle = self_decay
+        return list(particle.daughters)
 
 
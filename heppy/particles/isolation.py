@@ -1,4 +1,6 @@
+import numpy as np
 from heppy.utils.deltar import deltaR2
+from heppy.utils.deltarmatrix import coordinates, deltaPhiArray
 
 class Area(object):
     '''Base Area interface.'''
@@ -23,6 +25,11 @@ class EtaPhiCircle(Area):
         dR2 = deltaR2(*args)
         return dR2 < self._R2
 
+    def is_inside_dR2(self, dR2):
+        '''returns True if the squared distance dR2 to the center
+        is inside the circle. dR2 can be a numpy array.'''
+        return dR2 < self._R2
+
 
 class IsolationInfo(object):
     '''Holds the results of an isolation calculation.'''
@@ -104,12 +111,19 @@ class IsolationComputer(object):
         self.pt_thresh = pt_thresh
         self.e_thresh = e_thresh
         self.label = label
+        # with EtaPhiCircles only, the distances to all particles
+        # are computed at once
+        self.vectorised = all(isinstance(area, EtaPhiCircle)
+                              for area in list(self.on_areas) + list(self.off_areas))
 
         
     def compute(self, lepton, particles):
         '''Compute the isolation for lepton, using particles.
         returns an IsolationInfo.
         '''
+        if self.vectorised and len(particles):
+            index = IsolationIndex(particles)
+            return self.compute_groups(lepton, index, {None: self.label})[None]
         isolation = IsolationInfo(self.label, lepton)
         for ptc in particles:
             if ptc is lepton:
@@ -131,4 +145,89 @@ class IsolationComputer(object):
             if is_on:
                 isolation.add_particle(ptc)        
         return isolation
-    
+
+    def compute_groups(self, lepton, index, labels):
+        '''Compute the isolation for lepton, using the particles of an IsolationIndex.
+
+        All groups of particles of the index are done in a single pass.
+        @param labels: dictionary {group: label}. Only the groups in labels are considered.
+        @return: dictionary {group: IsolationInfo}, with an IsolationInfo
+          for each group in labels, as given by compute for the particles
+          of this group.
+        '''
+        isolations = dict((group, IsolationInfo(label, lepton))
+                          for group, label in labels.iteritems())
+        if self.vectorised:
+            selected = index.select(lepton, self.on_areas, self.off_areas,
+                                    self.pt_thresh, self.e_thresh)
+        else:
+            selected = [i for i, ptc in enumerate(index.particles)
+                        if self._is_selected(lepton, ptc)]
+        for i in selected:
+            ptc = index.particles[i]
+            if ptc is lepton:
+                continue
+            isolation = isolations.get(index.groups[i])
+            if isolation is not None:
+                isolation.add_particle(ptc)
+        return isolations
+
+    def _is_selected(self, lepton, ptc):
+        '''returns True if ptc passes the thresholds and is in the areas.'''
+        if ptc.e()<self.e_thresh or \
+           ptc.pt()<self.pt_thresh:
+            return False
+        if not any(area.is_inside(lepton, ptc) for area in self.on_areas):
+            return False
+        return not any(area.is_inside(lepton, ptc) for area in self.off_areas)
+
+
+class IsolationIndex(object):
+    '''Angular index of a collection of particles, to be built once per event
+    and used by IsolationComputer.compute_groups for all leptons.
+
+    The particles are sorted in eta (theta for an ee collider), so that
+    only the particles in a band around the lepton are considered.
+    Each particle may be assigned to a group, e.g. according to its type.
+    '''
+
+    def __init__(self, particles, group=None):
+        '''@param particles: list of particles
+        @param group: function returning the group of a particle.
+          if None, all particles are in group None.
+        '''
+        self.particles = list(particles)
+        if group is None:
+            self.groups = [None] * len(self.particles)
+        else:
+            self.groups = [group(ptc) for ptc in self.particles]
+        self.etas, self.phis = coordinates(self.particles)
+        self.es = np.array([ptc.e() for ptc in self.particles], dtype=float)
+        self.pts = np.array([ptc.pt() for ptc in self.particles], dtype=float)
+        self.order = np.argsort(self.etas, kind='mergesort')
+        self.sorted_etas = self.etas[self.order]
+
+    def select(self, lepton, on_areas, off_areas, pt_thresh=0, e_thresh=0):
+        '''Returns the sorted indices of the particles passing the thresholds,
+        inside one of the on_areas, and outside all off_areas.
+        All areas must be EtaPhiCircles.
+        '''
+        if not len(on_areas) or not len(self.particles):
+            return []
+        leta, lphi = coordinates([lepton])
+        leta, lphi = leta[0], lphi[0]
+        # the margin protects against rounding errors at the edges of the band
+        rmax = max(area.R for area in on_areas) * (1 + 1e-9)
+        first = np.searchsorted(self.sorted_etas, leta - rmax, 'left')
+        last = np.searchsorted(self.sorted_etas, leta + rmax, 'right')
+        band = self.order[first:last]
+        de = leta - self.etas[band]
+        dp = deltaPhiArray(lphi, self.phis[band])
+        dR2 = de*de + dp*dp
+        is_on = np.zeros(len(band), dtype=bool)
+        for area in on_areas:
+            is_on |= area.is_inside_dR2(dR2)
+        for area in off_areas:
+            is_on &= ~area.is_inside_dR2(dR2)
+        is_on &= ~((self.es[band] < e_thresh) | (self.pts[band] < pt_thresh))
+        return np.sort(band[is_on])
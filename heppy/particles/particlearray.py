@@ -0,0 +1,204 @@
+'''Collection of particles stored as a structure of numpy arrays.'''
+
+import math
+import numpy as np
+from heppy.configuration import Collider
+
+
+class ParticleArray(object):
+    '''Collection of particles holding px, py, pz, E, pdgid, charge and status
+    in contiguous numpy arrays.
+
+    The kinematic accessors (pt(), eta(), theta(), ...) have the same names and
+    conventions as the ones of L{heppy.particles.p4.P4}, but act on the whole
+    collection and return numpy arrays::
+
+        ptcs = ParticleArray.from_particles(event.rec_particles)
+        energetic = ptcs[ptcs.e() > 5.]
+        muons = ptcs[np.abs(ptcs.pdgid()) == 13]
+
+    Indexing with an integer returns a particle. If the collection was built from
+    particle objects, the original object is returned. Otherwise, a
+    L{heppy.particles.tlv.particle.Particle} is created on first access,
+    and kept for later use.
+    Indexing with a slice, a boolean mask or an array of indices
+    returns a new ParticleArray holding the selected particles.
+    Iterating over a ParticleArray gives the particles, so that a ParticleArray
+    can be used in place of a list of particles.
+    '''
+
+    def __init__(self, px, py, pz, e, pdgid, charge, status=None,
+                 particles=None):
+        '''Create a ParticleArray from array-like px, py, pz, e, pdgid, charge.
+
+        @param status: status of the particles, 1 by default.
+        @param particles: list of the particle objects corresponding to the
+          arrays, or None. If None, particles are created on first access.
+        '''
+        self._px = np.asarray(px, dtype=float)
+        self._py = np.asarray(py, dtype=float)
+        self._pz = np.asarray(pz, dtype=float)
+        self._e = np.asarray(e, dtype=float)
+        self._pdgid = np.asarray(pdgid, dtype=int)
+        self._charge = np.asarray(charge, dtype=int)
+        if status is None:
+            status = np.ones(len(self._px), dtype=int)
+        self._status = np.asarray(status, dtype=int)
+        size = len(self._px)
+        for array in [self._py, self._pz, self._e, self._pdgid,
+                      self._charge, self._status]:
+            if len(array) != size:
+                raise ValueError('all arrays must have the same length')
+        if particles is None:
+            particles = [None] * size
+        elif len(particles) != size:
+            raise ValueError('particles must have the same length as the arrays')
+        self._particles = list(particles)
+
+    @classmethod
+    def from_particles(cls, particles):
+        '''Create a ParticleArray from a list of particles.
+        The particles are kept, and returned when accessing the elements
+        of the ParticleArray.'''
+        particles = list(particles)
+        p4s = [ptc.p4() for ptc in particles]
+        return cls([p4.Px() for p4 in p4s],
+                   [p4.Py() for p4 in p4s],
+                   [p4.Pz() for p4 in p4s],
+                   [p4.E() for p4 in p4s],
+                   [ptc.pdgid() for ptc in particles],
+                   [ptc.q() for ptc in particles],
+                   [ptc.status() for ptc in particles],
+                   particles)
+
+    @classmethod
+    def concatenate(cls, arrays):
+        '''Create a ParticleArray holding the particles of all arrays, in order.'''
+        arrays = list(arrays)
+        particles = []
+        for array in arrays:
+            particles.extend(array._particles)
+        return cls(*[np.concatenate([getattr(array, name) for array in arrays])
+                     for name in ['_px', '_py', '_pz', '_e', '_pdgid',
+                                  '_charge', '_status']],
+                   particles=particles)
+
+    def __len__(self):
+        return len(self._px)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._particle(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, long, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError('ParticleArray index out of range')
+            return self._particle(index)
+        indices = np.arange(len(self))[index]
+        return self.__class__(self._px[indices], self._py[indices],
+                              self._pz[indices], self._e[indices],
+                              self._pdgid[indices], self._charge[indices],
+                              self._status[indices],
+                              [self._particles[i] for i in indices])
+
+    def _particle(self, index):
+        '''Returns the particle at index, creating it if needed.'''
+        ptc = self._particles[index]
+        if ptc is None:
+            from ROOT import TLorentzVector
+            from heppy.particles.tlv.particle import Particle
+            tlv = TLorentzVector(self._px[index], self._py[index],
+                                 self._pz[index], self._e[index])
+            ptc = Particle(int(self._pdgid[index]), int(self._charge[index]),
+                           tlv, int(self._status[index]))
+            self._particles[index] = ptc
+        return ptc
+
+    def select(self, mask):
+        '''Returns a ParticleArray with the particles for which mask is True.'''
+        return self[np.asarray(mask, dtype=bool)]
+
+    def sorted(self, key=None):
+        '''Returns a ParticleArray sorted by decreasing key.
+
+        @param key: array of sort keys, by default the one of sort_key.
+        Particles with the same key keep their order.
+        '''
+        if key is None:
+            key = self.sort_key()
+        return self[np.argsort(-np.asarray(key), kind='mergesort')]
+
+    def sort_key(self):
+        '''energy or pT depending on Collider.BEAMS, as in P4.sort_key'''
+        if Collider.BEAMS == 'ee':
+            return self.e()
+        else:
+            return self.pt()
+
+    def sum_p4(self):
+        '''returns the sum px, py, pz, e of the particles'''
+        return (self._px.sum(), self._py.sum(), self._pz.sum(), self._e.sum())
+
+    def pdgid(self):
+        '''particle types'''
+        return self._pdgid
+
+    def q(self):
+        '''particle charges'''
+        return self._charge
+
+    def status(self):
+        '''status codes'''
+        return self._status
+
+    def px(self):
+        return self._px
+
+    def py(self):
+        return self._py
+
+    def pz(self):
+        return self._pz
+
+    def e(self):
+        '''energies'''
+        return self._e
+
+    def pt(self):
+        '''transverse momenta'''
+        return np.hypot(self._px, self._py)
+
+    def p(self):
+        '''momentum magnitudes'''
+        return np.sqrt(self._px**2 + self._py**2 + self._pz**2)
+
+    def theta(self):
+        '''angles w/r to transverse plane'''
+        return math.pi/2 - np.arctan2(self.pt(), self._pz)
+
+    def eta(self):
+        '''pseudo-rapidities, +-inf along the z axis as in P4.eta'''
+        pt = self.pt()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eta = np.arcsinh(self._pz / pt)
+        along_z = pt < 1e-9
+        eta[along_z] = np.where(self._pz[along_z] > 0., np.inf, -np.inf)
+        return eta
+
+    def phi(self):
+        '''azymuthal angles (from x axis, in the transverse plane)'''
+        return np.arctan2(self._py, self._px)
+
+    def m(self):
+        '''masses'''
+        p2 = self._px**2 + self._py**2 + self._pz**2
+        return np.sqrt(np.abs(self._e**2 - p2))
+
+    def __str__(self):
+        return '{className}: {n} particles'.format(
+            className=self.__class__.__name__, n=len(self))
+
+    __repr__ = __str__
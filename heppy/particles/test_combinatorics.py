@@ -0,0 +1,112 @@
+import unittest
+import math
+import random
+import itertools
+import numpy as np
+
+import heppy.particles.combinatorics as combinatorics
+
+
+class ToyP4(object):
+    '''Object with the methods of a TLorentzVector used here'''
+    def __init__(self, px, py, pz, e):
+        self.p4 = (px, py, pz, e)
+
+    def Px(self):
+        return self.p4[0]
+
+    def Py(self):
+        return self.p4[1]
+
+    def Pz(self):
+        return self.p4[2]
+
+    def E(self):
+        return self.p4[3]
+
+    def __add__(self, other):
+        return ToyP4(*[x + y for x, y in zip(self.p4, other.p4)])
+
+    def M(self):
+        px, py, pz, e = self.p4
+        m2 = e * e - (px * px + py * py + pz * pz)
+        return math.sqrt(m2) if m2 >= 0 else -math.sqrt(-m2)
+
+    def Pt(self):
+        return math.sqrt(self.p4[0] * self.p4[0] + self.p4[1] * self.p4[1])
+
+
+class ToyParticle(object):
+    def __init__(self, pdgid, charge, p4):
+        self._pdgid = pdgid
+        self._charge = charge
+        self._p4 = p4
+
+    def pdgid(self):
+        return self._pdgid
+
+    def q(self):
+        return self._charge
+
+    def p4(self):
+        return self._p4
+
+
+def make_particles(nptcs, rng):
+    ptcs = []
+    for i in range(nptcs):
+        pdgid = rng.choice([11, 13])
+        charge = rng.choice([-1, 1])
+        p3 = [rng.gauss(0, 30) for j in range(3)]
+        mass = rng.choice([0.000511, 0.105, -0.01])
+        energy = math.sqrt(sum(x ** 2 for x in p3) + mass * abs(mass))
+        ptcs.append(ToyParticle(-pdgid * charge, charge, ToyP4(*(p3 + [energy]))))
+    return ptcs
+
+
+class TestCombinatorics(unittest.TestCase):
+
+    def setUp(self):
+        self.ptcs = make_particles(25, random.Random(0xdead))
+        self.p4s = combinatorics.p4_array(self.ptcs)
+
+    def test_combinations(self):
+        for n in range(6):
+            for k in range(1, 4):
+                self.assertEqual(map(tuple, combinatorics.combinations(n, k)),
+                                 list(itertools.combinations(range(n), k)))
+        self.assertEqual(combinatorics.combinations(1, 2).shape, (0, 2))
+
+    def test_masses(self):
+        '''same masses and pts as with the sums of four-momenta of each combination'''
+        for k in [2, 3]:
+            combs = combinatorics.combinations(len(self.ptcs), k)
+            sums = combinatorics.sum_p4s(self.p4s, combs)
+            expected = [reduce(lambda x, y: x + y, [self.ptcs[i].p4() for i in comb])
+                        for comb in combs]
+            self.assertEqual(list(combinatorics.masses(sums)), [p4.M() for p4 in expected])
+            self.assertEqual(list(combinatorics.pts(sums)), [p4.Pt() for p4 in expected])
+
+    def test_select(self):
+        combs = combinatorics.combinations(len(self.ptcs), 2)
+        selected = combinatorics.select(combs, self.ptcs, charge=0, same_flavour=True)
+        expected = [(i, j) for i, j in combs
+                    if self.ptcs[i].q() + self.ptcs[j].q() == 0 and
+                    abs(self.ptcs[i].pdgid()) == abs(self.ptcs[j].pdgid())]
+        self.assertTrue(expected)
+        self.assertEqual(map(tuple, selected), expected)
+        self.assertEqual(map(tuple, combinatorics.select(combs, self.ptcs)), map(tuple, combs))
+
+    def test_smallest(self):
+        '''same order as a stable sort, as done by ResonanceBuilder before'''
+        combs = combinatorics.combinations(len(self.ptcs), 2)
+        dmass = np.abs(combinatorics.masses(combinatorics.sum_p4s(self.p4s, combs)) - 91.)
+        # a few ties
+        dmass[10:20] = dmass[0]
+        expected = sorted(range(len(combs)), key=lambda index: dmass[index])
+        self.assertEqual(list(combinatorics.smallest(dmass)), expected)
+        self.assertEqual(list(combinatorics.smallest(dmass, 5)), expected[:5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,14 @@
 import unittest
+import random
 from genbrowser import GenBrowser
 
 class Particle(object):
 
-    def __init__(self, id, start, end):
+    def __init__(self, id, start, end, pdgid=0):
         self.id = id
         self.start = start
         self.end = end
+        self._pdgid = pdgid
         # self.mothers = []
         # self.daughters = []
 
@@ -16,6 +18,9 @@ class Particle(object):
     def end_vertex(self):
         return self.end
 
+    def pdgid(self):
+        return self._pdgid
+
     def __str__(self):
         return 'particle {i}: \tstart {s}, \tend {e}'.format(
             i=self.id,
@@ -72,6 +77,75 @@ class TestGenBrowser(unittest.TestCase):
         self.assertItemsEqual( browser.ancestors(ps[4]), [ps[2], ps[0], ps[5]]) 
         self.assertItemsEqual( browser.descendants(ps[0]), ps[1:5]) 
 
+    def test_diamond(self):
+        '''each ancestor and descendant is returned once'''
+        vs = map(Vertex, range(3))
+        ps = [
+            Particle(0, None, vs[0]),
+            Particle(1, vs[0], vs[1]),
+            Particle(2, vs[0], vs[1]),
+            Particle(3, vs[1], vs[2]),
+            Particle(4, vs[2], None),
+        ]
+        browser = GenBrowser(ps, vs)
+        self.assertEqual(browser.ancestors(ps[4]), [ps[3], ps[1], ps[0], ps[2]])
+        self.assertEqual(browser.descendants(ps[0]), [ps[1], ps[3], ps[4], ps[2]])
+        # memoised, but a new list is returned each time
+        ancestors = browser.ancestors(ps[4])
+        ancestors.pop()
+        self.assertEqual(len(browser.ancestors(ps[4])), 4)
+
+    def test_long_chain(self):
+        '''no recursion limit'''
+        nptcs = 5000
+        vs = map(Vertex, range(nptcs))
+        ps = [Particle(0, None, vs[0], 5)]
+        for i in range(1, nptcs):
+            ps.append(Particle(i, vs[i - 1], vs[i], 5))
+        ps.append(Particle(nptcs, vs[-1], None, 511))
+        browser = GenBrowser(ps, vs)
+        self.assertEqual(browser.ancestors(ps[-1]), ps[-2::-1])
+        self.assertEqual(browser.descendants(ps[0]), ps[1:])
+        self.assertEqual(browser.decay_daughters(ps[0]), [ps[-1]])
+        self.assertTrue(browser.has_ancestor(ps[-1], lambda ptc: ptc.pdgid() == 5))
+        self.assertFalse(browser.has_ancestor(ps[0], lambda ptc: ptc.pdgid() == 5))
+
+    def test_random_history(self):
+        '''same results as a naive recursive walk of the history'''
+        rng = random.Random(0xdead)
+        vs = map(Vertex, range(100))
+        ps = []
+        for i in range(300):
+            start = rng.randrange(-10, 100)
+            end = rng.randrange(max(start + 1, 0), 110)
+            ps.append(Particle(i,
+                               vs[start] if start >= 0 else None,
+                               vs[end] if end < 100 else None,
+                               rng.choice([1, 2, 5, 511, 211])))
+        browser = GenBrowser(ps, vs)
+
+        def naive_ancestors(ptc):
+            result = set()
+            for mother in ptc.mothers:
+                result.add(mother)
+                result |= naive_ancestors(mother)
+            return result
+
+        def is_b(ptc):
+            return ptc.pdgid() in [5, 511]
+
+        from_b = browser.descends_from(is_b)
+        self.assertTrue(browser.descends_from(is_b) is from_b)
+        self.assertTrue(any(from_b) and not all(from_b))
+        for ptc, flag in zip(ps, from_b):
+            ancestors = browser.ancestors(ptc)
+            self.assertEqual(len(ancestors), len(set(ancestors)))
+            self.assertEqual(set(ancestors), naive_ancestors(ptc))
+            self.assertEqual(flag, any(is_b(ancestor) for ancestor in ancestors))
+            self.assertEqual(browser.has_ancestor(ptc, is_b), flag)
+            for ancestor in ancestors:
+                self.assertIn(ptc, browser.descendants(ancestor))
+
 
 
 if __name__ == '__main__':
@@ -1,6 +1,7 @@
 import unittest
 import math
 import copy
+import random
 
 import heppy.framework.context as context
 if context.name != 'bare':
@@ -50,6 +51,40 @@ class TestIsolation(unittest.TestCase):
         iso = computer.compute(lepton, [ptc])
         self.assertEqual(iso.sumpt, 0.)
 
+    def test_groups(self):
+        '''Test that compute_groups gives the same results as compute for each group'''
+        rng = random.Random(1)
+        particles = []
+        for i in range(500):
+            p4 = TLorentzVector()
+            p4.SetPtEtaPhiM(rng.uniform(0.1, 10), rng.uniform(-3, 3),
+                            rng.uniform(-math.pi, math.pi), 0.)
+            particles.append(Particle(rng.choice([211, 22, 130]), 0, p4))
+        computer = IsolationComputer([EtaPhiCircle(0.4), EtaPhiCircle(0.5)],
+                                     [EtaPhiCircle(0.05)],
+                                     pt_thresh=1, e_thresh=2)
+        index = IsolationIndex(particles, group=lambda ptc: ptc.pdgid())
+        labels = {211: 'ch', 22: 'ph'}
+        nparticles = 0
+        for lepton in particles[:50]:
+            isos = computer.compute_groups(lepton, index, labels)
+            self.assertEqual(sorted(isos.keys()), [22, 211])
+            for pdgid, label in labels.iteritems():
+                sel_ptcs = [ptc for ptc in particles if ptc.pdgid() == pdgid]
+                computer.label = label
+                iso = computer.compute(lepton, sel_ptcs)
+                # loop on all particles
+                computer.vectorised = False
+                iso_loop = computer.compute(lepton, sel_ptcs)
+                computer.vectorised = True
+                self.assertEqual(iso_loop.particles, iso.particles)
+                self.assertEqual(isos[pdgid].particles, iso.particles)
+                self.assertEqual(isos[pdgid].sumpt, iso.sumpt)
+                self.assertEqual(isos[pdgid].label, label)
+                self.assertTrue(lepton not in iso.particles)
+                nparticles += iso.num
+        self.assertTrue(nparticles > 0)
+
         
 if __name__ == '__main__':
     unittest.main()
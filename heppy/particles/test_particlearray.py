@@ -0,0 +1,98 @@
+import unittest
+import math
+import random
+import numpy as np
+
+from heppy.particles.particlearray import ParticleArray
+from heppy.configuration import Collider
+
+import heppy.framework.context as context
+if context.name != 'bare':
+    from ROOT import TLorentzVector
+    from heppy.particles.tlv.particle import Particle
+
+
+def make_array(nptcs, seed=1):
+    rng = random.Random(seed)
+    px, py, pz, e, pdgid, charge = [], [], [], [], [], []
+    for i in range(nptcs):
+        px.append(rng.uniform(-10, 10))
+        py.append(rng.uniform(-10, 10))
+        pz.append(rng.uniform(-20, 20))
+        mass = rng.choice([0., 0.14, 0.5])
+        e.append(math.sqrt(px[-1]**2 + py[-1]**2 + pz[-1]**2 + mass**2))
+        pdgid.append(rng.choice([22, 211, -211, 130]))
+        charge.append(int(math.copysign(1, pdgid[-1])) if abs(pdgid[-1]) == 211 else 0)
+    return ParticleArray(px, py, pz, e, pdgid, charge)
+
+
+class TestParticleArray(unittest.TestCase):
+
+    def setUp(self):
+        self.ptcs = make_array(100)
+        self.beams = Collider.BEAMS
+
+    def tearDown(self):
+        Collider.BEAMS = self.beams
+
+    def test_selection(self):
+        ptcs = self.ptcs
+        photons = ptcs[ptcs.pdgid() == 22]
+        self.assertTrue(0 < len(photons) < len(ptcs))
+        self.assertTrue(np.all(photons.pdgid() == 22))
+        self.assertTrue(np.all(photons.q() == 0))
+        first = ptcs[:10]
+        self.assertEqual(len(first), 10)
+        self.assertEqual(list(first.px()), list(ptcs.px()[:10]))
+        self.assertEqual(len(ptcs.select([False] * len(ptcs))), 0)
+        self.assertRaises(IndexError, ptcs.__getitem__, len(ptcs))
+
+    def test_kinematics(self):
+        ptcs = self.ptcs
+        for i in range(len(ptcs)):
+            px, py, pz = ptcs.px()[i], ptcs.py()[i], ptcs.pz()[i]
+            pt = math.sqrt(px**2 + py**2)
+            self.assertAlmostEqual(ptcs.pt()[i], pt)
+            self.assertAlmostEqual(ptcs.phi()[i], math.atan2(py, px))
+            self.assertAlmostEqual(ptcs.theta()[i], math.pi/2 - math.atan2(pt, pz))
+            self.assertAlmostEqual(ptcs.eta()[i], math.asinh(pz/pt))
+        along_z = ParticleArray([0, 0], [0, 0], [1, -1], [1, 1], [22, 22], [0, 0])
+        self.assertEqual(list(along_z.eta()), [float('inf'), -float('inf')])
+
+    def test_sort_concatenate(self):
+        Collider.BEAMS = 'ee'
+        both = ParticleArray.concatenate([self.ptcs[:50], self.ptcs[50:]])
+        self.assertEqual(list(both.e()), list(self.ptcs.e()))
+        ordered = both.sorted()
+        self.assertEqual(list(ordered.e()), sorted(self.ptcs.e(), reverse=True))
+        Collider.BEAMS = 'pp'
+        ordered = both.sorted()
+        self.assertEqual(list(ordered.pt()), sorted(self.ptcs.pt(), reverse=True))
+
+
+@unittest.skipIf(context.name=='bare', 'ROOT not available')
+class TestParticleArrayROOT(unittest.TestCase):
+
+    def test_particles(self):
+        '''Test that the particle views agree with the arrays and the P4 interface'''
+        ptcs = make_array(100)
+        for i, ptc in enumerate(ptcs):
+            self.assertTrue(ptc is ptcs[i])
+            self.assertEqual(ptc.pdgid(), ptcs.pdgid()[i])
+            self.assertEqual(ptc.q(), ptcs.q()[i])
+            for name in ['e', 'pt', 'theta', 'eta', 'phi', 'm']:
+                self.assertAlmostEqual(getattr(ptc, name)(), getattr(ptcs, name)()[i])
+
+    def test_from_particles(self):
+        particles = []
+        for i in range(10):
+            tlv = TLorentzVector()
+            tlv.SetPtEtaPhiM(i + 1, 0.1 * i, 0.2 * i, 0.)
+            particles.append(Particle(22, 0, tlv))
+        ptcs = ParticleArray.from_particles(particles)
+        selected = ptcs[ptcs.pt() > 5]
+        self.assertEqual(list(selected), particles[5:])
+
+
+if __name__ == '__main__':
+    unittest.main()
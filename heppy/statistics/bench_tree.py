@@ -0,0 +1,110 @@
+'''Benchmark of the per-event cost of filling a Tree and a BufferedTree.
+
+Usage:
+    python bench_tree.py [nevents]
+
+Two trees are filled for each tree class:
+ - a flat tree with 40 float branches, filled with precomputed values.
+   The cost with the branch names formatted at each event, as done by
+   the ntuple functions before, is given for comparison;
+ - a tree booked with ntuple.bookZed and filled with ntuple.fillZed.
+   In this case, the cost includes the computation of the Z variables.
+The trees are not written to a file.
+'''
+import sys
+import timeit
+from ROOT import TLorentzVector, TFile
+
+from heppy.statistics.tree import Tree, BufferedTree
+from heppy.particles.tlv.particle import Particle
+from heppy.particles.tlv.resonance import Resonance2
+from heppy.analyzers.ntuple import bookZed, fillZed, iso_names
+
+NVARS = 40
+
+
+class Iso(object):
+    def __init__(self, sume, sumpt, num):
+        self.sume = sume
+        self.sumpt = sumpt
+        self.num = num
+
+
+def make_zed():
+    '''Returns a toy Z->mumu resonance with isolation information on its legs'''
+    legs = []
+    for px, charge in [(30., 1), (-35., -1)]:
+        tlv = TLorentzVector()
+        tlv.SetXYZM(px, 10., 5. * charge, 0.105)
+        leg = Particle(13 * charge, charge, tlv)
+        for isoname in iso_names:
+            setattr(leg, isoname, Iso(1., 0.8, 2))
+        legs.append(leg)
+    return Resonance2(legs[0], legs[1], 23)
+
+
+def make_tree(tree_class):
+    if tree_class is BufferedTree:
+        return BufferedTree('events', '', bufferSize=1000)
+    return Tree('events', '')
+
+
+def fill_flat(tree_class, nevents, format_names):
+    tree = make_tree(tree_class)
+    names = ['x{}'.format(i) for i in range(NVARS)]
+    for name in names:
+        tree.var(name)
+    values = [float(i) for i in range(NVARS)]
+    start = timeit.default_timer()
+    for event in xrange(nevents):
+        tree.reset()
+        if format_names:
+            for i, value in enumerate(values):
+                tree.fill('{pName}{i}'.format(pName='x', i=i), value)
+        else:
+            for name, value in zip(names, values):
+                tree.fill(name, value)
+        tree.fillTree()
+    tree.flush()
+    return timeit.default_timer() - start
+
+
+def fill_zed(tree_class, nevents):
+    tree = make_tree(tree_class)
+    bookZed(tree, 'zed')
+    zed = make_zed()
+    start = timeit.default_timer()
+    for event in xrange(nevents):
+        tree.reset()
+        fillZed(tree, 'zed', zed)
+        tree.fillTree()
+    tree.flush()
+    return timeit.default_timer() - start, len(tree.vars)
+
+
+def main(nevents):
+    rootfile = TFile('bench_tree.root', 'recreate')
+    print 'per-event fill cost in microseconds, {} events'.format(nevents)
+    print '{:>40} {:>10} {:>14}'.format('', 'Tree', 'BufferedTree')
+    times = [fill_flat(tree_class, nevents, True)
+             for tree_class in [Tree, BufferedTree]]
+    print '{:>40} {:>10.1f} {:>14.1f}'.format(
+        '{} branches, formatted names'.format(NVARS),
+        *[time / nevents * 1e6 for time in times])
+    times = [fill_flat(tree_class, nevents, False)
+             for tree_class in [Tree, BufferedTree]]
+    print '{:>40} {:>10.1f} {:>14.1f}'.format(
+        '{} branches'.format(NVARS),
+        *[time / nevents * 1e6 for time in times])
+    results = [fill_zed(tree_class, nevents) for tree_class in [Tree, BufferedTree]]
+    print '{:>40} {:>10.1f} {:>14.1f}'.format(
+        'fillZed, {} branches'.format(results[0][1]),
+        *[time / nevents * 1e6 for time, nbranches in results])
+    rootfile.Close()
+
+
+if __name__ == '__main__':
+    nevents = 10000
+    if len(sys.argv) > 1:
+        nevents = int(sys.argv[1])
+    main(nevents)
@@ -0,0 +1,55 @@
+'''Independent random streams, identified by a key.
+
+The state of the generator of a stream is derived from a hash of its key,
+e.g. (seed, input file name, entry in the file, analyzer name),
+so that the random numbers drawn for a given event by a given analyzer
+do not depend on the other events processed before, and thus do not
+depend on the way the events are split into chunks and worker processes.
+See heppy.framework.services.randomstreams.RandomStreamService.
+
+Example::
+
+    stream = RandomStream(0, 'ZH', 1234, 'papas')
+    x = stream.gauss(0, 1)
+    xs = stream.gauss(0, 1, size=100) # numpy array
+'''
+
+import hashlib
+import struct
+import numpy as np
+
+
+def stream_seed(key):
+    '''Returns the seed of the stream with key, a sequence of strings or integers,
+    as a list of 8 32-bit integers.'''
+    digest = hashlib.sha256('\0'.join(str(item) for item in key)).digest()
+    return list(struct.unpack('>8I', digest))
+
+
+class RandomStream(object):
+    '''Random stream, with the scalar interface of heppy.statistics.rrandom.
+
+    The generator is only created at the first draw.
+    Each method takes an optional size argument: if given,
+    a numpy array of size random numbers is returned.
+    '''
+
+    def __init__(self, *key):
+        self.key = key
+        self._generator = None
+
+    @property
+    def generator(self):
+        '''the numpy RandomState of the stream'''
+        if self._generator is None:
+            self._generator = np.random.RandomState(stream_seed(self.key))
+        return self._generator
+
+    def uniform(self, a, b, size=None):
+        return self.generator.uniform(a, b, size)
+
+    def gauss(self, mu, sigma, size=None):
+        return self.generator.normal(mu, np.abs(sigma), size)
+
+    def expovariate(self, lambd, size=None):
+        return self.generator.exponential(1. / lambd, size)
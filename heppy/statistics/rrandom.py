@@ -1,10 +1,63 @@
+'''Random numbers for heppy.
+
+By default, the random numbers are drawn from a single global generator,
+ROOT's TRandom if ROOT is available, and python's random module otherwise.
+
+If a stream is set with set_stream, e.g. by the RandomStreamService,
+uniform, gauss and expovariate draw from this stream instead, 
+see heppy.statistics.randomstreams.
+
+uniform, gauss and expovariate take an optional size argument:
+if given, a numpy array of size random numbers is returned.
+'''
+
 #todo make depend on Heppy Configuration
 from heppy.framework.context import name
 
 if name == 'bare': # ROOT not here
     from random import *
+    import random as _backend
 else: # ROOT here in cms and fcc contexts
     from random_root import *
+    import random_root as _backend
 
 # not used:
 #from random_cpplib import *
+
+import numpy as np
+
+_stream = None
+
+def set_stream(stream):
+    '''Sets the stream used to draw the random numbers,
+    or the global generator if stream is None. Returns the previous stream.'''
+    global _stream
+    previous = _stream
+    _stream = stream
+    return previous
+
+def get_stream():
+    '''Returns the current stream, None for the global generator'''
+    return _stream
+
+def uniform(a, b, size=None):
+    if _stream is not None:
+        return _stream.uniform(a, b, size)
+    if size is None:
+        return _backend.uniform(a, b)
+    return np.array([_backend.uniform(a, b) for i in xrange(np.prod(size))]).reshape(size)
+
+def gauss(mu, sigma, size=None):
+    if _stream is not None:
+        return _stream.gauss(mu, sigma, size)
+    if size is None:
+        return _backend.gauss(mu, sigma)
+    mu, sigma = np.broadcast_arrays(mu, sigma, np.empty(size))[:2]
+    return np.array([_backend.gauss(m, s) for m, s in zip(mu.flat, sigma.flat)]).reshape(size)
+
+def expovariate(lambd, size=None):
+    if _stream is not None:
+        return _stream.expovariate(lambd, size)
+    if size is None:
+        return _backend.expovariate(lambd)
+    return np.array([_backend.expovariate(lambd) for i in xrange(np.prod(size))]).reshape(size)
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+
+import rrandom as random
+from randomstreams import RandomStream
+
+
+class TestRandomStreams(unittest.TestCase):
+
+    def tearDown(self):
+        random.set_stream(None)
+
+    def test_stream(self):
+        draws = [RandomStream(0, 'comp', 12, 'ana').gauss(0, 1, size=5)
+                 for i in range(2)]
+        self.assertTrue(np.array_equal(draws[0], draws[1]))
+        for key in [(1, 'comp', 12, 'ana'), (0, 'comp', 13, 'ana'),
+                    (0, 'comp', 12, 'other')]:
+            self.assertFalse(np.array_equal(draws[0],
+                                            RandomStream(*key).gauss(0, 1, size=5)))
+        # integers and longs give the same stream
+        self.assertEqual(RandomStream(0, 12L).uniform(0, 1),
+                         RandomStream(0, 12).uniform(0, 1))
+
+    def test_rrandom(self):
+        for stream in [None, RandomStream(0)]:
+            random.set_stream(stream)
+            self.assertTrue(isinstance(random.uniform(0, 1), float))
+            self.assertTrue(isinstance(random.gauss(0, 1), float))
+            self.assertTrue(isinstance(random.expovariate(2.), float))
+            self.assertEqual(random.uniform(0, 1, size=10).shape, (10,))
+            self.assertEqual(random.expovariate(2., size=3).shape, (3,))
+            gauss = random.gauss(1, [0, 0, 0.1], size=(2, 3))
+            self.assertEqual(gauss.shape, (2, 3))
+            self.assertTrue(np.all(gauss[:, :2] == 1))
+        random.set_stream(RandomStream(0, 'a'))
+        first = random.uniform(0, 1)
+        self.assertEqual(random.set_stream(RandomStream(0, 'a')).key, (0, 'a'))
+        self.assertEqual(random.uniform(0, 1), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import heppy.framework.context as context
 if context.name != 'bare':
     from ROOT import TFile
-    from tree import Tree
+    from tree import Tree, BufferedTree
 
 @unittest.skipIf(context.name=='bare', 'ROOT not available')
 class TreeTestCase(unittest.TestCase):
@@ -47,7 +47,52 @@ class TreeTestCase(unittest.TestCase):
         tr.tree.Fill()        
         fi.Write()
         fi.Close()
-        
+
+    def fill_trees(self, tree_class, **kwargs):
+        tr = tree_class('test_tree', 'A test tree', **kwargs)
+        tr.var('a')
+        tr.var('b', default=-1)
+        tr.var('nvals', the_type=int)
+        tr.vector('x', 'nvals', 20)
+        for i in range(10):
+            if i % 3 == 0:
+                tr.reset()
+            tr.fill('a', i)
+            if i % 2 == 0:
+                # b kept from the previous entry otherwise
+                tr.fill('b', 2*i)
+            tr.fill('nvals', i)
+            if i % 2 == 0:
+                tr.vfill('x', range(i))
+            else:
+                tr.vfill('x', (j for j in range(i)))
+            tr.fillTree()
+        tr.flush()
+
+    def test_buffered(self):
+        fi = TFile('tree3.root','RECREATE')
+        self.fill_trees(Tree)
+        fi.Write()
+        fi.Close()
+        fi = TFile('tree4.root','RECREATE')
+        self.fill_trees(BufferedTree, bufferSize=4)
+        fi.Write()
+        fi.Close()
+        fi = TFile('tree3.root')
+        fi2 = TFile('tree4.root')
+        tr = fi.Get('test_tree')
+        tr2 = fi2.Get('test_tree')
+        self.assertEqual(tr.GetEntries(), 10)
+        self.assertEqual(tr2.GetEntries(), 10)
+        for i in range(10):
+            tr.GetEntry(i)
+            tr2.GetEntry(i)
+            self.assertEqual(tr2.a, i)
+            for name in ['a', 'b', 'nvals']:
+                self.assertEqual(getattr(tr, name), getattr(tr2, name))
+            self.assertEqual([tr.x[j] for j in range(tr.nvals)],
+                             [tr2.x[j] for j in range(tr2.nvals)])
+
 
 if __name__ == '__main__':
     unittest.main()
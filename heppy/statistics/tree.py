@@ -2,6 +2,13 @@ import numpy
 from ROOT import TTree
 import ROOT
 
+
+def _sequence(values):
+    '''values as a sequence, e.g. for a generator'''
+    if not hasattr(values, '__len__'):
+        values = list(values)
+    return values
+
 class Tree(object):
     
     def __init__(self, name, title, defaultFloatType="D", defaultIntType="I"):
@@ -123,12 +130,148 @@ class Tree(object):
 
     def vfill(self, varName, values ):
         a = self.vecvars[varName]
+        values = _sequence(values)
         if isinstance(a, numpy.ndarray):
-            for (i,v) in enumerate(values):
-                a[i]=v
+            values = numpy.asarray(values)
+            a[:len(values)] = values
         else:
             if isinstance(a, ROOT.TObject) and a.ClassName() == "TClonesArray":
                 a.ExpandCreateFast(len(values))
             fillit = self.fillers[varName]
             for (i,v) in enumerate(values):
                 fillit(a[i],v)
+
+    def fillTree(self):
+        '''Fills the tree with the current values of the branches.'''
+        self.tree.Fill()
+
+    def flush(self):
+        '''Writes the pending entries to the tree. Nothing to do for a Tree.'''
+        pass
+
+
+class BufferedTree(Tree):
+    '''Tree keeping the values of bufferSize entries in numpy columns,
+    and filling the TTree only when the buffer is full or when flush is called.
+
+    The var, vector, fill, vfill and reset API is the one of Tree.
+    Instead of calling tree.Fill() for each entry, call fillTree(), and
+    call flush() before writing the TTree to its file.
+
+    The scalar branches of the same storage type are stored in a single
+    (bufferSize, nvars) block, and each variable is a column view of this block.
+    The TTree branches are bound to a single row buffer per storage type,
+    so that only one copy per storage type and per vector branch is needed
+    for each entry at flush time.
+    As for Tree, the values that are not filled nor reset are kept
+    from one entry to the next.
+
+    Object branches (e.g. TLorentzVector) are not supported.
+    '''
+
+    def __init__(self, name, title, bufferSize=1000,
+                 defaultFloatType="D", defaultIntType="I"):
+        super(BufferedTree, self).__init__(name, title,
+                                           defaultFloatType, defaultIntType)
+        self.bufferSize = bufferSize
+        self.row = 0
+        # storage dtype -> (bufferSize, nvars) block
+        self.blocks = {}
+        # storage dtype -> names of the variables in the block
+        self.blockvars = {}
+        # storage dtype -> row buffer bound to the TTree branches
+        self.rowbuffers = {}
+        # variable name -> column view of its block
+        self.columns = {}
+        # vector name -> (bufferSize, length) block
+        self.veccolumns = {}
+        # storage dtype -> row of default values, built at the first reset
+        self.defaultrows = None
+
+    def branch_(self, selfmap, varName, the_type, length,
+                postfix="", storageType="default", title=None):
+        super(BufferedTree, self).branch_(selfmap, varName, the_type, length,
+                                          postfix, storageType, title)
+        if selfmap is self.vecvars:
+            self.veccolumns[varName] = numpy.zeros((self.bufferSize, length),
+                                                   selfmap[varName].dtype)
+            return
+        dtype = selfmap[varName].dtype
+        self.defaultrows = None
+        names = self.blockvars.setdefault(dtype, [])
+        names.append(varName)
+        # growing the block: only done at booking time
+        block = numpy.zeros((self.bufferSize, len(names)), dtype)
+        rowbuffer = numpy.zeros(len(names), dtype)
+        if dtype in self.blocks:
+            block[:, :-1] = self.blocks[dtype]
+            rowbuffer[:-1] = self.rowbuffers[dtype]
+        self.blocks[dtype] = block
+        self.rowbuffers[dtype] = rowbuffer
+        for index, name in enumerate(names):
+            self.columns[name] = block[:, index]
+            self.vars[name] = rowbuffer[index:index+1]
+            self.tree.SetBranchAddress(name, self.vars[name])
+
+    def var(self, varName, the_type=float, default=-99, title=None,
+            storageType="default", filler=None ):
+        if the_type not in [int, float]:
+            raise RuntimeError('Object branch %s not supported by BufferedTree' % varName)
+        super(BufferedTree, self).var(varName, the_type, default, title, storageType)
+
+    def vector(self, varName, lenvar, maxlen=None, the_type=float, default=-99,
+               title=None, storageType="default", filler=None ):
+        if the_type not in [int, float]:
+            raise RuntimeError('Object branch %s not supported by BufferedTree' % varName)
+        super(BufferedTree, self).vector(varName, lenvar, maxlen, the_type,
+                                         default, title, storageType)
+
+    def reset(self):
+        if self.defaultrows is None:
+            self.defaultrows = dict(
+                (dtype, numpy.array([self.defaults[name] for name in names], dtype))
+                for dtype, names in self.blockvars.iteritems()
+            )
+        row = self.row
+        for dtype, block in self.blocks.iteritems():
+            block[row] = self.defaultrows[dtype]
+        for name, block in self.veccolumns.iteritems():
+            block[row] = self.vecdefaults[name]
+
+    def fill(self, varName, value ):
+        self.columns[varName][self.row] = value
+
+    def vfill(self, varName, values ):
+        values = numpy.asarray(_sequence(values))
+        self.veccolumns[varName][self.row, :len(values)] = values
+
+    def fillTree(self):
+        '''Closes the current entry. The buffer is flushed when full.'''
+        self.row += 1
+        if self.row == self.bufferSize:
+            self.flush()
+            return
+        # values not filled nor reset are kept for the next entry
+        row = self.row
+        for block in self.blocks.itervalues():
+            block[row] = block[row-1]
+        for block in self.veccolumns.itervalues():
+            block[row] = block[row-1]
+
+    def flush(self):
+        '''Fills the TTree with the closed entries of the buffer.'''
+        rowbuffers = [(self.rowbuffers[dtype], block)
+                      for dtype, block in self.blocks.iteritems()]
+        rowbuffers.extend((self.vecvars[name], block)
+                          for name, block in self.veccolumns.iteritems())
+        fill = self.tree.Fill
+        for row in range(self.row):
+            for rowbuffer, block in rowbuffers:
+                rowbuffer[:] = block[row]
+            fill()
+        # the entry being filled, or the last one if the buffer is full,
+        # becomes the first entry of the buffer
+        current = min(self.row, self.bufferSize - 1)
+        for rowbuffer, block in rowbuffers:
+            block[0] = block[current]
+        self.row = 0
@@ -3,12 +3,36 @@ import shutil
 import tempfile
 import os
 import copy
+import json
+import heppy.framework.config as cfg
 from heppy.framework.looper import Looper
+from heppy.framework.analyzer import Analyzer
+import numpy
 from text_example_cfg import config
 
 import logging
 logging.getLogger().setLevel(logging.ERROR)
 
+class DrawAnalyzer(Analyzer):
+    '''writes the first random number drawn by each process in cfg_ana.draws_dir.
+    numpy's generator is used: like ROOT's, and unlike python's,
+    it is not reseeded by multiprocessing in the forked processes.'''
+
+    def process(self, event):
+        fname = '/'.join([self.cfg_ana.draws_dir, str(os.getpid())])
+        if not os.path.isfile(fname):
+            with open(fname, 'w') as out:
+                out.write(repr(numpy.random.uniform(0, 1)))
+
+
+class FailingAnalyzer(Analyzer):
+    '''raises an exception at event cfg_ana.fail_at'''
+
+    def process(self, event):
+        if event.iEv == self.cfg_ana.fail_at:
+            raise ValueError('failing at event {}'.format(event.iEv))
+
+
 class TestSimpleExample(unittest.TestCase):
 
     def setUp(self):
@@ -34,6 +58,157 @@ class TestSimpleExample(unittest.TestCase):
                        nPrint=0 )
         loop.loop()    
 
+    def test_parallel(self):
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       nWorkers=3 )
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, 100)
+        self.assertEqual(loop.analyzer_counter[0][1], 100)
+        self.assertEqual(loop.timeReport[0]['events'], 100)
+        self.assertEqual(loop.workerDirs,
+                         ['/'.join([self.outdir, 'Worker_{}'.format(i)]) for i in range(3)])
+        for dirname in loop.workerDirs:
+            self.assertFalse(os.path.exists(dirname))
+
+    def test_parallel_random(self):
+        '''without random streams, the workers draw different random numbers'''
+        draws_dir = '/'.join([self.outdir, 'draws'])
+        os.mkdir(draws_dir)
+        random_config = copy.copy(config)
+        random_config.sequence = cfg.Sequence(config.sequence + [
+            cfg.Analyzer(DrawAnalyzer, draws_dir=draws_dir)])
+        loop = Looper( '/'.join([self.outdir, 'loop']), random_config,
+                       nEvents=None,
+                       nPrint=0,
+                       nWorkers=3 )
+        loop.loop()
+        loop.write()
+        draws = set()
+        for fname in os.listdir(draws_dir):
+            with open('/'.join([draws_dir, fname])) as infile:
+                draws.add(infile.read())
+        self.assertEqual(len(draws), 3)
+
+    def test_profile(self):
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       nWorkers=2,
+                       cprofile=True )
+        loop.loop()
+        loop.write()
+        with open('/'.join([self.outdir, 'profile.json'])) as infile:
+            summary = json.load(infile)['analyzers'][0]
+        self.assertEqual(summary['events'], 100)
+        self.assertTrue(summary['functions'])
+        self.assertTrue(os.path.isfile('/'.join([self.outdir, 'profile.folded'])))
+
+    def test_prefetch(self):
+        loop = Looper( self.outdir, config,
+                       nEvents=None,
+                       nPrint=0,
+                       prefetch=10 )
+        loop.loop()
+        self.assertEqual(loop.nEvProcessed, 100)
+        self.assertEqual(loop.event.input.x1, 99)
+
+    def test_prefetch_error(self):
+        '''the prefetching process is stopped if an analyzer raises an exception'''
+        import multiprocessing
+        failing_config = copy.copy(config)
+        failing_config.sequence = cfg.Sequence(config.sequence + [
+            cfg.Analyzer(FailingAnalyzer, fail_at=5)])
+        loop = Looper( self.outdir, failing_config,
+                       nEvents=None,
+                       nPrint=0,
+                       prefetch=10 )
+        self.assertRaises(ValueError, loop.loop)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_event_range(self):
+        '''chunk made by config.split_events'''
+        chunk_config = copy.copy(config)
+        chunk = copy.copy(config.components[0])
+        chunk.eventRange = (10, 20)
+        chunk_config.components = [chunk]
+        loop = Looper( self.outdir, chunk_config,
+                       nEvents=None,
+                       nPrint=0 )
+        loop.loop()
+        self.assertEqual(loop.nEvProcessed, 20)
+        self.assertEqual(loop.event.input.x1, 29)
+        # last events, processed by worker processes
+        chunk.eventRange = (80, 20)
+        loop = Looper( self.outdir + '_parallel', chunk_config,
+                       nEvents=None,
+                       nPrint=0,
+                       nWorkers=2 )
+        loop.loop()
+        loop.write()
+        self.assertEqual(loop.nEvProcessed, 20)
+        shutil.rmtree(self.outdir + '_parallel')
+
+    def test_schedule(self):
+        from heppy.analyzers.Selector import Selector
+        unused = cfg.Analyzer(
+            Selector,
+            input_objects = 'missing_collection',
+            output = 'unused',
+            filter_func = lambda x: True
+        )
+        scheduled_config = copy.copy(config)
+        scheduled_config.sequence = cfg.Sequence(config.sequence + [unused])
+        loop = Looper( self.outdir, scheduled_config,
+                       nEvents=None,
+                       nPrint=0,
+                       schedule=True )
+        loop.loop()
+        self.assertEqual(loop.nEvProcessed, 100)
+        self.assertEqual(len(loop.analyzer_counter), 1)
+
+    def test_file_index_unsupported(self):
+        '''the text backend cannot use a file index'''
+        index_config = copy.copy(config)
+        comp = copy.copy(config.components[0])
+        comp.file_index = '/'.join([self.outdir, 'index.json'])
+        index_config.components = [comp]
+        with self.assertRaises(ValueError) as context:
+            Looper( self.outdir, index_config,
+                    nEvents=None,
+                    nPrint=0 )
+        self.assertTrue('eventstext' in str(context.exception))
+
+    def test_random_streams(self):
+        '''the random numbers of an event do not depend on the other events processed'''
+        from heppy.analyzers.examples.simple.RandomAnalyzer import RandomAnalyzer
+        from heppy.framework.services.randomstreams import RandomStreamService
+        random_config = copy.copy(config)
+        random_config.sequence = cfg.Sequence(config.sequence +
+                                              [cfg.Analyzer(RandomAnalyzer)])
+        random_config.services = [cfg.Service(RandomStreamService, 'random', seed=1)]
+        def draw(outdir, comp, events):
+            random_config.components = [comp]
+            loop = Looper(outdir, random_config, nPrint=0)
+            values = dict()
+            for iEv in events:
+                loop.process(iEv)
+                values[iEv] = loop.event.var_random
+            loop.write()
+            return values
+        comp = config.components[0]
+        values = draw(self.outdir, comp, [10, 60])
+        self.assertEqual(draw(self.outdir + '_1', comp, [60, 10]), values)
+        self.assertNotEqual(values[10], values[60])
+        # same numbers for the same entry of the same input file in a chunk
+        chunk = copy.copy(comp)
+        chunk.name = comp.name + '_Chunk1'
+        self.assertEqual(draw(self.outdir + '_2', chunk, [60])[60], values[60])
+        for suffix in ['_1', '_2']:
+            shutil.rmtree(self.outdir + suffix)
+
     def test_process_event(self):
         loop = Looper( self.outdir, config,
                        nEvents=None,
@@ -0,0 +1,72 @@
+'''Benchmark of the delta R matching functions of heppy.utils.deltar
+and of their vectorised versions in heppy.utils.deltarmatrix.
+
+Usage:
+    python bench_deltar.py [nobjects ...]
+
+For each number of objects, two collections of nobjects toy particles
+are matched, and the time per call is printed in milliseconds.
+'''
+import sys
+import math
+import random
+import timeit
+
+import heppy.utils.deltar as deltar
+import heppy.utils.deltarmatrix as deltarmatrix
+
+
+class ToyParticle(object):
+    '''Object with the eta, theta and phi methods needed by the matching functions'''
+    def __init__(self, eta, phi):
+        self._eta = eta
+        self._phi = phi
+        self._theta = math.pi / 2. - 2 * math.atan(math.exp(-eta))
+
+    def eta(self):
+        return self._eta
+
+    def theta(self):
+        return self._theta
+
+    def phi(self):
+        return self._phi
+
+
+def make_particles(nobjects, rng):
+    return [ToyParticle(rng.uniform(-2.5, 2.5), rng.uniform(-math.pi, math.pi))
+            for i in range(nobjects)]
+
+
+def timing(func, args, nobjects):
+    number = max(1, 10000 / nobjects**2)
+    return timeit.timeit(lambda: func(*args), number=number) / number * 1e3
+
+
+def main(sizes):
+    rng = random.Random(0xdead)
+    functions = ['matchObjectCollection', 'matchObjectCollection2',
+                 'matchObjectCollection3', 'cleanObjectCollection']
+    print '{:>8} {:>24} {:>12} {:>12} {:>8}'.format(
+        'objects', 'function', 'deltar(ms)', 'matrix(ms)', 'speedup')
+    for size in sizes:
+        ptcs = make_particles(size, rng)
+        matches = make_particles(size, rng)
+        for name in functions:
+            args = (ptcs, matches, 0.3)
+            slow = timing(getattr(deltar, name), args, size)
+            fast = timing(getattr(deltarmatrix, name), args, size)
+            print '{:>8} {:>24} {:>12.3f} {:>12.3f} {:>8.1f}'.format(
+                size, name, slow, fast, slow / fast)
+        pivot = ptcs[0]
+        slow = timing(deltar.inConeCollection, (pivot, matches), size)
+        fast = timing(deltarmatrix.inConeCollection, (pivot, matches), size)
+        print '{:>8} {:>24} {:>12.3f} {:>12.3f} {:>8.1f}'.format(
+            size, 'inConeCollection', slow, fast, slow / fast)
+
+
+if __name__ == '__main__':
+    sizes = [10, 100, 1000]
+    if len(sys.argv) > 1:
+        sizes = map(int, sys.argv[1:])
+    main(sizes)
@@ -0,0 +1,145 @@
+'''Benchmark of the numpy jet clustering of heppy.utils.jetclustering,
+and comparison with the compiled fastjet-based JetClusterizer if available.
+
+Usage:
+    python bench_jetclustering.py [nparticles ...]
+
+For each number of particles, toy events are clustered with the ee_kt
+algorithm into 2 jets, with the ee_genkt algorithm (R=0.4, p=-1, emin=5)
+and with the anti-kt algorithm (R=0.4, ptmin=5),
+and the time per event is printed in milliseconds.
+
+The compiled JetClusterizer is loaded as in heppy.analyzers.fcc.JetClusterizer,
+if the FCCPHYSICS or CMSSW_BASE environment variable is set.
+The largest difference between the jet four-momenta of the two implementations
+is then printed as well.
+'''
+import os
+import sys
+import math
+import random
+import timeit
+
+from heppy.utils.jetclustering import JetClusterizer
+
+
+class ToyP4(object):
+    '''Object with the Px, Py, Pz and E methods of a TLorentzVector'''
+    def __init__(self, px, py, pz, e):
+        self.p4 = (px, py, pz, e)
+
+    def Px(self):
+        return self.p4[0]
+
+    def Py(self):
+        return self.p4[1]
+
+    def Pz(self):
+        return self.p4[2]
+
+    def E(self):
+        return self.p4[3]
+
+
+def make_event(nparticles, rng):
+    '''Returns the four-momenta of nparticles massless particles,
+    in two back-to-back cones.'''
+    p4s = []
+    axis_theta = rng.uniform(0.5, math.pi - 0.5)
+    axis_phi = rng.uniform(-math.pi, math.pi)
+    for i in range(nparticles):
+        sign = 1 if i % 2 else -1
+        theta = axis_theta + rng.gauss(0, 0.3)
+        phi = axis_phi + rng.gauss(0, 0.3)
+        energy = rng.expovariate(1 / 5.)
+        p4s.append(ToyP4(sign * energy * math.sin(theta) * math.cos(phi),
+                         sign * energy * math.sin(theta) * math.sin(phi),
+                         sign * energy * math.cos(theta),
+                         energy))
+    return p4s
+
+
+def compiled_clusterizer():
+    '''Returns the compiled JetClusterizer class, or None if not available'''
+    if os.environ.get('FCCPHYSICS'):
+        from ROOT import gSystem
+        gSystem.Load("libfccphysics-tools")
+        from ROOT import JetClusterizer as CCJetClusterizer
+        return CCJetClusterizer
+    elif os.environ.get('CMSSW_BASE'):
+        from ROOT import gSystem
+        gSystem.Load("libColinPFSim")
+        from ROOT import heppy
+        return heppy.JetClusterizer
+    return None
+
+
+def configurations(clusterizer_class):
+    '''Returns (name, clusterizer, clusterize function) for the tested algorithms'''
+    eekt = clusterizer_class(1)
+    eegenkt = clusterizer_class(2, 0.4, -1)
+    antikt = clusterizer_class(0)
+    return [('ee_kt njets=2', eekt, lambda: eekt.make_exclusive_jets(2)),
+            ('ee_genkt emin=5', eegenkt, lambda: eegenkt.make_inclusive_jets(5.)),
+            ('anti-kt ptmin=5', antikt, lambda: antikt.make_inclusive_jets(5., 0.4))]
+
+
+def jet_p4s(clusterizer):
+    '''Returns the (px, py, pz, e) of the jets'''
+    p4s = []
+    for jeti in range(clusterizer.n_jets()):
+        if hasattr(clusterizer, 'jet_p4'):
+            p4s.append(clusterizer.jet_p4(jeti))
+        else:
+            jet = clusterizer.jet(jeti)
+            p4s.append((jet.Px(), jet.Py(), jet.Pz(), jet.E()))
+    return p4s
+
+
+def clusterize(events, clusterizer, function):
+    '''Clusters the events, returns the time per event and the list of jet p4s'''
+    results = []
+    start = timeit.default_timer()
+    for p4s in events:
+        clusterizer.clear()
+        for p4 in p4s:
+            clusterizer.add_p4(p4)
+        function()
+        results.append(jet_p4s(clusterizer))
+    return (timeit.default_timer() - start) / len(events), results
+
+
+def max_difference(results1, results2):
+    '''Returns the largest difference between the jet four-momenta'''
+    diff = 0.
+    for jets1, jets2 in zip(results1, results2):
+        if len(jets1) != len(jets2):
+            return float('inf')
+        for jet1, jet2 in zip(jets1, jets2):
+            diff = max(diff, max(abs(jet1[i] - jet2[i]) for i in range(4)))
+    return diff
+
+
+def main(nparticles_list, nevents=20):
+    rng = random.Random(0xdead)
+    compiled = compiled_clusterizer()
+    print '{:>10} {:>20} {:>10} {:>10} {:>12}'.format('particles', 'algorithm',
+                                                      'numpy ms', 'fastjet ms',
+                                                      'max diff')
+    for nparticles in nparticles_list:
+        events = [make_event(nparticles, rng) for i in range(nevents)]
+        configs = configurations(JetClusterizer)
+        compiled_configs = configurations(compiled) if compiled else [None] * len(configs)
+        for (name, clusterizer, function), compiled_config in zip(configs, compiled_configs):
+            time, results = clusterize(events, clusterizer, function)
+            compiled_time, diff = float('nan'), float('nan')
+            if compiled_config:
+                compiled_time, compiled_results = clusterize(events, *compiled_config[1:])
+                diff = max_difference(results, compiled_results)
+            print '{:>10} {:>20} {:>10.2f} {:>10.2f} {:>12.3g}'.format(
+                nparticles, name, time * 1e3, compiled_time * 1e3, diff)
+
+
+if __name__ == '__main__':
+    nparticles_list = [int(arg) for arg in sys.argv[1:]] or [20, 50, 100, 200, 500]
+    main(nparticles_list)
@@ -0,0 +1,225 @@
+'''Vectorised versions of the matching and cleaning functions of heppy.utils.deltar.
+
+The angular coordinates of each collection are extracted once in numpy arrays,
+and the delta R distances between two collections are computed
+as a (n1, n2) matrix.
+The functions have the same arguments and return the same results as their
+counterparts in heppy.utils.deltar, and can be used as drop-in replacements::
+
+    from heppy.utils.deltarmatrix import matchObjectCollection
+
+As in heppy.utils.deltar, theta is used in place of eta
+if heppy.configuration.Collider.BEAMS is 'ee'.
+'''
+
+import math
+import numpy as np
+import heppy.configuration
+from heppy.utils.deltar import DEFAULT_DRMAX, DEFAULT_DRMIN
+
+
+def coordinates(ptcs, use_eta=None):
+    '''Returns the arrays of the angular coordinates (eta or theta, phi)
+    of the particles in ptcs.
+
+    @param use_eta: if None, eta is used unless Collider.BEAMS is 'ee'.
+    '''
+    if use_eta is None:
+        use_eta = heppy.configuration.Collider.BEAMS != 'ee'
+    if use_eta:
+        etas = [ptc.eta() for ptc in ptcs]
+    else:
+        etas = [ptc.theta() for ptc in ptcs]
+    phis = [ptc.phi() for ptc in ptcs]
+    return (np.array(etas, dtype=float).reshape(-1),
+            np.array(phis, dtype=float).reshape(-1))
+
+
+def deltaPhiArray(p1, p2):
+    '''Computes delta phi for arrays p1 and p2, with numpy broadcasting.
+    Gives the same results as heppy.utils.deltar.deltaPhi.
+    '''
+    res = np.subtract(p1, p2)
+    while True:
+        above = res > math.pi
+        if not above.any():
+            break
+        res = np.where(above, res - 2*math.pi, res)
+    while True:
+        below = res < -math.pi
+        if not below.any():
+            break
+        res = np.where(below, res + 2*math.pi, res)
+    return res
+
+
+def deltaR2Matrix(coords1, coords2):
+    '''Returns the (n1, n2) matrix of the squared delta R distances
+    between the coordinates coords1 and coords2 given by the coordinates function.
+    '''
+    etas1, phis1 = coords1
+    etas2, phis2 = coords2
+    de = etas1[:, np.newaxis] - etas2[np.newaxis, :]
+    dp = deltaPhiArray(phis1[:, np.newaxis], phis2[np.newaxis, :])
+    return de*de + dp*dp
+
+
+def deltaR2Array(pivot, ptcs, use_eta=None):
+    '''Returns the array of the squared delta R distances
+    between pivot and each particle in ptcs.'''
+    return deltaR2Matrix(coordinates([pivot], use_eta),
+                         coordinates(ptcs, use_eta))[0]
+
+
+def inConeCollection(pivot, particles,
+                     deltaRMax = DEFAULT_DRMAX,
+                     deltaRMin = DEFAULT_DRMIN):
+    '''Returns the list of particles that are less than deltaRMax away from pivot.'''
+    if len(particles)==0:
+        return []
+    dR2 = deltaR2Array(pivot, particles)
+    inside = (deltaRMin ** 2 <= dR2) & (dR2 < deltaRMax ** 2)
+    return [particles[i] for i in np.flatnonzero(inside)]
+
+
+def cleanObjectCollection(ptcs, masks, deltaRMax=DEFAULT_DRMAX):
+    '''returns a tuple clean_ptcs, dirty_ptcs,
+    where:
+    - dirty_ptcs is the list of particles in ptcs that are matched to a particle
+    in masks.
+    - clean_ptcs is the list of particles in ptcs that are NOT matched to a
+    particle in masks.
+
+    The matching is done within a cone of size deltaRMax.
+    '''
+    if len(ptcs)==0 or len(masks)==0:
+        return ptcs, []
+    dR2 = deltaR2Matrix(coordinates(ptcs), coordinates(masks))
+    dirty = (dR2 < deltaRMax ** 2).any(axis=1)
+    clean_ptcs = []
+    dirty_ptcs = []
+    for ptc, is_dirty in zip(ptcs, dirty):
+        if is_dirty:
+            dirty_ptcs.append(ptc)
+        else:
+            clean_ptcs.append(ptc)
+    return clean_ptcs, dirty_ptcs
+
+
+def bestMatch(ptc, matchCollection):
+    '''Return the best match to ptc in matchCollection,
+    which is the closest ptc in delta R,
+    together with the squared distance dR2 between ptc
+    and the match.'''
+    if len(matchCollection)==0:
+        return None, float('+inf')
+    dR2 = deltaR2Array(ptc, matchCollection)
+    index = _argmin(dR2)
+    if index is None:
+        return None, float('+inf')
+    return matchCollection[index], dR2[index]
+
+
+def _argmin(dR2):
+    '''index of the first minimum of dR2, ignoring nans, or None if only nans.'''
+    valid = ~np.isnan(dR2)
+    if not valid.any():
+        return None
+    return int(np.argmin(np.where(valid, dR2, np.inf)))
+
+
+def matchObjectCollection(ptcs, matchCollection,
+                          deltaRMax=DEFAULT_DRMAX, filter = lambda x,y : True):
+    '''For each particle in ptcs, find the closest particle in matchCollection.
+    Returns a dictionary {ptc: match}, where match is None if no particle
+    is found within deltaRMax.
+
+    As in heppy.utils.deltar.matchObjectCollection, filter is called as
+    filter(object, match), and can only be used to select the particles
+    in matchCollection.
+    '''
+    pairs = {}
+    if len(ptcs)==0:
+        return pairs
+    if len(matchCollection)==0:
+        return dict( list(zip(ptcs, [None]*len(ptcs))) )
+    matchCollection = [mob for mob in matchCollection if filter(object,mob)]
+    if len(matchCollection)==0:
+        return dict( list(zip(ptcs, [None]*len(ptcs))) )
+    dR2Max = deltaRMax ** 2
+    dR2 = deltaR2Matrix(coordinates(ptcs), coordinates(matchCollection))
+    for ptc, row in zip(ptcs, dR2):
+        index = _argmin(row)
+        if index is not None and row[index] < dR2Max:
+            pairs[ptc] = matchCollection[index]
+        else:
+            pairs[ptc] = None
+    return pairs
+
+
+def _univocalMatch(ptcs, matchCollection, dR2, dR2Max):
+    '''Greedy univocal association of ptcs and matchCollection, by increasing dR2.
+    Pairs with the same dR2 are considered in the order of ptcs and matchCollection.
+    '''
+    pairs = {}
+    for ptc in ptcs:
+        ptc.matched = False
+    for match in matchCollection:
+        match.matched = False
+    iptcs, imatches = np.nonzero(dR2 < dR2Max)
+    order = np.argsort(dR2[iptcs, imatches], kind='mergesort')
+    for iptc, imatch in zip(iptcs[order], imatches[order]):
+        ptc = ptcs[iptc]
+        match = matchCollection[imatch]
+        if ptc.matched == False and match.matched == False:
+            ptc.matched = True
+            match.matched = True
+            pairs[ptc] = match
+    for ptc in ptcs:
+        if ptc.matched == False:
+            pairs[ptc] = None
+    return pairs
+
+
+def matchObjectCollection2(ptcs, matchCollection,
+                           deltaRMax=DEFAULT_DRMAX):
+    '''Univoque association of an element from matchCollection to an element of ptcs.
+    Returns a dictionary {ptc: match}.
+    particles in ptcs and matchCollection get the "matched" attribute,
+    true is they are part of a matched tuple.
+    By default, the matching is true only if delta R is smaller than 0.3.
+    '''
+    if len(ptcs)==0:
+        return {}
+    if len(matchCollection)==0:
+        return dict( list(zip(ptcs, [None]*len(ptcs))) )
+    dR2 = deltaR2Matrix(coordinates(ptcs), coordinates(matchCollection))
+    return _univocalMatch(ptcs, matchCollection, dR2, deltaRMax ** 2)
+
+
+def matchObjectCollection3(ptcs, matchCollection,
+                           deltaRMax=DEFAULT_DRMAX,
+                           filter_func=None):
+    '''Univoque association of an element from matchCollection to an element of ptcs.
+    Returns a dictionary {ptc: match}.
+    particles in ptcs and matchCollection get the "matched" attribute,
+    true is they are part of a matched tuple.
+    By default, the matching is true only if delta R is smaller than 0.3.
+
+    As in heppy.utils.deltar.matchObjectCollection3, eta is used whatever
+    the collider, and filter_func(ptc, match) is called for the pairs
+    close enough in eta.
+    '''
+    if len(ptcs)==0:
+        return {}
+    if len(matchCollection)==0:
+        return dict( zip(ptcs, [None]*len(ptcs)) )
+    coords = coordinates(ptcs, use_eta=True)
+    match_coords = coordinates(matchCollection, use_eta=True)
+    dR2 = deltaR2Matrix(coords, match_coords)
+    if filter_func is not None:
+        deta = np.abs(coords[0][:, np.newaxis] - match_coords[0][np.newaxis, :])
+        for iptc, imatch in zip(*np.nonzero(deta <= deltaRMax)):
+            if not filter_func(ptcs[iptc], matchCollection[imatch]):
+                dR2[iptc, imatch] = np.inf
+    return _univocalMatch(ptcs, matchCollection, dR2, deltaRMax ** 2)
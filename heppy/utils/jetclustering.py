@@ -0,0 +1,268 @@
+'''Sequential recombination jet clustering with numpy.
+
+Used by heppy.analyzers.fcc.JetClusterizer in place of the compiled
+fastjet-based JetClusterizer when the latter is not available.
+
+The following algorithms are supported, with the E recombination scheme:
+ - 'ee_kt' : Durham algorithm, d_ij = 2 min(E_i^2, E_j^2) (1 - cos theta_ij),
+   without beam distance, for exclusive clustering;
+ - 'ee_genkt' : generalised kt algorithm for e+e- collisions,
+   d_ij = min(E_i^2p, E_j^2p) (1 - cos theta_ij) / (1 - cos R), d_iB = E_i^2p ;
+ - 'genkt' : generalised kt algorithm for hadron collisions,
+   d_ij = min(pt_i^2p, pt_j^2p) DeltaR_ij^2 / R^2, d_iB = pt_i^2p,
+   with p = -1 for anti-kt, 0 for Cambridge/Aachen, and 1 for kt.
+
+As in fastjet's N2Plain strategy, the geometric nearest neighbour of each pseudojet,
+i.e. the closest one in angle, is kept up to date during the clustering.
+The smallest d_ij is always found between a pseudojet and its geometric
+nearest neighbour, and each step only recomputes the angular distances of the
+merged pseudojet and of the few pseudojets which had one of the merged pseudojets
+as nearest neighbour.
+The clustering of n particles then takes O(n^2) operations, vectorised with numpy.
+
+Example::
+
+    jets, constituents = cluster(p4s, 'ee_kt', njets=2)
+'''
+
+import math
+import numpy as np
+
+MAX_RAPIDITY = 1e5
+
+
+class _ClusterSequence(object):
+    '''Clustering state: pseudojets, and their nearest neighbours'''
+
+    def __init__(self, p4s, algorithm, R, p):
+        if algorithm not in ['ee_kt', 'ee_genkt', 'genkt']:
+            raise ValueError('unknown jet algorithm ' + str(algorithm))
+        self.algorithm = algorithm
+        self.p = p
+        # d_ij = factor * min(weight_i, weight_j) * angular distance
+        if algorithm == 'ee_kt':
+            self.factor = 2.
+        elif algorithm == 'ee_genkt':
+            self.factor = 1. / (1 - math.cos(R) if R < math.pi else 3 + math.cos(R))
+        else:
+            self.factor = 1. / R ** 2
+        self.p4 = np.array(p4s, dtype=float).reshape(-1, 4)
+        npseudojets = len(self.p4)
+        self.active = np.ones(npseudojets, dtype=bool)
+        self.constituents = [[index] for index in range(npseudojets)]
+        self.weight = np.empty(npseudojets)
+        if algorithm == 'genkt':
+            self.rap = np.empty(npseudojets)
+            self.phi = np.empty(npseudojets)
+        else:
+            self.direction = np.empty((npseudojets, 3))
+        self.set_coordinates(np.arange(npseudojets))
+        self.nn = np.full(npseudojets, -1, dtype=int)
+        self.nnangle = np.full(npseudojets, np.inf)
+        self.nndist = np.full(npseudojets, np.inf)
+        for index in range(npseudojets):
+            self.update_nn(index)
+
+    def set_coordinates(self, indices):
+        '''computes the weight and angular coordinates of the pseudojets'''
+        px, py, pz, e = self.p4[indices].T
+        if self.algorithm == 'genkt':
+            pt2 = px ** 2 + py ** 2
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.weight[indices] = pt2 ** self.p
+                rap = 0.5 * np.log((e + pz) / (e - pz))
+            rap = np.where(np.isnan(rap), 0., rap)
+            self.rap[indices] = np.clip(rap, -MAX_RAPIDITY, MAX_RAPIDITY)
+            self.phi[indices] = np.arctan2(py, px)
+        else:
+            p = 1 if self.algorithm == 'ee_kt' else self.p
+            with np.errstate(divide='ignore'):
+                self.weight[indices] = e ** (2 * p)
+            norm = np.sqrt(px ** 2 + py ** 2 + pz ** 2)
+            norm = np.where(norm > 0, norm, 1.)
+            self.direction[indices] = np.column_stack((px, py, pz)) / norm[:, np.newaxis]
+
+    def beam_distance(self, indices):
+        if self.algorithm == 'ee_kt':
+            return np.full(len(indices), np.inf)
+        return self.weight[indices]
+
+    def angles(self, index, others):
+        '''returns the angular distances between pseudojet index and the pseudojets others:
+        DeltaR^2 for genkt, and 1 - cos theta for the e+e- algorithms.'''
+        if self.algorithm == 'genkt':
+            dphi = np.abs(self.phi[others] - self.phi[index])
+            dphi = np.where(dphi > math.pi, 2 * math.pi - dphi, dphi)
+            drap = self.rap[others] - self.rap[index]
+            return drap ** 2 + dphi ** 2
+        return 1 - self.direction[others].dot(self.direction[index])
+
+    def set_nn(self, indices, nns, angles):
+        '''sets the nearest neighbours of the pseudojets indices'''
+        self.nn[indices] = nns
+        self.nnangle[indices] = angles
+        self.nndist[indices] = self.factor * angles * \
+                               np.minimum(self.weight[indices], self.weight[nns])
+
+    def others(self, index):
+        others = np.flatnonzero(self.active)
+        return others[others != index]
+
+    def update_nn(self, index):
+        '''finds the nearest neighbour of pseudojet index'''
+        others = self.others(index)
+        if len(others) == 0:
+            self.nn[index] = -1
+            self.nnangle[index] = np.inf
+            self.nndist[index] = np.inf
+            return
+        angles = self.angles(index, others)
+        imin = angles.argmin()
+        self.set_nn(index, others[imin], angles[imin])
+
+    def merge(self, index, other):
+        '''merges pseudojet other into pseudojet index'''
+        self.p4[index] += self.p4[other]
+        self.constituents[index].extend(self.constituents[other])
+        self.active[other] = False
+        self.set_coordinates(np.array([index]))
+        affected = np.flatnonzero(self.active &
+                                  ((self.nn == index) | (self.nn == other)))
+        others = self.others(index)
+        if len(others):
+            angles = self.angles(index, others)
+            imin = angles.argmin()
+            self.set_nn(index, others[imin], angles[imin])
+            closer = angles < self.nnangle[others]
+            self.set_nn(others[closer], index, angles[closer])
+        else:
+            self.nn[index] = -1
+            self.nnangle[index] = np.inf
+            self.nndist[index] = np.inf
+        for pseudojet in affected:
+            if pseudojet != index:
+                self.update_nn(pseudojet)
+
+    def run(self, njets=None):
+        '''clusters until njets pseudojets are left if njets is given,
+        and until all pseudojets are final jets otherwise.
+        Returns the list of the indices of the jets.'''
+        jets = []
+        nactive = self.active.sum()
+        while nactive > (njets or 0):
+            active = np.flatnonzero(self.active)
+            beam = self.beam_distance(active)
+            dists = np.minimum(self.nndist[active], beam)
+            imin = dists.argmin()
+            index = active[imin]
+            if njets is None and (beam[imin] <= self.nndist[index] or self.nn[index] < 0):
+                # final jet
+                self.active[index] = False
+                jets.append(index)
+                for pseudojet in np.flatnonzero(self.active & (self.nn == index)):
+                    self.update_nn(pseudojet)
+            elif self.nn[index] < 0:
+                # single pseudojet left, with njets = 0
+                break
+            else:
+                self.merge(index, self.nn[index])
+            nactive -= 1
+        if njets is not None:
+            jets = list(np.flatnonzero(self.active))
+        return jets
+
+
+def cluster(p4s, algorithm, R=0.4, p=-1, njets=None):
+    '''Clusters particles into jets.
+
+    @param p4s: sequence or (n, 4) array of the (px, py, pz, e) of the particles.
+    @param algorithm: 'ee_kt', 'ee_genkt', or 'genkt', see module documentation.
+    @param R: radius, for ee_genkt and genkt.
+    @param p: exponent, for ee_genkt and genkt.
+    @param njets: if provided, exclusive clustering into njets jets.
+      Otherwise, inclusive clustering.
+    @return: (jets, constituents), with jets the (njets, 4) array of the four-momenta
+      of the jets, and constituents the list of the sorted indices of the
+      particles of each jet. The jets are in the order of the clustering sequence.
+    '''
+    sequence = _ClusterSequence(p4s, algorithm, R, p)
+    if njets is not None and njets > len(sequence.p4):
+        raise ValueError('cannot make {} jets with {} particles'.format(njets, len(sequence.p4)))
+    indices = sequence.run(njets)
+    jets = sequence.p4[indices].reshape(-1, 4)
+    constituents = [sorted(sequence.constituents[index]) for index in indices]
+    return jets, constituents
+
+
+class JetClusterizer(object):
+    '''Drop-in replacement of the compiled JetClusterizer class of
+    fcc-physics and heppy (CMSSW), based on the cluster function.
+
+    @param algorithm: as for the compiled class:
+      - 0 : anti-kt with radius R, for make_inclusive_jets(ptmin);
+      - 1 : ee_kt, for make_exclusive_jets(njets);
+      - 2 : ee_genkt with R and p, for make_inclusive_jets(emin).
+    '''
+
+    algorithms = {0: 'genkt', 1: 'ee_kt', 2: 'ee_genkt'}
+
+    def __init__(self, algorithm, R=0.4, p=-1):
+        self.algorithm = self.__class__.algorithms[algorithm]
+        self.R = R
+        self.p = p
+        self.clear()
+
+    def clear(self):
+        '''removes the particles and jets'''
+        self._p4s = []
+        self._jets = np.empty((0, 4))
+        self._constituents = []
+
+    def add_p4(self, p4):
+        '''adds the four-momentum p4 (e.g. a TLorentzVector) of a particle'''
+        self._p4s.append((p4.Px(), p4.Py(), p4.Pz(), p4.E()))
+
+    def _set_jets(self, jets, constituents, selected, key):
+        order = sorted((index for index in range(len(jets)) if selected[index]),
+                       key=lambda index: -key[index])
+        self._jets = jets[order].reshape(-1, 4)
+        self._constituents = [constituents[index] for index in order]
+
+    def make_exclusive_jets(self, njets):
+        '''makes njets jets, sorted by decreasing energy'''
+        jets, constituents = cluster(self._p4s, self.algorithm, self.R, self.p, njets)
+        self._set_jets(jets, constituents, [True] * len(jets), jets[:, 3])
+
+    def make_inclusive_jets(self, ptmin, R=None):
+        '''makes the inclusive jets, keeping those above ptmin.
+
+        ptmin is a pt threshold for anti-kt, sorted by decreasing pt,
+        and an energy threshold for ee_genkt, sorted by decreasing energy.
+        @param R: optional radius, overriding the one given to the constructor.
+        '''
+        if R is None:
+            R = self.R
+        jets, constituents = cluster(self._p4s, self.algorithm, R, self.p)
+        if self.algorithm == 'genkt':
+            key = np.hypot(jets[:, 0], jets[:, 1])
+        else:
+            key = jets[:, 3]
+        self._set_jets(jets, constituents, key >= ptmin, key)
+
+    def n_jets(self):
+        return len(self._jets)
+
+    def jet_p4(self, jeti):
+        '''returns the (px, py, pz, e) of jet jeti'''
+        return tuple(self._jets[jeti])
+
+    def jet(self, jeti):
+        '''returns the TLorentzVector of jet jeti'''
+        from ROOT import TLorentzVector
+        return TLorentzVector(*self.jet_p4(jeti))
+
+    def n_constituents(self, jeti):
+        return len(self._constituents[jeti])
+
+    def constituent_index(self, jeti, consti):
+        return self._constituents[jeti][consti]
@@ -0,0 +1,66 @@
+import unittest
+import random
+
+import heppy.utils.deltar as deltar
+import heppy.utils.deltarmatrix as deltarmatrix
+from heppy.configuration import Collider
+from bench_deltar import make_particles
+
+
+class TestDeltaRMatrix(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.ptcs = make_particles(200, rng)
+        self.matches = make_particles(150, rng)
+        self.beams = Collider.BEAMS
+
+    def tearDown(self):
+        Collider.BEAMS = self.beams
+
+    def test_deltaPhiArray(self):
+        phis = [-7., -3.1, -0.5, 0., 2., 3.1, 6.5, 12.]
+        for p1 in phis:
+            for p2 in phis:
+                self.assertEqual(deltarmatrix.deltaPhiArray(p1, p2),
+                                 deltar.deltaPhi(p1, p2))
+
+    def test_same_results(self):
+        '''Test that the results are the same as the ones of deltar'''
+        for beams in ['pp', 'ee']:
+            Collider.BEAMS = beams
+            for name in ['matchObjectCollection', 'matchObjectCollection2',
+                         'matchObjectCollection3']:
+                expected = getattr(deltar, name)(self.ptcs, self.matches, 0.2)
+                result = getattr(deltarmatrix, name)(self.ptcs, self.matches, 0.2)
+                self.assertTrue(any(result.values()))
+                self.assertEqual(expected, result)
+            self.assertEqual(deltar.cleanObjectCollection(self.ptcs, self.matches, 0.1),
+                             deltarmatrix.cleanObjectCollection(self.ptcs, self.matches, 0.1))
+            pivot = self.ptcs[0]
+            self.assertEqual(deltar.inConeCollection(pivot, self.matches, 0.5),
+                             deltarmatrix.inConeCollection(pivot, self.matches, 0.5))
+            self.assertEqual(deltar.bestMatch(pivot, self.matches),
+                             deltarmatrix.bestMatch(pivot, self.matches))
+
+    def test_filter(self):
+        filter_func = lambda ptc, match: match.phi() > 0
+        expected = deltar.matchObjectCollection3(self.ptcs, self.matches, 0.3, filter_func)
+        result = deltarmatrix.matchObjectCollection3(self.ptcs, self.matches, 0.3, filter_func)
+        self.assertEqual(expected, result)
+        self.assertTrue(all(match.phi() > 0 for match in result.values() if match))
+
+    def test_empty(self):
+        for name in ['matchObjectCollection', 'matchObjectCollection2',
+                     'matchObjectCollection3']:
+            func = getattr(deltarmatrix, name)
+            self.assertEqual(func([], self.matches), {})
+            self.assertEqual(func(self.ptcs, []),
+                             dict((ptc, None) for ptc in self.ptcs))
+        self.assertEqual(deltarmatrix.cleanObjectCollection(self.ptcs, []),
+                         (self.ptcs, []))
+        self.assertEqual(deltarmatrix.inConeCollection(self.ptcs[0], []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import math
+import random
+import numpy as np
+
+from heppy.utils.jetclustering import cluster, JetClusterizer
+from bench_jetclustering import make_event
+
+
+def naive_cluster(p4s, algorithm, R=0.4, p=-1, njets=None):
+    '''Reference clustering, computing all the distances at each step'''
+    pseudojets = [(np.array(p4, dtype=float), [index]) for index, p4 in enumerate(p4s)]
+    jets = []
+
+    def weight(p4):
+        if algorithm == 'genkt':
+            return (p4[0] ** 2 + p4[1] ** 2) ** p
+        return p4[3] ** (2 if algorithm == 'ee_kt' else 2 * p)
+
+    def distance(p41, p42):
+        weight12 = min(weight(p41), weight(p42))
+        if algorithm == 'genkt':
+            rap1 = 0.5 * math.log((p41[3] + p41[2]) / (p41[3] - p41[2]))
+            rap2 = 0.5 * math.log((p42[3] + p42[2]) / (p42[3] - p42[2]))
+            dphi = abs(math.atan2(p41[1], p41[0]) - math.atan2(p42[1], p42[0]))
+            dphi = min(dphi, 2 * math.pi - dphi)
+            return weight12 * ((rap1 - rap2) ** 2 + dphi ** 2) / R ** 2
+        cos = p41[:3].dot(p42[:3]) / np.linalg.norm(p41[:3]) / np.linalg.norm(p42[:3])
+        if algorithm == 'ee_kt':
+            return 2 * weight12 * (1 - cos)
+        return weight12 * (1 - cos) / (1 - math.cos(R))
+
+    while len(pseudojets) > (njets or 0):
+        candidates = []
+        for i, (p4i, consti) in enumerate(pseudojets):
+            if algorithm != 'ee_kt' and njets is None:
+                candidates.append((weight(p4i), i, None))
+            for j in range(i + 1, len(pseudojets)):
+                candidates.append((distance(p4i, pseudojets[j][0]), i, j))
+        if not candidates:
+            jets.append(pseudojets.pop())
+            continue
+        dist, i, j = min(candidates)
+        if j is None:
+            jets.append(pseudojets.pop(i))
+        else:
+            p4j, constj = pseudojets.pop(j)
+            p4i, consti = pseudojets[i]
+            pseudojets[i] = (p4i + p4j, consti + constj)
+    if njets is not None:
+        jets = pseudojets
+    return sorted((tuple(sorted(consti)), tuple(p4)) for p4, consti in jets)
+
+
+class TestJetClustering(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0xdead)
+        self.events = [[p4.p4 for p4 in make_event(nparticles, rng)]
+                       for nparticles in [1, 2, 5, 20, 50]]
+
+    def check(self, p4s, algorithm, R=0.4, p=-1, njets=None):
+        jets, constituents = cluster(p4s, algorithm, R, p, njets)
+        result = sorted((tuple(consti), tuple(p4)) for p4, consti in zip(jets, constituents))
+        expected = naive_cluster(p4s, algorithm, R, p, njets)
+        self.assertEqual([consti for consti, p4 in result],
+                         [consti for consti, p4 in expected])
+        np.testing.assert_allclose([p4 for consti, p4 in result],
+                                   [p4 for consti, p4 in expected])
+        # all particles in one and only one jet, and four-momentum conservation
+        self.assertEqual(sorted(sum(constituents, [])), range(len(p4s)))
+        np.testing.assert_allclose(jets.sum(axis=0), np.sum(p4s, axis=0))
+
+    def test_ee_kt(self):
+        for p4s in self.events:
+            for njets in [1, 2, 4]:
+                if njets <= len(p4s):
+                    self.check(p4s, 'ee_kt', njets=njets)
+
+    def test_ee_genkt(self):
+        for p4s in self.events:
+            for R, p in [(0.4, -1), (1., 1), (0.7, 0)]:
+                self.check(p4s, 'ee_genkt', R, p)
+
+    def test_genkt(self):
+        for p4s in self.events:
+            for R, p in [(0.4, -1), (0.7, 1), (0.5, 0)]:
+                self.check(p4s, 'genkt', R, p)
+
+    def test_too_many_jets(self):
+        self.assertRaises(ValueError, cluster, self.events[0], 'ee_kt', njets=2)
+        self.assertRaises(ValueError, cluster, self.events[0], 'durham')
+
+    def test_clusterizer(self):
+        '''the interface of the compiled JetClusterizer'''
+        rng = random.Random(1)
+        p4s = make_event(50, rng)
+        clusterizer = JetClusterizer(1)
+        for p4 in p4s:
+            clusterizer.add_p4(p4)
+        clusterizer.make_exclusive_jets(2)
+        self.assertEqual(clusterizer.n_jets(), 2)
+        energies = [clusterizer.jet_p4(jeti)[3] for jeti in range(2)]
+        self.assertEqual(energies, sorted(energies, reverse=True))
+        for jeti in range(2):
+            jet_p4 = np.sum([p4s[clusterizer.constituent_index(jeti, consti)].p4
+                             for consti in range(clusterizer.n_constituents(jeti))], axis=0)
+            np.testing.assert_allclose(clusterizer.jet_p4(jeti), jet_p4)
+        clusterizer = JetClusterizer(0)
+        for p4 in p4s:
+            clusterizer.add_p4(p4)
+        clusterizer.make_inclusive_jets(5.)
+        pts = [math.hypot(*clusterizer.jet_p4(jeti)[:2])
+               for jeti in range(clusterizer.n_jets())]
+        self.assertTrue(pts)
+        self.assertTrue(min(pts) >= 5.)
+        self.assertEqual(pts, sorted(pts, reverse=True))
+        clusterizer.clear()
+        self.assertEqual(clusterizer.n_jets(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()